@@ -0,0 +1,132 @@
+import mmap
+import os
+import struct
+import tempfile
+from typing import Optional
+
+from game_board import Move
+from helpers import ZOBRIST_SEED, generate_side_to_move_key
+from transposition_table import TranspositionTable
+
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "gomoku", "analysis.bin")
+
+MAGIC = b"GMKCACHE"
+# Version 2 keys positions by the side to move as well
+VERSION = 2
+# Magic, version, board size, zobrist seed, padded to keep the table 64-byte aligned
+HEADER = struct.Struct("<8sHHQ")
+HEADER_BYTES = 64
+
+
+class AnalysisCache:
+    """
+    Transposition table of deep search results kept in a memory mapped file, so that it survives
+    the game and is shared by every process opening the same file. The file is a small header
+    followed by a TranspositionTable, whose entries validate themselves against their key, so
+    concurrent readers and writers never see torn entries. The table keeps its fixed size and
+    evicts like the in-memory table, preferring deep entries.
+
+    Values are stored relative to the heuristic value of the node, because the search values of
+    this engine are relative to the root of each search, which differs between searches.
+
+    The cache is shared by games in which either side starts, so the same stones occur with
+    either side to move. Keys of positions with the player to move have a side to move key
+    hashed in, keeping them apart from the positions with the AI to move.
+    """
+    def __init__(self, path: str=DEFAULT_CACHE_PATH, size_mb: float=32.0, board_size: int=20,
+                 min_depth: int=4, seed: int=ZOBRIST_SEED):
+        """
+        :param path: Path of the cache file, created if it does not exist
+        :param size_mb: Size of a new cache file in megabytes. An existing file keeps its size.
+        :param board_size: Size of the board the keys are computed for
+        :param min_depth: Shallowest search depth stored in and read from the cache
+        :param seed: Zobrist seed the keys are computed with
+        """
+        self.path = path
+        self.min_depth = min_depth
+        self.player_to_move_key = generate_side_to_move_key(seed)
+        if not os.path.exists(path):
+            self._create(path, size_mb, board_size, seed)
+
+        with open(path, "r+b") as file:
+            self.data = mmap.mmap(file.fileno(), 0)
+        magic, version, file_board_size, file_seed = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            self.data.close()
+            raise ValueError(f"{path} is not an analysis cache")
+        if file_board_size != board_size or file_seed != seed:
+            self.data.close()
+            raise ValueError(f"{path} was created for board size {file_board_size} and zobrist "
+                             f"seed {file_seed}")
+        self.view = memoryview(self.data)[HEADER_BYTES:]
+        self.table = TranspositionTable(buffer=self.view)
+
+    @staticmethod
+    def _create(path: str, size_mb: float, board_size: int, seed: int) -> None:
+        """
+        Creates an empty cache file. The file is written under a temporary name and linked into
+        place, so a process racing to create the same cache either wins or opens the winner's
+        file.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        table_bytes = max(int(size_mb * 2**20), 2 * TranspositionTable.BUCKET_BYTES)
+        descriptor, temporary = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(HEADER.pack(MAGIC, VERSION, board_size, seed).ljust(HEADER_BYTES,
+                                                                               b"\0"))
+                file.truncate(HEADER_BYTES + table_bytes)
+            try:
+                os.link(temporary, path)
+            except FileExistsError:
+                pass
+        finally:
+            os.remove(temporary)
+
+    def probe(self, key: int, node_value: float,
+              ai_to_move: bool=True) -> Optional[tuple[float, Optional[Move], int, int]]:
+        """
+        Looks up a position.
+        :param key: Zobrist hash of the position
+        :param node_value: Heuristic value of the position in the current search
+        :param ai_to_move: Whether the AI is to move in the position
+        :return: (value, best move, depth, flag) tuple or None if the position is not cached
+        """
+        entry = self.table.probe(key if ai_to_move else key ^ self.player_to_move_key)
+        if entry is None:
+            return None
+        value, move, depth, flag = entry
+        return value + node_value, move, depth, flag
+
+    def store(self, key: int, value: float, node_value: float, move: Optional[Move], depth: int,
+              flag: int, ai_to_move: bool=True) -> None:
+        """
+        Stores a search result of at least min_depth.
+        :param key: Zobrist hash of the position
+        :param value: Value of the position in the current search
+        :param node_value: Heuristic value of the position in the current search
+        :param move: Best move of the position
+        :param depth: Depth of the search
+        :param flag: Whether the value is exact, a lower bound or an upper bound
+        :param ai_to_move: Whether the AI is to move in the position
+        :return: None
+        """
+        if depth >= self.min_depth:
+            if not ai_to_move:
+                key ^= self.player_to_move_key
+            self.table.store(key, value - node_value, move, depth, flag)
+
+    def stats(self) -> dict[str, float]:
+        return self.table.stats()
+
+    def close(self) -> None:
+        """
+        Writes the cache to disk and unmaps it.
+        :return: None
+        """
+        self.table.close()
+        self.view.release()
+        self.data.flush()
+        self.data.close()
@@ -0,0 +1,135 @@
+from typing import Optional, Sequence
+
+from game_board import GameBoard, Marker, Move
+from pattern_table import OFFSETS, POWERS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAS_NUMPY = np is not None
+
+
+WINDOW = 11
+
+
+class PythonBatchEvaluator:
+    """
+    Pure Python fallback of BatchEvaluator, used when NumPy is not installed. It evaluates the
+    moves one by one with GameBoard.get_move_value.
+    """
+    def __init__(self, size: int):
+        self.size = size
+
+    def move_values(self, gameboard: GameBoard, moves: Sequence[Move],
+                    marker: Marker) -> list[int]:
+        """
+        Computes get_move_value for every move.
+        :param gameboard: Instance of GameBoard
+        :param moves: Empty cells to evaluate
+        :param marker: Player or AI marker
+        :return: Values aligned with the moves
+        """
+        return [gameboard.get_move_value(col, row, marker) for col, row in moves]
+
+
+class BatchEvaluator:
+    """
+    Evaluates many moves at once with NumPy. The board is copied into a flat int8 array with
+    one extra always empty cell at the end. For every cell and direction, the eleven cell
+    window of get_rows_containing_move is precomputed as indices into that array: the cells on
+    the board come first and the positions past the board edge point to the empty cell, so the
+    window's base-3 code is the code of the clipped row. One fancy-indexing gather then gives
+    the windows of all moves, and the move values are read from the pattern table in bulk.
+    """
+    def __init__(self, size: int):
+        if np is None:
+            raise ImportError("BatchEvaluator requires NumPy")
+        self.size = size
+        cells = size * size
+        self.cells = np.zeros(cells + 1, dtype=np.int8)
+        self.synced_board: Optional[GameBoard] = None
+        self.synced_history: list[Move] = []
+        self.table = np.frombuffer(GameBoard.PATTERN_TABLE.table, dtype=np.int32)
+        self.place_values = np.array(POWERS[:WINDOW], dtype=np.int64)
+
+        windows = np.full((cells, 4, WINDOW), cells, dtype=np.intp)
+        offsets = np.zeros((cells, 4), dtype=np.int64)
+        move_places = np.zeros((cells, 4), dtype=np.int64)
+        for row in range(size):
+            for col in range(size):
+                cell = row*size + col
+                for d, (dx, dy) in enumerate(GameBoard.DIRECTIONS):
+                    window = []
+                    for i in range(-5, 6):
+                        if i == 0:
+                            move_places[cell, d] = POWERS[len(window)]
+                        c = col + i*dx
+                        r = row + i*dy
+                        if 0 <= c < size and 0 <= r < size:
+                            window.append(r*size + c)
+                    windows[cell, d, :len(window)] = window
+                    offsets[cell, d] = OFFSETS[len(window)]
+        self.windows = windows
+        self.offsets = offsets
+        self.move_places = move_places
+
+    def sync(self, gameboard: GameBoard) -> None:
+        """
+        Brings the int8 array up to date with the board. Only the moves after the common prefix
+        of the synced and the current move history are cleared and replayed, which during a
+        search are the few moves between two nodes.
+        :param gameboard: Instance of GameBoard
+        :return: None
+        """
+        cells = self.cells
+        size = self.size
+        history = gameboard.move_history
+        if self.synced_board is not gameboard:
+            cells[:] = 0
+            self.synced_board = gameboard
+            self.synced_history = []
+
+        synced = self.synced_history
+        common = 0
+        limit = min(len(synced), len(history))
+        while common < limit and synced[common] == history[common]:
+            common += 1
+        for col, row in synced[common:]:
+            cells[row*size + col] = 0
+        board = gameboard.board
+        for col, row in history[common:]:
+            cells[row*size + col] = board[row][col]
+        self.synced_history = history[:]
+
+    def move_values(self, gameboard: GameBoard, moves: Sequence[Move],
+                    marker: Marker) -> list[int]:
+        """
+        Computes get_move_value for every move in one batch.
+        :param gameboard: Instance of GameBoard
+        :param moves: Empty cells to evaluate
+        :param marker: Player or AI marker
+        :return: Values aligned with the moves
+        """
+        if not moves:
+            return []
+        self.sync(gameboard)
+        size = self.size
+        indices = np.fromiter((row*size + col for col, row in moves), dtype=np.intp,
+                              count=len(moves))
+        codes = self.cells[self.windows[indices]] @ self.place_values
+        before = self.offsets[indices] + codes
+        after = before + int(marker) * self.move_places[indices]
+        return (self.table[after] - self.table[before]).sum(axis=1).tolist()
+
+
+def create_batch_evaluator(size: int) -> BatchEvaluator | PythonBatchEvaluator:
+    """
+    Creates the NumPy batch evaluator, or the pure Python one when NumPy is not installed.
+    :param size: Size of the board
+    :return: Batch evaluator
+    """
+    if np is None:
+        return PythonBatchEvaluator(size)
+    return BatchEvaluator(size)
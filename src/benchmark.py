@@ -0,0 +1,380 @@
+import argparse
+import ast
+import json
+import os
+import platform
+import sys
+import time
+from typing import Any, Callable, Optional
+
+from bitboard import BitBoard
+from game_board import GameBoard, Marker, Move
+from gomoku_ai import GomokuAI
+from search_control import SearchControl
+from search_stats import SearchStats
+
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_positions.json")
+MICRO_POSITION = "midgame_crossed_lines"
+
+
+def load_corpus(path: str=CORPUS_PATH) -> dict[str, Any]:
+    """
+    Loads the position corpus. Positions are lists of [col, row, marker] moves after which the
+    AI is to move. The version is bumped whenever positions change, so that results of
+    different corpus versions are never compared.
+    :param path: Path of the corpus file
+    :return: Dict with the version, board size and positions
+    """
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def setup_position(position: dict[str, Any], size: int,
+                   board_class: type=BitBoard) -> tuple[GameBoard, set[Move]]:
+    """
+    Plays the moves of a corpus position on a new board.
+    :param position: Corpus position
+    :param size: Size of the board
+    :param board_class: GameBoard class to use
+    :return: The board and its candidate moves
+    """
+    gameboard = board_class(size)
+    candidates = set()
+    for col, row, marker in position["moves"]:
+        gameboard.update_candidates(candidates, col, row)
+        gameboard.move(col, row, Marker(marker))
+    return gameboard, candidates
+
+
+def bench_search(position: dict[str, Any], size: int, time_limit: float,
+                 ai_options: dict[str, Any]) -> dict[str, Any]:
+    """
+    Runs find_ai_move on a position with a fresh AI and records every completed iteration.
+    :return: Result with the move, the time to each depth, nodes per second, the effective
+             branching factor, cutoff statistics and the transposition table statistics
+    """
+    gameboard, candidates = setup_position(position, size)
+    # Searches stopping early would make the times and node counts incomparable
+    ai = GomokuAI(verbose=False, collect_stats=True, **{"time_management": False, **ai_options})
+    control = SearchControl()
+    iterations = []
+    start = time.perf_counter()
+
+    def record(depth: int, _value: float, _move: Move) -> None:
+        iterations.append({"depth": depth, "time": time.perf_counter() - start,
+                           "nodes": control.nodes})
+
+    try:
+        move = ai.find_ai_move(gameboard, candidates, time_limit, control, record)
+        elapsed = time.perf_counter() - start
+        tt_stats = ai.transposition_table.stats()
+    finally:
+        ai.close()
+
+    return {
+        "name": position["name"],
+        "category": position["category"],
+        "move": move,
+        "time": elapsed,
+        "nodes": control.nodes,
+        "nps": control.nodes / elapsed if elapsed else 0.0,
+        "depth": iterations[-1]["depth"] if iterations else 0,
+        "time_to_depth": {str(it["depth"]): it["time"] for it in iterations},
+        "ebf": effective_branching_factor(iterations),
+        "cutoffs": cutoff_stats(ai.search_stats),
+        "tt": tt_stats,
+    }
+
+
+def effective_branching_factor(iterations: list[dict[str, Any]]) -> Optional[float]:
+    """
+    Computes the average growth of the node count per depth over the completed iterations.
+    :param iterations: Completed iterations with cumulative node counts
+    :return: Effective branching factor or None with less than two iterations
+    """
+    nodes = []
+    previous = 0
+    for it in iterations:
+        nodes.append((it["depth"], it["nodes"] - previous))
+        previous = it["nodes"]
+    nodes = [(depth, count) for depth, count in nodes if count > 0]
+    if len(nodes) < 2:
+        return None
+    (first_depth, first), (last_depth, last) = nodes[0], nodes[-1]
+    return (last / first) ** (1 / (last_depth - first_depth))
+
+
+def cutoff_stats(stats: SearchStats) -> dict[str, Any]:
+    return {
+        "beta_cutoffs": stats.beta_cutoffs,
+        "first_move_cutoff_rate": stats.first_move_cutoff_rate,
+        "tt_cutoffs": stats.tt_cutoffs,
+        "null_window_searches": stats.null_window_searches,
+        "researches": stats.researches,
+        "research_rate": stats.research_rate,
+        "aspiration_researches": stats.aspiration_researches,
+    }
+
+
+def bench_minimax(position: dict[str, Any], size: int, depth: int,
+                  ai_options: dict[str, Any]) -> dict[str, Any]:
+    """
+    Runs a single fixed depth minimax on a position with a fresh AI and transposition table.
+    :return: Result with the move, value, node count, time, cutoff statistics and transposition
+             table statistics
+    """
+    gameboard, candidates = setup_position(position, size)
+    ai = GomokuAI(verbose=False, collect_stats=True, **ai_options)
+    try:
+        start = time.perf_counter()
+        value, move = ai.minimax(gameboard, float("-inf"), float("inf"), True, candidates, 0,
+                                 depth, depth)
+        elapsed = time.perf_counter() - start
+        tt_stats = ai.transposition_table.stats()
+    finally:
+        ai.close()
+
+    nodes = ai.search_control.nodes
+    return {
+        "name": position["name"],
+        "category": position["category"],
+        "depth": depth,
+        "move": move,
+        "value": value,
+        "time": elapsed,
+        "nodes": nodes,
+        "nps": nodes / elapsed if elapsed else 0.0,
+        "cutoffs": cutoff_stats(ai.search_stats),
+        "tt": tt_stats,
+    }
+
+
+def bench_iterative_deepening(position: dict[str, Any], size: int, depth: int,
+                              ai_options: dict[str, Any]) -> dict[str, Any]:
+    """
+    Runs iterative deepening up to a fixed depth on a position with a fresh AI, which includes
+    the aspiration windows that a single minimax call does not use.
+    :return: Result with the move, node count, time and cutoff statistics
+    """
+    gameboard, candidates = setup_position(position, size)
+    ai = GomokuAI(verbose=False, collect_stats=True, threat_search_time=0, **ai_options)
+    try:
+        start = time.perf_counter()
+        move = ai.iterative_deepening(gameboard, candidates, SearchControl(), max_depth=depth)
+        elapsed = time.perf_counter() - start
+    finally:
+        ai.close()
+
+    nodes = ai.search_control.nodes
+    return {
+        "name": position["name"],
+        "category": position["category"],
+        "depth": depth,
+        "move": move,
+        "time": elapsed,
+        "nodes": nodes,
+        "nps": nodes / elapsed if elapsed else 0.0,
+        "cutoffs": cutoff_stats(ai.search_stats),
+    }
+
+
+def time_per_call(function: Callable[[], Any], calls: int, repeats: int=5) -> float:
+    """
+    Times a function, taking the best of several repeats
+    :return: Nanoseconds per call
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        best = min(best, time.perf_counter() - start)
+    return best / calls * 1e9
+
+
+def bench_micro(position: dict[str, Any], size: int, board_class: type,
+                calls: int) -> dict[str, float]:
+    """
+    Times the board methods the search calls at every node on a middlegame position, and the
+    construction and cloning of boards done for every AI move.
+    :return: Dict of method names and nanoseconds per call
+    """
+    gameboard, candidates = setup_position(position, size, board_class)
+    moves = sorted(candidates)
+    rows = [row for move in moves for row, _ in gameboard.get_rows_containing_move(*move)]
+
+    def get_move_value():
+        for col, row in moves:
+            gameboard.get_move_value(col, row, Marker.AI)
+
+    def get_row_value():
+        for row in rows:
+            gameboard.get_row_value(row)
+
+    def update_candidates():
+        for col, row in moves:
+            for added in gameboard.update_candidates(candidates, col, row):
+                candidates.remove(added)
+            candidates.add((col, row))
+
+    def move_undo():
+        for col, row in moves:
+            gameboard.move(col, row, Marker.AI)
+            gameboard.undo_move()
+
+    return {
+        "get_move_value": time_per_call(get_move_value, calls) / len(moves),
+        "get_row_value": time_per_call(get_row_value, calls) / len(rows),
+        "update_candidates": time_per_call(update_candidates, calls) / len(moves),
+        "move_undo": time_per_call(move_undo, calls) / len(moves),
+        "win_state": time_per_call(gameboard.win_state, calls * len(moves)),
+        "construct": time_per_call(lambda: board_class(size, track_symmetries=True), calls),
+        "clone_board": time_per_call(gameboard.clone_board, calls),
+    }
+
+
+def run_benchmarks(corpus: dict[str, Any], time_limit: float, depth: int, micro_calls: int,
+                   names: Optional[list[str]]=None,
+                   ai_options: Optional[dict[str, Any]]=None,
+                   id_depth: int=0) -> dict[str, Any]:
+    """
+    Runs the search, minimax, iterative deepening and micro benchmarks.
+    :param corpus: Position corpus
+    :param time_limit: Time limit of find_ai_move, 0 skips the search benchmark
+    :param depth: Depth of the fixed depth minimax, 0 skips the minimax benchmark
+    :param micro_calls: Number of calls of each micro benchmark, 0 skips them
+    :param names: Optional names of the positions to run
+    :param ai_options: GomokuAI options
+    :param id_depth: Depth of the fixed depth iterative deepening, 0 skips it
+    :return: Benchmark results
+    """
+    size = corpus["size"]
+    positions = [p for p in corpus["positions"] if names is None or p["name"] in names]
+    ai_options = ai_options or {}
+    results = {
+        "corpus_version": corpus["version"],
+        "python": platform.python_version(),
+        "time_limit": time_limit,
+        "depth": depth,
+        "id_depth": id_depth,
+        "search": [],
+        "minimax": [],
+        "iterative_deepening": [],
+        "micro": {},
+    }
+
+    for position in positions:
+        if time_limit > 0:
+            results["search"].append(bench_search(position, size, time_limit, ai_options))
+        if depth > 0:
+            results["minimax"].append(bench_minimax(position, size, depth, ai_options))
+        if id_depth > 0:
+            results["iterative_deepening"].append(
+                bench_iterative_deepening(position, size, id_depth, ai_options))
+
+    if micro_calls > 0:
+        micro_position = next(p for p in corpus["positions"] if p["name"] == MICRO_POSITION)
+        for board_class in (GameBoard, BitBoard):
+            results["micro"][board_class.__name__] = bench_micro(micro_position, size,
+                                                                 board_class, micro_calls)
+    return results
+
+
+def comparable_metrics(results: dict[str, Any]) -> dict[str, tuple[float, bool]]:
+    """
+    Collects the metrics that are compared against a baseline.
+    :param results: Benchmark results
+    :return: Dict of metric names and (value, higher is better) tuples
+    """
+    metrics = {}
+    for result in results["search"]:
+        metrics[f"search/{result['name']}/nps"] = (result["nps"], True)
+        metrics[f"search/{result['name']}/depth"] = (result["depth"], True)
+    for result in results["minimax"]:
+        metrics[f"minimax/{result['name']}/nodes"] = (result["nodes"], False)
+        metrics[f"minimax/{result['name']}/time"] = (result["time"], False)
+        metrics[f"minimax/{result['name']}/first_move_cutoff_rate"] = (
+            result["cutoffs"]["first_move_cutoff_rate"], True)
+    for result in results.get("iterative_deepening", []):
+        metrics[f"iterative_deepening/{result['name']}/nodes"] = (result["nodes"], False)
+    for board_name, micro in results["micro"].items():
+        for function_name, nanoseconds in micro.items():
+            metrics[f"micro/{board_name}/{function_name}"] = (nanoseconds, False)
+    return metrics
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any],
+            threshold: float) -> list[dict[str, Any]]:
+    """
+    Compares results against a baseline of the same corpus version.
+    :param results: Benchmark results
+    :param baseline: Saved benchmark results
+    :param threshold: Relative change that counts as a regression, e.g. 0.1 for 10%
+    :return: List of regressions with the metric, baseline, current value and relative change
+    """
+    if results["corpus_version"] != baseline["corpus_version"]:
+        raise ValueError(f"Baseline uses corpus version {baseline['corpus_version']}, "
+                         f"results use version {results['corpus_version']}")
+
+    current = comparable_metrics(results)
+    regressions = []
+    for metric, (old, _) in comparable_metrics(baseline).items():
+        if metric not in current or not old:
+            continue
+        new, higher_is_better = current[metric]
+        change = (new - old) / old
+        if (change < -threshold) if higher_is_better else (change > threshold):
+            regressions.append({"metric": metric, "baseline": old, "current": new,
+                                "change": change})
+    return regressions
+
+
+def main(argv: Optional[list[str]]=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks the engine on a fixed position "
+                                                 "corpus.")
+    parser.add_argument("--output", help="File to write the JSON results to, default stdout")
+    parser.add_argument("--baseline", help="Saved results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative change flagged as a regression")
+    parser.add_argument("--time-limit", type=float, default=2.0,
+                        help="Time limit of find_ai_move per position, 0 to skip")
+    parser.add_argument("--depth", type=int, default=3,
+                        help="Depth of the fixed depth minimax, 0 to skip")
+    parser.add_argument("--id-depth", type=int, default=0,
+                        help="Depth of the fixed depth iterative deepening, 0 to skip")
+    parser.add_argument("--option", action="append", default=[],
+                        help="GomokuAI option key=value, e.g. aspiration_window=0")
+    parser.add_argument("--micro-calls", type=int, default=200,
+                        help="Calls per micro benchmark, 0 to skip")
+    parser.add_argument("--positions", help="Comma separated names of the positions to run")
+    parser.add_argument("--corpus", default=CORPUS_PATH, help="Position corpus file")
+    args = parser.parse_args(argv)
+
+    names = args.positions.split(",") if args.positions else None
+    ai_options = {}
+    for option in args.option:
+        key, _, value = option.partition("=")
+        ai_options[key] = ast.literal_eval(value)
+    results = run_benchmarks(load_corpus(args.corpus), args.time_limit, args.depth,
+                             args.micro_calls, names, ai_options, args.id_depth)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            results["regressions"] = compare(results, json.load(file), args.threshold)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    for regression in results.get("regressions", []):
+        print(f"Regression in {regression['metric']}: {regression['baseline']:.6g} -> "
+              f"{regression['current']:.6g} ({regression['change']:+.1%})", file=sys.stderr)
+    return 1 if results.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+from game_board import GameBoard, Marker
+from pattern_table import BITS_TO_CODE
+
+
+class BitBoard(GameBoard):
+    """
+    GameBoard that additionally keeps the stones of both markers as bitboards. Each line of the
+    board (rows, columns and both diagonals) is stored as one int per marker, with bit pos+4 set
+    when the cell at position pos on that line is occupied. The four bit offset keeps the windows
+    around cells near the start of a line from needing negative shifts.
+    """
+    BIT_OFFSET = 4
+
+    _geometry_cache: dict[int, tuple[int, list[tuple]]] = {}
+
+    def __init__(self, size: int, **kwargs):
+        super().__init__(size, **kwargs)
+        self.line_count, self.cell_lines = self.compute_geometry(size)
+        self.lines: list[list[int]] = [[0] * self.line_count for _ in range(3)]
+
+    @classmethod
+    def compute_geometry(cls, size: int) -> tuple[int, list[tuple]]:
+        """
+        Computes the line layout shared by all bitboards of the given size. For every cell the
+        result contains one (line index, bit, win check shift, window shift, window length, move
+        index) tuple per direction. The window is the same -5..5 neighbourhood used by
+        get_rows_containing_move, clipped to the board edges.
+        :param size: Size of the board
+        :return: Number of lines and a list of per-cell line tuples indexed by row*size+col
+        """
+        if size in cls._geometry_cache:
+            return cls._geometry_cache[size]
+
+        lines_per_direction = 2 * size - 1
+        cell_lines = []
+        for row in range(size):
+            for col in range(size):
+                cell = []
+                for d, (dx, dy) in enumerate(cls.DIRECTIONS):
+                    line, pos = cls._line_position(size, d, col, row)
+
+                    lo = 0
+                    while lo > -5 and 0 <= col + (lo-1)*dx < size and 0 <= row + (lo-1)*dy < size:
+                        lo -= 1
+                    hi = 0
+                    while hi < 5 and 0 <= col + (hi+1)*dx < size and 0 <= row + (hi+1)*dy < size:
+                        hi += 1
+
+                    cell.append((d * lines_per_direction + line, 1 << (pos + cls.BIT_OFFSET),
+                                 pos, pos + lo + cls.BIT_OFFSET, hi - lo + 1, -lo))
+                cell_lines.append(tuple(cell))
+
+        geometry = 4 * lines_per_direction, cell_lines
+        cls._geometry_cache[size] = geometry
+        return geometry
+
+    @staticmethod
+    def _line_position(size: int, direction: int, col: int, row: int) -> tuple[int, int]:
+        """
+        Maps a cell to its line within a direction and its position along that line. Positions
+        grow in the same direction as the (dx, dy) steps of DIRECTIONS.
+        :param size: Size of the board
+        :param direction: Index into DIRECTIONS
+        :param col: Column of the board
+        :param row: Row of the board
+        :return: Line index and position on the line
+        """
+        if direction == 0:
+            return col, row
+        if direction == 1:
+            return row, col
+        if direction == 2:
+            return col - row + size - 1, row
+        return col + row, col
+
+    def move(self, col: int, row: int, marker: Marker) -> None:
+        """
+        Places the given marker on the board at (col, row) and sets its bits
+        :param col: Column of the board
+        :param row: Row of the board
+        :param marker: Player or AI marker
+        :return: None
+        """
+        lines = self.lines[marker]
+        for line, bit, _, _, _, _ in self.cell_lines[row*self.size + col]:
+            lines[line] |= bit
+        super().move(col, row, marker)
+
+    def undo_move(self) -> None:
+        """
+        Undoes the latest move and clears its bits
+        :return: None
+        """
+        if self.move_history:
+            col, row = self.move_history[-1]
+            lines = self.lines[self.board[row][col]]
+            for line, bit, _, _, _, _ in self.cell_lines[row*self.size + col]:
+                lines[line] ^= bit
+            super().undo_move()
+
+    def win_state(self) -> bool:
+        """
+        Checks if the latest move created a winning row. The nine cells centred on the move are
+        shifted out of each line and tested for five consecutive set bits.
+        :return: Bool
+        """
+        if not self.move_history:
+            return False
+
+        col, row = self.move_history[-1]
+        lines = self.lines[self.board[row][col]]
+
+        for line, _, win_shift, _, _, _ in self.cell_lines[row*self.size + col]:
+            w = lines[line] >> win_shift & 0x1FF
+            if w & w >> 1 & w >> 2 & w >> 3 & w >> 4:
+                return True
+        return False
+
+    def get_line_codes(self, col: int, row: int) -> list[tuple[int, int, int]]:
+        """
+        Encodes the rows that contain the move (col, row) as base-3 pattern table codes.
+        :param col: Column of the board
+        :param row: Row of the board
+        :return: List of (row code, row length, index of the move) tuples
+        """
+        player_lines = self.lines[Marker.PLAYER]
+        ai_lines = self.lines[Marker.AI]
+        codes = []
+        for line, _, _, shift, length, idx in self.cell_lines[row*self.size + col]:
+            mask = (1 << length) - 1
+            codes.append((BITS_TO_CODE[player_lines[line] >> shift & mask]
+                          + 2*BITS_TO_CODE[ai_lines[line] >> shift & mask], length, idx))
+        return codes
+
+    def clone_board(self):
+        """Creates a copy of the board that can be passed to the AI."""
+        clone = super().clone_board()
+        clone.lines = [l[:] for l in self.lines]
+
+        return clone
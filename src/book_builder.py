@@ -0,0 +1,174 @@
+import argparse
+import json
+import sys
+from typing import Any, Optional
+
+from bitboard import BitBoard
+from game_board import GameBoard, Marker, Move
+from gomoku_ai import GomokuAI
+from opening_book import DEFAULT_BOOK_PATH, BookKeys, write_book
+
+
+# Search values are turned into scores with a logistic curve, an open three scoring about 91%
+SCORE_SCALE = GameBoard.OPEN_THREE
+
+
+def score_from_value(value: float) -> int:
+    """
+    Converts a search value of the side to move into a score in per mille
+    :param value: Search value
+    :return: Score between 0 and 1000
+    """
+    exponent = max(-20.0, min(20.0, -value / SCORE_SCALE))
+    return round(1000 / (1 + 10 ** exponent))
+
+
+class BookBuilder:
+    """
+    Collects book moves from game records and searches. Moves of the same position are merged
+    over all symmetries: their weights add up and their scores are averaged by weight.
+    """
+    def __init__(self, size: int=20, max_stones: int=8):
+        """
+        :param size: Size of the board
+        :param max_stones: Positions with more stones are left out of the book
+        """
+        self.size = size
+        self.max_stones = max_stones
+        self.keys = BookKeys.for_size(size)
+        self.moves: dict[tuple[int, Move], list[int]] = {}
+
+    def add(self, history: list[Move], move: Move, score: int, weight: int=1) -> None:
+        """
+        Adds a move of the side to move after the given moves, which alternate between the sides.
+        :param history: Moves of the position, the last one made by the opponent
+        :param move: Move played in the position
+        :param score: Expected result of the move in per mille
+        :param weight: Weight of the move
+        :return: None
+        """
+        if len(history) > self.max_stones:
+            return
+        stones = ((col, row, (len(history) - i) % 2 == 0) for i, (col, row) in enumerate(history))
+        key, symmetry = self.keys.canonical_key(stones)
+        entry = self.moves.setdefault((key, self.keys.to_canonical(move, symmetry)), [0, 0])
+        entry[0] += score * weight
+        entry[1] += weight
+
+    def add_game(self, moves: list[Move], winner: Optional[int]) -> None:
+        """
+        Adds the opening moves of a finished game.
+        :param moves: Moves of the game, starting with the first player's
+        :param winner: 0 if the first player won, 1 if the second one won, None for a draw
+        :return: None
+        """
+        for ply, move in enumerate(moves[:self.max_stones + 1]):
+            score = 500 if winner is None else 1000 if ply % 2 == winner else 0
+            self.add(moves[:ply], move, score)
+
+    def add_search(self, opening: list[Move], time_limit: float,
+                   ai_options: Optional[dict[str, Any]]=None) -> list[Move]:
+        """
+        Searches the position after the opening moves and adds the moves of its principal
+        variation, each scored with the search value from the view of the side playing it.
+        :param opening: Moves of the position, which alternate between the sides
+        :param time_limit: Time limit of the search
+        :param ai_options: GomokuAI options
+        :return: The principal variation
+        """
+        gameboard = BitBoard(self.size)
+        candidates = set()
+        for ply, (col, row) in enumerate(opening):
+            gameboard.update_candidates(candidates, col, row)
+            marker = Marker.AI if (len(opening) - ply) % 2 == 0 else Marker.PLAYER
+            gameboard.move(col, row, marker)
+
+        # Book searches use all of their time
+        ai = GomokuAI(verbose=False, **{"time_management": False, **(ai_options or {})})
+        try:
+            value = {}
+            move = ai.find_ai_move(gameboard, candidates, time_limit,
+                                   progress=lambda depth, v, best: value.update(value=v))
+            line = ai.principal_variation or [move]
+        finally:
+            ai.close()
+
+        search_value = value.get("value", 0)
+        history = list(opening)
+        for i, move in enumerate(line):
+            self.add(history, move, score_from_value(search_value if i % 2 == 0
+                                                     else -search_value))
+            history.append(move)
+        return line
+
+    def records(self, min_weight: int=1) -> list[tuple[int, Move, int, int]]:
+        """
+        :param min_weight: Moves with a lower weight are left out
+        :return: (canonical key, canonical move, score, weight) tuples
+        """
+        return [(key, move, round(score_sum / weight), weight)
+                for (key, move), (score_sum, weight) in self.moves.items()
+                if weight >= min_weight]
+
+    def write(self, path: str, min_weight: int=1) -> int:
+        return write_book(path, self.size, self.max_stones, self.records(min_weight))
+
+
+def read_games(path: str) -> list[tuple[list[Move], Optional[int]]]:
+    """
+    Reads game records, either the JSON lines printed by the tournament runner or JSON lines of
+    {"moves": [[col, row], ...], "winner": 0, 1 or null} objects.
+    :param path: Path of the game records
+    :return: List of (moves, winner) tuples
+    """
+    games = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "summary" in record:
+                continue
+            record = record.get("game", record)
+            winner = record["winner"]
+            if isinstance(winner, str):
+                winner = 0 if winner == record["black"] else 1
+            games.append(([tuple(move) for move in record["moves"]], winner))
+    return games
+
+
+def main(argv: Optional[list[str]]=None) -> None:
+    parser = argparse.ArgumentParser(description="Builds an opening book from game records "
+                                                 "and deep searches.")
+    parser.add_argument("--output", default=DEFAULT_BOOK_PATH, help="Path of the book")
+    parser.add_argument("--games", action="append", default=[],
+                        help="File of JSON line game records, e.g. tournament output")
+    parser.add_argument("--openings", help="JSON file with a list of openings to search, each a "
+                                           "list of [col, row] moves")
+    parser.add_argument("--search-time", type=float, default=10.0,
+                        help="Time limit of each opening search")
+    parser.add_argument("--size", type=int, default=20, help="Size of the board")
+    parser.add_argument("--max-stones", type=int, default=8,
+                        help="Positions with more stones are left out")
+    parser.add_argument("--min-weight", type=int, default=1,
+                        help="Moves with a lower weight are left out")
+    args = parser.parse_args(argv)
+
+    builder = BookBuilder(args.size, args.max_stones)
+    for path in args.games:
+        for moves, winner in read_games(path):
+            builder.add_game(moves, winner)
+
+    if args.openings:
+        with open(args.openings, encoding="utf-8") as file:
+            openings = [[tuple(move) for move in opening] for opening in json.load(file)]
+        for opening in openings:
+            line = builder.add_search(opening, args.search_time)
+            print(json.dumps({"opening": opening, "line": line}), flush=True)
+
+    count = builder.write(args.output, args.min_weight)
+    print(f"Wrote {count} moves to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
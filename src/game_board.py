@@ -1,5 +1,9 @@
+from dataclasses import dataclass
 from enum import IntEnum
+from typing import Optional, Sequence
+
 from helpers import generate_zobrist_table
+from pattern_table import PatternTable, OFFSETS, POWERS
 
 
 Move = tuple[int, int]
@@ -10,6 +14,21 @@ class Marker(IntEnum):
     AI = 2
 
 
+@dataclass(frozen=True)
+class BoardContext:
+    """
+    Precomputed data shared by every board of one size, built once by GameBoard.get_context.
+    line_cells holds, for every cell indexed by row*size+col, one (cells, index) pair per
+    direction: the (row, col) cells of the -5..5 window around the cell clipped to the board, and
+    the position of the cell within them.
+    """
+    size: int
+    zobrist_table: tuple[tuple[tuple[int, ...], ...], ...]
+    player_patterns: tuple[tuple[str, int], ...]
+    ai_patterns: tuple[tuple[str, int], ...]
+    line_cells: tuple[tuple[tuple[tuple[tuple[int, int], ...], int], ...], ...]
+
+
 class GameBoard:
     WIN_VALUE = 10000000
     OPEN_FOUR = 1000000
@@ -45,6 +64,8 @@ class GameBoard:
         "11": 10
     }
 
+    PATTERN_TABLE = PatternTable(PATTERN_VALUES, OPEN_THREE)
+
     SYMBOLS = {
         Marker.EMPTY: ".",
         Marker.PLAYER: "X",
@@ -54,15 +75,52 @@ class GameBoard:
     CANDIDATE_POSITIONS = [(-1,-1), (1,-1), (-1,1), (1,1), (0,-1), (-1,0), (1,0), (0,1),
                             (-2,-2), (2,-2), (-2,2), (2,2), (0,-2), (-2,0), (2,0), (0,2)]
 
-    def __init__(self, size: int):
+    DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+
+    # Stone count up to which the hashes of the symmetric boards are tracked. Later positions
+    # are almost never symmetric to each other, so tracking stops there.
+    SYMMETRY_MAX_STONES = 12
+
+    _context_cache: dict[int, BoardContext] = {}
+    _symmetry_cache: dict[int, tuple[list[list[Move]], list[list[Move]]]] = {}
+    _neighbour_cache: dict[tuple, tuple[list[Move], list[tuple]]] = {}
+
+    def __init__(self, size: int, candidate_offsets: Optional[Sequence[Move]]=None,
+                 track_symmetries: bool=False):
+        """
+        :param size: Size of the board
+        :param candidate_offsets: (dx, dy) offsets of the cells a move makes candidates,
+                                  defaults to CANDIDATE_POSITIONS. See neighbourhood.
+        :param track_symmetries: Whether the zobrist hashes of the eight rotated and mirrored
+                                 boards are kept up to date in the early game, see
+                                 canonical_hash
+        """
         self.size = size
-        self.board: list[list[Marker]] = [[Marker.EMPTY for _ in range(size)] for _ in range(size)]
+        self.board: list[list[Marker]] = [[Marker.EMPTY] * size for _ in range(size)]
         self.move_history: list[Move] = []
         self.zobrist_hash = 0
-        self.zobrist_table: list[list[list[int]]] = generate_zobrist_table(size)
-        self.player_patterns = self.precompute_player_patterns()
-        self.ai_patterns = self.precompute_ai_patterns()
-
+        context = self.get_context(size)
+        self.context = context
+        self.zobrist_table = context.zobrist_table
+        self.player_patterns = context.player_patterns
+        self.ai_patterns = context.ai_patterns
+        self.line_cells = context.line_cells
+
+        # Candidate moves are the empty cells with a stone within candidate_offsets. The stones
+        # around each cell are counted in neighbour_counts, and the candidates are kept in a
+        # list with the position of each cell in candidate_index, -1 for non-candidates, so that
+        # move and undo_move update them in constant time without allocating.
+        self.candidate_offsets = tuple(candidate_offsets if candidate_offsets is not None
+                                       else self.CANDIDATE_POSITIONS)
+        self.cell_moves, self.neighbours = self.compute_neighbours(size, self.candidate_offsets)
+        self.neighbour_counts = [0] * (size*size)
+        self.candidates: list[Move] = []
+        self.candidate_index = [-1] * (size*size)
+
+        self.symmetry_hashes: list[int] | None = None
+        if track_symmetries:
+            self.symmetry_moves, self.inverse_moves = self.compute_symmetries(size)
+            self.symmetry_hashes = [0] * 8
 
     def __str__(self) -> str:
         board = "    "
@@ -86,6 +144,9 @@ class GameBoard:
         self.board[row][col] = marker
         self.move_history.append((col, row))
         self.update_hash(col, row, marker)
+        if self.symmetry_hashes is not None and len(self.move_history) <= self.SYMMETRY_MAX_STONES:
+            self.update_symmetry_hashes(col, row, marker)
+        self.add_neighbours(col, row)
 
     def undo_move(self) -> None:
         """
@@ -97,7 +158,11 @@ class GameBoard:
             marker = self.board[row][col]
             self.move_history.pop()
             self.update_hash(col, row, marker)
+            if (self.symmetry_hashes is not None
+                    and len(self.move_history) < self.SYMMETRY_MAX_STONES):
+                self.update_symmetry_hashes(col, row, marker)
             self.board[row][col] = Marker.EMPTY
+            self.remove_neighbours(col, row)
 
     def win_state(self) -> bool:
         """
@@ -139,24 +204,18 @@ class GameBoard:
         calculating the initial value of the rows that contain the move without the marker.
         The same is repeated for all the rows, but this time with the marker placed at (col, row).
         The end result is the value with the marker placed subtracted by the value without it.
+        Both row values are read from the precomputed pattern table.
         :param col: Column of the board
         :param row: Row of the board
         :param marker: Player or AI marker
         :return: Heuristic value of the move
         """
-        rows = self.get_rows_containing_move(col, row)
-
-        current_value = 0
-        for r, _ in rows:
-            current_value += self.get_row_value(r)
-
-        new_value = 0
-        marker = int(marker)
-        for r, idx in rows:
-            r[idx] = marker
-            new_value += self.get_row_value(r)
-
-        return new_value - current_value
+        table = self.PATTERN_TABLE.table
+        value = 0
+        for code, length, idx in self.get_line_codes(col, row):
+            index = OFFSETS[length] + code
+            value += table[index + marker*POWERS[idx]] - table[index]
+        return value
 
     def get_rows_containing_move(self, col: int, row: int) -> list[tuple[list[int], int]]:
         """
@@ -165,52 +224,60 @@ class GameBoard:
         :param row: Row of the board
         :return: List of rows and the index of the move
         """
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
-        rows = []
+        board = self.board
+        return [([board[r][c] for r, c in cells], index)
+                for cells, index in self.line_cells[row*self.size + col]]
 
-        for dx, dy in directions:
-            current_row = []
-            mv_index = 0
-
-            for i in range(-5, 6):
-                if i == 0:
-                    mv_index = len(current_row)
-                c = col + i*dx
-                r = row + i*dy
-                if not self.valid_coordinate(c, r):
-                    continue
-                current_row.append(self.board[r][c])
-            rows.append((current_row, mv_index))
-        return rows
+    def get_line_codes(self, col: int, row: int) -> list[tuple[int, int, int]]:
+        """
+        Encodes the rows that contain the move (col, row) as base-3 pattern table codes.
+        :param col: Column of the board
+        :param row: Row of the board
+        :return: List of (row code, row length, index of the move) tuples
+        """
+        codes = []
+        for r, idx in self.get_rows_containing_move(col, row):
+            code = 0
+            for n in reversed(r):
+                code = code * 3 + n
+            codes.append((code, len(r), idx))
+        return codes
+
+    @classmethod
+    def get_context(cls, size: int) -> BoardContext:
+        """
+        Returns the context shared by the boards of the given size, computing it on first use.
+        :param size: Size of the board
+        :return: BoardContext
+        """
+        if size in cls._context_cache:
+            return cls._context_cache[size]
+
+        zobrist_table = tuple(tuple(tuple(keys) for keys in row)
+                              for row in generate_zobrist_table(size))
+        line_cells = []
+        for row in range(size):
+            for col in range(size):
+                directions = []
+                for dx, dy in cls.DIRECTIONS:
+                    steps = [i for i in range(-5, 6)
+                             if 0 <= col + i*dx < size and 0 <= row + i*dy < size]
+                    directions.append((tuple((row + i*dy, col + i*dx) for i in steps),
+                                       steps.index(0)))
+                line_cells.append(tuple(directions))
+
+        context = BoardContext(size, zobrist_table, tuple(cls.precompute_player_patterns()),
+                               tuple(cls.precompute_ai_patterns()), tuple(line_cells))
+        cls._context_cache[size] = context
+        return context
 
     def get_row_value(self, row: list[int]) -> int:
         """
         Computes the value of the given row
-        :param row: List of empty, player and AI markers
+        :param row: List of empty, player and AI markers, at most 11 cells long
         :return: Heuristic value of the given row
         """
-        row = "".join(str(n) for n in row)
-
-        if "11" not in row and "101" not in row and "22" not in row and "202" not in row:
-            return 0
-
-        player_value = 0
-        ai_value = 0
-
-        for pattern, value in self.player_patterns:
-            if pattern in row:
-                player_value = value
-                break
-
-        for pattern, value in self.ai_patterns:
-            if pattern in row:
-                ai_value = value
-                break
-
-        if player_value >= self.OPEN_THREE:
-            return ai_value - int(player_value*4)
-        else:
-            return ai_value - int(player_value)
+        return self.PATTERN_TABLE.row_value(row)
 
     def valid_move(self, col: int, row: int) -> bool:
         """
@@ -254,7 +321,7 @@ class GameBoard:
 
         new_candidates = []
 
-        for dx, dy in GameBoard.CANDIDATE_POSITIONS:
+        for dx, dy in self.candidate_offsets:
             mv_col = col + dx
             mv_row = row + dy
 
@@ -267,6 +334,111 @@ class GameBoard:
 
         return new_candidates
 
+    @staticmethod
+    def neighbourhood(radius: int, shape: str="lines") -> list[Move]:
+        """
+        Generates candidate offsets for the candidate_offsets argument.
+        :param radius: Largest distance of a candidate from the stone
+        :param shape: "lines" for the cells on the eight lines through the stone, like
+                      CANDIDATE_POSITIONS for radius 2, or "square" for every cell within the
+                      Chebyshev distance
+        :return: List of (dx, dy) offsets
+        """
+        if shape == "lines":
+            return [(dx*d, dy*d) for d in range(1, radius + 1)
+                    for dx, dy in ((-1,-1), (1,-1), (-1,1), (1,1), (0,-1), (-1,0), (1,0), (0,1))]
+        if shape == "square":
+            return [(dx, dy) for dy in range(-radius, radius + 1)
+                    for dx in range(-radius, radius + 1) if dx or dy]
+        raise ValueError(f"Unknown neighbourhood shape: {shape}")
+
+    @classmethod
+    def compute_neighbours(cls, size: int,
+                           offsets: tuple[Move, ...]) -> tuple[list[Move], list[tuple]]:
+        """
+        Computes the cells within the candidate offsets of every cell, shared by all boards of
+        the same size and offsets.
+        :param size: Size of the board
+        :param offsets: (dx, dy) offsets of the neighbourhood
+        :return: List of the (col, row) moves of the cells and list of per-cell tuples of
+                 neighbouring (cell, col, row) tuples, both indexed by row*size+col
+        """
+        key = (size, offsets)
+        if key in cls._neighbour_cache:
+            return cls._neighbour_cache[key]
+
+        cell_moves = [(col, row) for row in range(size) for col in range(size)]
+        neighbours = []
+        for col, row in cell_moves:
+            cells = []
+            for dx, dy in offsets:
+                c = col + dx
+                r = row + dy
+                if 0 <= c < size and 0 <= r < size:
+                    cells.append((r*size + c, c, r))
+            neighbours.append(tuple(cells))
+
+        cls._neighbour_cache[key] = cell_moves, neighbours
+        return cell_moves, neighbours
+
+    def add_neighbours(self, col: int, row: int) -> None:
+        """
+        Updates the candidates after a stone has been placed at (col, row): the cell stops being
+        a candidate and the empty cells around it become candidates.
+        :param col: Column of the board
+        :param row: Row of the board
+        :return: None
+        """
+        size = self.size
+        board = self.board
+        counts = self.neighbour_counts
+        index = self.candidate_index
+        candidates = self.candidates
+        cell = row*size + col
+
+        i = index[cell]
+        if i >= 0:
+            last = candidates.pop()
+            if i < len(candidates):
+                candidates[i] = last
+                index[last[1]*size + last[0]] = i
+            index[cell] = -1
+
+        cell_moves = self.cell_moves
+        for n, c, r in self.neighbours[cell]:
+            counts[n] += 1
+            if index[n] < 0 and not board[r][c]:
+                index[n] = len(candidates)
+                candidates.append(cell_moves[n])
+
+    def remove_neighbours(self, col: int, row: int) -> None:
+        """
+        Reverts add_neighbours after the stone at (col, row) has been removed.
+        :param col: Column of the board
+        :param row: Row of the board
+        :return: None
+        """
+        size = self.size
+        counts = self.neighbour_counts
+        index = self.candidate_index
+        candidates = self.candidates
+
+        for n, _, _ in self.neighbours[row*size + col]:
+            counts[n] -= 1
+            if not counts[n]:
+                i = index[n]
+                if i >= 0:
+                    last = candidates.pop()
+                    if i < len(candidates):
+                        candidates[i] = last
+                        index[last[1]*size + last[0]] = i
+                    index[n] = -1
+
+        cell = row*size + col
+        if counts[cell]:
+            index[cell] = len(candidates)
+            candidates.append(self.cell_moves[cell])
+
     def get_distance_to_prev_move(self, col: int, row: int) -> int:
         """
         Computes the Chebyshev distance between the latest move and a given move
@@ -289,26 +461,100 @@ class GameBoard:
         """
         self.zobrist_hash ^= self.zobrist_table[row][col][marker]
 
-    def precompute_player_patterns(self) -> list[tuple[str, int]]:
+    @classmethod
+    def compute_symmetries(cls, size: int) -> tuple[list[list[Move]], list[list[Move]]]:
+        """
+        Computes where every cell goes under the eight rotations and reflections of the board.
+        The first symmetry is the identity.
+        :param size: Size of the board
+        :return: Lists of the transformed and inversely transformed (col, row) moves for each
+                 symmetry, indexed by row*size+col
+        """
+        if size in cls._symmetry_cache:
+            return cls._symmetry_cache[size]
+
+        last = size - 1
+        transforms = [
+            lambda c, r: (c, r),
+            lambda c, r: (last - r, c),
+            lambda c, r: (last - c, last - r),
+            lambda c, r: (r, last - c),
+            lambda c, r: (last - c, r),
+            lambda c, r: (c, last - r),
+            lambda c, r: (r, c),
+            lambda c, r: (last - r, last - c),
+        ]
+        symmetries = []
+        inverses = []
+        for transform in transforms:
+            forward = [transform(c, r) for r in range(size) for c in range(size)]
+            inverse: list[Move] = [(0, 0)] * (size * size)
+            for cell, (c, r) in enumerate(forward):
+                inverse[r*size + c] = (cell % size, cell // size)
+            symmetries.append(forward)
+            inverses.append(inverse)
+
+        cls._symmetry_cache[size] = symmetries, inverses
+        return symmetries, inverses
+
+    def update_symmetry_hashes(self, col: int, row: int, marker: Marker) -> None:
+        """
+        Toggles a marker at (col, row) in the hashes of the eight symmetric boards.
+        :param col: Column of the board
+        :param row: Row of the board
+        :param marker: Player or AI marker
+        :return: None
+        """
+        hashes = self.symmetry_hashes
+        table = self.zobrist_table
+        cell = row*self.size + col
+        for s, moves in enumerate(self.symmetry_moves):
+            c, r = moves[cell]
+            hashes[s] ^= table[r][c][marker]
+
+    def canonical_hash(self) -> tuple[int, int]:
+        """
+        Gives the same hash for all rotations and reflections of a position: the smallest of the
+        hashes of the eight symmetric boards. Without symmetry tracking, or once the position has
+        more than SYMMETRY_MAX_STONES stones, this is the zobrist hash.
+        :return: Hash and the index of the symmetry that maps the board onto the canonical one
+        """
+        hashes = self.symmetry_hashes
+        if hashes is None or len(self.move_history) > self.SYMMETRY_MAX_STONES:
+            return self.zobrist_hash, 0
+        key = min(hashes)
+        return key, hashes.index(key)
+
+    def to_canonical(self, move: Move, symmetry: int) -> Move:
+        col, row = move
+        return self.symmetry_moves[symmetry][row*self.size + col]
+
+    def from_canonical(self, move: Move, symmetry: int) -> Move:
+        col, row = move
+        return self.inverse_moves[symmetry][row*self.size + col]
+
+    @classmethod
+    def precompute_player_patterns(cls) -> list[tuple[str, int]]:
         """
         Precomputes the patterns for identifying useful row states for the player.
         :return: List of (pattern, value) tuples
         """
         patterns = []
-        for p, v in self.PATTERN_VALUES.items():
+        for p, v in cls.PATTERN_VALUES.items():
             patterns.append((p, v))
         patterns.sort(key=lambda x: x[1], reverse=True)
 
         return patterns
 
-    def precompute_ai_patterns(self) -> list[tuple[str, int]]:
+    @classmethod
+    def precompute_ai_patterns(cls) -> list[tuple[str, int]]:
         """
         Precomputes the patterns for identifying useful row states for the AI.
         :return: List of (pattern, value) tuples
         """
         flip = {"0": "0", "1": "2", "2": "1"}
         patterns = []
-        for p, v in self.PATTERN_VALUES.items():
+        for p, v in cls.PATTERN_VALUES.items():
             flipped_pattern = "".join([flip[c] for c in p])
             patterns.append((flipped_pattern, v))
         patterns.sort(key=lambda x: x[1], reverse=True)
@@ -316,13 +562,19 @@ class GameBoard:
         return patterns
 
     def clone_board(self):
-        """Creates a copy of the board that can be passed to the AI."""
-        clone = GameBoard(self.size)
+        """
+        Creates a copy of the board that can be passed to the AI. The copy shares the context and
+        the other precomputed tables with the board, and only the state changed by moves is
+        copied.
+        """
+        clone = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
         clone.board = [r[:] for r in self.board]
         clone.move_history = self.move_history[:]
-        clone.zobrist_hash = self.zobrist_hash
-        clone.zobrist_table = self.zobrist_table
-        clone.player_patterns = self.player_patterns
-        clone.ai_patterns = self.ai_patterns
+        clone.neighbour_counts = self.neighbour_counts[:]
+        clone.candidates = self.candidates[:]
+        clone.candidate_index = self.candidate_index[:]
+        if self.symmetry_hashes is not None:
+            clone.symmetry_hashes = self.symmetry_hashes[:]
 
         return clone
@@ -0,0 +1,545 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Any, Optional
+
+from bitboard import BitBoard
+from game_board import Marker, Move
+from gomoku_ai import GomokuAI
+from time_manager import GameClock, TimeManager
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str,
+                 headers: Optional[dict[str, str]]=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+@dataclass
+class GameSession:
+    """
+    Game of one user. The session is busy while the AI searches its move, and accepts no moves
+    until the search returns. With a clock, the AI's time comes from the clock instead of the
+    time limit of the moves.
+    """
+    id: str
+    client: str
+    gameboard: BitBoard
+    time_limit: float
+    player_starts: bool
+    result: Optional[str] = None
+    clock: Optional[GameClock] = None
+    busy: bool = False
+    last_active: float = field(default_factory=time.monotonic)
+
+    def state(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "size": self.gameboard.size,
+            "player_starts": self.player_starts,
+            "moves": self.gameboard.move_history,
+            "result": self.result,
+            "clock": self.clock.time_left if self.clock is not None else None,
+        }
+
+
+class FairQueue:
+    """
+    Bounded queue that serves its keys in turn. Items of one key are served in order, and a key
+    with many queued items waits for every other key with items before getting its next one.
+    """
+    def __init__(self, maxsize: int):
+        """
+        :param maxsize: Number of queued items after which put fails
+        """
+        self.maxsize = maxsize
+        self.queues: dict[str, deque] = {}
+        self.order: deque[str] = deque()
+        self.size = 0
+        self.available = asyncio.Condition()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def full(self) -> bool:
+        return self.size >= self.maxsize
+
+    async def put(self, key: str, item: Any) -> None:
+        """
+        Queues an item.
+        :param key: Key the item is served fairly by, e.g. the client
+        :param item: Item to queue
+        :return: None
+        """
+        if self.full():
+            raise asyncio.QueueFull
+        if key not in self.queues:
+            self.queues[key] = deque()
+            self.order.append(key)
+        self.queues[key].append(item)
+        self.size += 1
+        async with self.available:
+            self.available.notify()
+
+    async def get(self) -> Any:
+        """
+        Waits for an item and returns the oldest item of the next key in turn.
+        :return: Item
+        """
+        async with self.available:
+            await self.available.wait_for(lambda: self.size > 0)
+        key = self.order.popleft()
+        items = self.queues[key]
+        item = items.popleft()
+        if items:
+            self.order.append(key)
+        else:
+            del self.queues[key]
+        self.size -= 1
+        return item
+
+
+@dataclass
+class SearchJob:
+    session: GameSession
+    deadline: float
+    enqueued: float
+    future: asyncio.Future
+    # Time the search aims to finish at, None for the default share of the time limit
+    optimum_deadline: Optional[float] = None
+
+
+# AIs of a pool process by whether the player starts, each shared by the sessions of that
+# colour. The transposition table is keyed by the stones only, so the side to move of a position
+# is only the same in games where the same side starts.
+_worker_ais: dict[bool, GomokuAI] = {}
+_worker_ai_options: dict[str, Any] = {}
+
+
+def _init_worker(ai_options: dict[str, Any]) -> None:
+    _worker_ai_options.update(ai_options)
+
+
+def search_move(size: int, moves: list[tuple[int, int, int]], time_limit: float,
+                player_starts: bool, optimum: Optional[float]=None) -> Move:
+    """
+    Searches the AI's move in a pool process. The board is rebuilt from the moves, since
+    sending moves is cheaper than pickling a board.
+    :param size: Size of the board
+    :param moves: (col, row, marker) moves of the game
+    :param time_limit: Time limit of the search
+    :param player_starts: Whether the player started the game
+    :param optimum: Time the search aims at, see TimeManager
+    :return: The best move for the AI, or the fallback move if the search was stopped before
+             completing its first iteration, as happens with short budgets under load
+    """
+    gameboard = BitBoard(size, track_symmetries=True)
+    for col, row, marker in moves:
+        gameboard.move(col, row, Marker(marker))
+    time_manager = TimeManager(time_limit, optimum) if optimum is not None else None
+    ai = _worker_ais.get(player_starts)
+    if ai is None:
+        ai = _worker_ais[player_starts] = GomokuAI(verbose=False, **_worker_ai_options)
+    candidates = set(gameboard.candidates)
+    move = ai.find_ai_move(gameboard, candidates, time_limit, time_manager=time_manager)
+    if move is None or not gameboard.valid_move(*move):
+        move = GomokuAI.fallback_move(gameboard, candidates)
+    return move
+
+
+class SearchPool:
+    """
+    Runs find_ai_move on a pool of processes. Searches wait in a FairQueue keyed by client, and
+    one dispatcher per process hands them to the pool, so at most one search runs per process.
+    A full queue rejects new searches, which the server reports as 503 so that clients back off.
+
+    Each search gets the time left of its budget when it leaves the queue, so the time spent
+    waiting counts against the budget of the request.
+    """
+    MIN_SEARCH_TIME = 0.05
+    LATENCY_SAMPLES = 1000
+
+    def __init__(self, workers: Optional[int]=None, max_queue: int=64,
+                 ai_options: Optional[dict[str, Any]]=None):
+        """
+        :param workers: Number of search processes, defaults to the number of CPUs
+        :param max_queue: Number of waiting searches after which new searches are rejected
+        :param ai_options: GomokuAI options of the search processes
+        """
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        self.workers = workers
+        self.queue = FairQueue(max_queue)
+        self.executor = ProcessPoolExecutor(max_workers=workers,
+                                            mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=_init_worker,
+                                            initargs=(ai_options or {},))
+        self.dispatchers: list[asyncio.Task] = []
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_latencies: deque[float] = deque(maxlen=self.LATENCY_SAMPLES)
+
+    def start(self) -> None:
+        self.dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+
+    async def close(self) -> None:
+        for dispatcher in self.dispatchers:
+            dispatcher.cancel()
+        await asyncio.gather(*self.dispatchers, return_exceptions=True)
+        self.executor.shutdown(cancel_futures=True)
+
+    async def search(self, session: GameSession, time_budget: float,
+                     optimum: Optional[float]=None) -> Move:
+        """
+        Queues a search of the session's position and waits for its move.
+        :param session: Session whose AI is to move
+        :param time_budget: Time in seconds from now until the move is due
+        :param optimum: Time in seconds from now the search aims to finish at, defaults to the
+                        share of the time budget the search takes when its move is settled
+        :return: The best move for the AI
+        """
+        now = time.monotonic()
+        job = SearchJob(session, now + time_budget, now,
+                        asyncio.get_running_loop().create_future(),
+                        now + optimum if optimum is not None else None)
+        try:
+            await self.queue.put(session.client, job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "search queue is full",
+                            {"Retry-After": "1"}) from None
+        return await job.future
+
+    async def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            if job.future.cancelled():
+                continue
+            now = time.monotonic()
+            self.queue_latencies.append(now - job.enqueued)
+            time_limit = max(self.MIN_SEARCH_TIME, job.deadline - now)
+            optimum = None
+            if job.optimum_deadline is not None:
+                optimum = max(self.MIN_SEARCH_TIME, job.optimum_deadline - now)
+            gameboard = job.session.gameboard
+            moves = [(col, row, gameboard.board[row][col]) for col, row in gameboard.move_history]
+            self.in_flight += 1
+            try:
+                move = await loop.run_in_executor(self.executor, search_move, gameboard.size,
+                                                  moves, time_limit, job.session.player_starts,
+                                                  optimum)
+            except Exception as error:
+                if not job.future.done():
+                    job.future.set_exception(error)
+            else:
+                if not job.future.done():
+                    job.future.set_result(move)
+                self.completed += 1
+            finally:
+                self.in_flight -= 1
+
+    def stats(self) -> dict[str, Any]:
+        latencies = sorted(self.queue_latencies)
+        def percentile(p: float) -> float:
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else 0.0
+        return {
+            "workers": self.workers,
+            "queued": len(self.queue),
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_latency": {
+                "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": latencies[-1] if latencies else 0.0,
+            },
+        }
+
+
+class GameServer:
+    """
+    HTTP service holding many game sessions in memory. Requests and responses are JSON:
+
+    POST /games                {"size", "player_starts", "time_limit", "clock"} creates a game,
+                               clock being {"time", "increment"} in seconds
+    GET /games/<id>            returns the state of a game
+    POST /games/<id>/moves     {"move": [col, row], "time_limit"} plays the player's move and
+                               returns the AI's reply in ai_move
+    DELETE /games/<id>         ends a game
+    GET /stats                 reports the sessions, the search queue and its latency
+
+    Sessions idle for longer than session_ttl are dropped when new games are created.
+    """
+    MAX_BODY_BYTES = 65536
+
+    def __init__(self, pool: SearchPool, max_sessions: int=10000, default_time_limit: float=1.0,
+                 max_time_limit: float=10.0, session_ttl: float=3600.0):
+        """
+        :param pool: SearchPool searching the AI's moves
+        :param max_sessions: Number of sessions after which new games are rejected
+        :param default_time_limit: Time budget of a move when the game does not give one
+        :param max_time_limit: Largest accepted time budget of a move
+        :param session_ttl: Seconds after which an idle session is dropped
+        """
+        self.pool = pool
+        self.max_sessions = max_sessions
+        self.default_time_limit = default_time_limit
+        self.max_time_limit = max_time_limit
+        self.session_ttl = session_ttl
+        self.sessions: dict[str, GameSession] = {}
+        self.server: Optional[asyncio.Server] = None
+
+    async def start(self, host: str="127.0.0.1", port: int=8080) -> int:
+        """
+        Starts the pool and listens for connections.
+        :return: Port the server listens on, useful with port 0
+        """
+        self.pool.start()
+        self.server = await asyncio.start_server(self._handle_connection, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.pool.close()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter) -> None:
+        client = writer.get_extra_info("peername")
+        client = str(client[0]) if client else "local"
+        try:
+            keep_alive = True
+            while keep_alive:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                    length = int(headers.get("content-length", 0))
+                    if length > self.MAX_BODY_BYTES:
+                        keep_alive = False
+                        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "body too large")
+                    body = await reader.readexactly(length) if length else b""
+                    status, response = await self.route(method, path, body,
+                                                        headers.get("x-client", client))
+                    extra_headers = {}
+                except HTTPError as error:
+                    status, response = error.status, {"error": error.message}
+                    extra_headers = error.headers
+                except ValueError:
+                    status, response = HTTPStatus.BAD_REQUEST, {"error": "malformed request"}
+                    extra_headers = {}
+                    keep_alive = False
+                except Exception as error:
+                    status, response = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(error)}
+                    extra_headers = {}
+                self._write_response(writer, status, response, extra_headers, keep_alive)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: HTTPStatus, response: Any,
+                        extra_headers: dict[str, str], keep_alive: bool) -> None:
+        body = json.dumps(response).encode()
+        headers = {"Content-Type": "application/json", "Content-Length": str(len(body)),
+                   "Connection": "keep-alive" if keep_alive else "close", **extra_headers}
+        head = f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        writer.write(head.encode("latin-1") + b"\r\n" + body)
+
+    async def route(self, method: str, path: str, body: bytes,
+                    client: str) -> tuple[HTTPStatus, Any]:
+        """
+        Answers one request.
+        :param method: HTTP method
+        :param path: Request path
+        :param body: JSON request body, may be empty
+        :param client: Client the searches of new games are queued fairly by
+        :return: Status and JSON response
+        """
+        data = json.loads(body) if body else {}
+        if not isinstance(data, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "the body must be a JSON object")
+        parts = path.strip("/").split("/")
+        if parts == ["stats"] and method == "GET":
+            return HTTPStatus.OK, self.stats()
+        if parts == ["games"] and method == "POST":
+            return HTTPStatus.CREATED, await self.create_game(data, client)
+        if len(parts) >= 2 and parts[0] == "games":
+            session = self.sessions.get(parts[1])
+            if session is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"no game {parts[1]}")
+            if len(parts) == 2 and method == "GET":
+                return HTTPStatus.OK, session.state()
+            if len(parts) == 2 and method == "DELETE":
+                del self.sessions[session.id]
+                return HTTPStatus.OK, {"id": session.id}
+            if parts[2:] == ["moves"] and method == "POST":
+                return HTTPStatus.OK, await self.play(session, data)
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"no route {method} {path}")
+
+    def _time_budget(self, data: dict[str, Any], default: float) -> float:
+        try:
+            time_limit = float(data.get("time_limit", default))
+        except (TypeError, ValueError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "time_limit must be a number") from None
+        return min(max(time_limit, 0.0), self.max_time_limit)
+
+    @staticmethod
+    def _clock(data: dict[str, Any]) -> Optional[GameClock]:
+        clock = data.get("clock")
+        if clock is None:
+            return None
+        try:
+            time_left = float(clock["time"])
+            increment = float(clock.get("increment", 0.0))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST,
+                            "clock must be {\"time\": seconds, \"increment\": seconds}") from None
+        if time_left <= 0 or increment < 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "clock times must be positive")
+        return GameClock(time_left, increment)
+
+    async def create_game(self, data: dict[str, Any], client: str) -> dict[str, Any]:
+        now = time.monotonic()
+        for session in list(self.sessions.values()):
+            if not session.busy and now - session.last_active > self.session_ttl:
+                del self.sessions[session.id]
+        if len(self.sessions) >= self.max_sessions:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "too many games",
+                            {"Retry-After": "10"})
+        size = data.get("size", 20)
+        if not isinstance(size, int) or not 5 <= size <= 63:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "size must be an integer from 5 to 63")
+        session = GameSession(uuid.uuid4().hex, client, BitBoard(size, track_symmetries=True),
+                              self._time_budget(data, self.default_time_limit),
+                              bool(data.get("player_starts", True)), clock=self._clock(data))
+        self.sessions[session.id] = session
+        if not session.player_starts:
+            try:
+                await self._ai_move(session, session.time_limit)
+            except Exception:
+                del self.sessions[session.id]
+                raise
+        return session.state()
+
+    async def play(self, session: GameSession, data: dict[str, Any]) -> dict[str, Any]:
+        if session.busy:
+            raise HTTPError(HTTPStatus.CONFLICT, "the AI is still searching its move")
+        if session.result is not None:
+            raise HTTPError(HTTPStatus.CONFLICT, "the game is over")
+        try:
+            col, row = (int(value) for value in data["move"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "move must be [col, row]") from None
+        gameboard = session.gameboard
+        if not gameboard.valid_move(col, row):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"invalid move [{col}, {row}]")
+
+        time_budget = self._time_budget(data, session.time_limit)
+        gameboard.move(col, row, Marker.PLAYER)
+        ai_move = None
+        if gameboard.win_state():
+            session.result = "player"
+        elif not gameboard.candidates:
+            session.result = "draw"
+        else:
+            try:
+                ai_move = await self._ai_move(session, time_budget)
+            except Exception:
+                gameboard.undo_move()
+                raise
+        session.last_active = time.monotonic()
+        return {**session.state(), "ai_move": ai_move}
+
+    async def _ai_move(self, session: GameSession, time_budget: float) -> Move:
+        """
+        Searches the AI's move on the pool and plays it. A game with a clock plans the time of
+        the move from the clock and charges it the time of the request.
+        :return: The AI's move
+        """
+        start = time.monotonic()
+        optimum = None
+        if session.clock is not None:
+            time_manager = session.clock.time_manager(max_turn_time=self.max_time_limit)
+            time_budget, optimum = time_manager.maximum, time_manager.optimum
+        session.busy = True
+        try:
+            col, row = await self.pool.search(session, time_budget, optimum)
+        finally:
+            session.busy = False
+        if session.clock is not None:
+            session.clock.consume(time.monotonic() - start)
+        gameboard = session.gameboard
+        gameboard.move(col, row, Marker.AI)
+        if gameboard.win_state():
+            session.result = "ai"
+        elif not gameboard.candidates:
+            session.result = "draw"
+        return col, row
+
+    def stats(self) -> dict[str, Any]:
+        return {"sessions": len(self.sessions), **self.pool.stats()}
+
+
+async def serve(host: str, port: int, pool: SearchPool, **options) -> None:
+    server = GameServer(pool, **options)
+    port = await server.start(host, port)
+    print(f"Serving games on http://{host}:{port}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main(argv: Optional[list[str]]=None) -> None:
+    parser = argparse.ArgumentParser(description="Serves gomoku games against the AI over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of search processes, defaults to the number of CPUs")
+    parser.add_argument("--max-queue", type=int, default=64,
+                        help="Waiting searches after which moves are rejected with 503")
+    parser.add_argument("--max-sessions", type=int, default=10000, help="Number of open games")
+    parser.add_argument("--time-limit", type=float, default=1.0,
+                        help="Default time budget of a move")
+    parser.add_argument("--max-time-limit", type=float, default=10.0,
+                        help="Largest time budget a game may ask for")
+    parser.add_argument("--tt-size-mb", type=float, default=16.0,
+                        help="Transposition table size of each AI, a search process keeps "
+                             "one for either starting side")
+    args = parser.parse_args(argv)
+
+    pool = SearchPool(args.workers, args.max_queue, {"tt_size_mb": args.tt_size_mb})
+    try:
+        asyncio.run(serve(args.host, args.port, pool, max_sessions=args.max_sessions,
+                          default_time_limit=args.time_limit,
+                          max_time_limit=args.max_time_limit))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,23 @@
-from game_board import GameBoard, Marker, Move
-from gomoku_ai import GomokuAI
+from bitboard import BitBoard
+from game_board import Marker, Move
 from pygame_ui import PygameUI
+from search_worker import SearchWorker
 
 
 class Gomoku:
-    def __init__(self, size: int=20, player_starts: bool=True):
+    def __init__(self, size: int=20, player_starts: bool=True, ai_workers: int=1):
         self.size = size
         self.ui = PygameUI(size)
         self.player_starts = player_starts
+        self.ai = SearchWorker(size, workers=ai_workers)
         self._reset()
 
     def _reset(self) -> None:
         """
         Resets the game board state to its initial state.
         """
-        self.gameboard = GameBoard(self.size)
-        self.ai = GomokuAI()
+        self.gameboard = BitBoard(self.size, track_symmetries=True)
+        self.ai.new_game()
         self.candidates: set[Move] = set()
         self.players_turn = self.player_starts
         self.ui.set_starting_player(self.player_starts)
@@ -35,12 +37,11 @@ class Gomoku:
                     self.gameboard.move(col, row, Marker.PLAYER)
 
                 else:
-                    board_copy = self.gameboard.clone_board()
-                    candidates_copy = self.candidates.copy()
-                    col, row = self.ui.get_ai_move(board_copy, self.ai, candidates_copy)
+                    col, row = self.ui.get_ai_move(self.gameboard, self.ai, self.candidates)
                     self.gameboard.move(col, row, Marker.AI)
 
                 if self.gameboard.win_state():
+                    self.ai.stop_pondering()
                     winner = Marker.PLAYER if self.players_turn else Marker.AI
                     restart_game = self.ui.show_winner(self.gameboard, winner)
 
@@ -62,4 +63,6 @@ class Gomoku:
                     print(f"AI chose: ({chr(ord("A")+ai_col)}, {ai_row})\n")
                     print(self.gameboard)
                 self.players_turn = not self.players_turn
+                if self.players_turn:
+                    self.ai.start_pondering(self.gameboard, self.candidates)
                 print(f"history: {self.gameboard.move_history}")
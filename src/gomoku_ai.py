@@ -1,8 +1,19 @@
+import random
+import threading
 import time
-from typing import Optional
+from typing import Callable, Collection, Optional
 
+from analysis_cache import AnalysisCache
+from batch_evaluator import HAS_NUMPY, create_batch_evaluator
 from game_board import GameBoard, Marker, Move
-from helpers import function_call_counter
+from move_ordering import MoveOrdering, OrderingWeights
+from opening_book import OpeningBook
+from parallel_search import ParallelSearch
+from search_control import SearchControl
+from search_stats import SearchStats
+from threat_search import ThreatSearch
+from time_manager import TimeManager
+from transposition_table import TranspositionTable
 
 
 class GomokuAI:
@@ -10,87 +21,585 @@ class GomokuAI:
     TT_LOWER_BOUND = 1
     TT_UPPER_BOUND = 2
 
-    def __init__(self):
-        self.transposition_table = {}
+    # Nodes evaluating their moves in one batch with NumPy besides the root. A batch costs about
+    # as much as six single evaluations, so it only pays off where most moves get searched.
+    BATCH_MIN_DEPTH = 2
+    BATCH_MIN_MOVES = 24
+
+    # Moves after the first one are searched with a null window from this depth on
+    PVS_MIN_DEPTH = 3
+
+    # Aspiration windows are widened this many times by ASPIRATION_GROWTH before falling back
+    # to the full window
+    ASPIRATION_STAGES = 3
+    ASPIRATION_GROWTH = 4
+
+    def __init__(self, tt_size_mb: float=16.0, workers: int=1,
+                 transposition_table: Optional[TranspositionTable]=None,
+                 ordering_seed: Optional[int]=None, verbose: bool=True,
+                 threat_search_time: float=0.5, collect_stats: bool=False,
+                 ordering_weights: Optional[OrderingWeights]=None,
+                 batch_evaluation: bool=True, opening_book: Optional[OpeningBook]=None,
+                 analysis_cache: Optional[AnalysisCache]=None,
+                 aspiration_window: float=GameBoard.OPEN_THREE, time_management: bool=True):
+        """
+        :param tt_size_mb: Memory budget of the transposition table in megabytes
+        :param workers: Number of processes used for searching. With more than one, the search
+                        runs as a lazy SMP search sharing the transposition table.
+        :param transposition_table: Transposition table to use instead of creating a new one
+        :param ordering_seed: Seed for breaking move ordering ties randomly, used for making
+                              lazy SMP helpers search in different orders
+        :param verbose: Whether search progress is printed
+        :param threat_search_time: Time slice for searching forced wins before minimax. At most a
+                                   fifth of the turn is used, 0 disables the threat search.
+        :param collect_stats: Whether every search fills in a SearchStats, left in search_stats
+        :param ordering_weights: Weights of the move ordering, defaults to OrderingWeights()
+        :param batch_evaluation: Whether the root evaluates all its moves up front for ordering
+                                 them. With NumPy installed, wide nodes evaluate their moves in
+                                 one batch as well.
+        :param opening_book: Optional opening book, whose moves are played without searching
+        :param analysis_cache: Optional persistent cache, consulted when the transposition table
+                               misses a node of at least its minimum depth and updated with the
+                               results of those nodes
+        :param aspiration_window: Half width of the root window around the value of the previous
+                                  iteration of the same parity, 0 searches every iteration with
+                                  the full window
+        :param time_management: Whether a TimeManager decides when iterative deepening stops,
+                                by default aiming at half of the turn time limit. False searches
+                                until the time limit runs out.
+        """
+        self.parallel_search = None
+        if transposition_table is not None:
+            self.transposition_table = transposition_table
+        elif workers > 1:
+            self.parallel_search = ParallelSearch(type(self), workers, tt_size_mb)
+            self.transposition_table = self.parallel_search.transposition_table
+        else:
+            self.transposition_table = TranspositionTable(tt_size_mb)
+        self.search_control = SearchControl()
         self.best_move_before_timeout = None
-        self.history_table = {}
+        self.principal_variation = []
+        ordering_rng = random.Random(ordering_seed) if ordering_seed is not None else None
+        self.move_ordering = MoveOrdering(ordering_weights, ordering_rng)
+        self.search_stones = 0
+        self.batch_evaluation = batch_evaluation
+        self.batch_evaluator = None
+        self.verbose = verbose
+        self.threat_search_time = threat_search_time
+        self.collect_stats = collect_stats
+        self.search_stats = SearchStats() if collect_stats else None
+        self.opening_book = opening_book
+        self.analysis_cache = analysis_cache
+        self.aspiration_window = aspiration_window
+        self.time_management = time_management
+
+        self.ponder_thread = None
+        self.ponder_control = None
+        self.ponder_key = None
+        self.ponder_start_time = 0.0
+        self.ponder_time_manager = None
+        self.ponder_result = []
+        # Iterations the ponder search completed, and the progress callback of the turn after a
+        # ponder hit, guarded by ponder_lock
+        self.ponder_lock = threading.Lock()
+        self.ponder_iterations = []
+        self.ponder_progress = None
 
     def find_ai_move(self, gameboard: GameBoard, candidates: set[Move],
-                     turn_time_limit=10.0) -> Move:
+                     turn_time_limit=10.0, control: Optional[SearchControl]=None,
+                     progress: Optional[Callable[[int, float, Move], None]]=None,
+                     time_manager: Optional[TimeManager]=None) -> Move:
         """
         Initiates the minimax with alpha-beta pruning
         :param gameboard: Instance of GameBoard
         :param candidates: Set of candidate moves
         :param turn_time_limit: Time limit for the AI's turn
+        :param control: Optional search control for stopping the search from another thread.
+                        A stopped search returns the best move found so far.
+        :param progress: Optional callback called with the depth, value and best move of every
+                         completed iteration of this process
+        :param time_manager: Optional time manager of the turn, e.g. one for a game clock. Its
+                             maximum limits the search as well. By default the turn time limit
+                             is the maximum if time management is on.
+        :return: The best move for the AI. After a ponder hit, the ponder search gives the move
+                 and reports its iterations to progress.
+        """
+        if time_manager is None and self.time_management:
+            time_manager = TimeManager(turn_time_limit)
+        if self.ponder_thread is not None:
+            if self.ponder_key == gameboard.zobrist_hash:
+                return self._finish_pondering(gameboard, candidates, turn_time_limit, control,
+                                              progress, time_manager)
+            self.stop_pondering()
+        return self._search(gameboard, candidates, turn_time_limit, control, progress,
+                            time_manager)
+
+    def _search(self, gameboard: GameBoard, candidates: set[Move], turn_time_limit: float,
+                control: Optional[SearchControl],
+                progress: Optional[Callable[[int, float, Move], None]]=None,
+                time_manager: Optional[TimeManager]=None) -> Move:
+        if control is None:
+            control = SearchControl()
+        control.set_time_limit(turn_time_limit)
+        if time_manager is not None:
+            control.set_time_limit(time_manager.maximum, time_manager.start_time)
+        self.search_control = control
+        self.transposition_table.new_search()
+
+        if self.opening_book is not None:
+            book_move = self.opening_book.choose(gameboard, Marker.AI)
+            if book_move is not None:
+                self._log(f"Book move: {book_move}")
+                self.principal_variation = [book_move]
+                return book_move
+
+        if self.threat_search_time > 0 and candidates:
+            threat_time = min(self.threat_search_time, turn_time_limit / 5)
+            forced_move = self.find_forced_move(gameboard, threat_time / 2)
+            if forced_move is not None:
+                self.principal_variation = [forced_move]
+                return forced_move
+            defences = self.find_defences(gameboard, threat_time / 2)
+            if defences is not None:
+                candidates = defences
+
+        if self.parallel_search is not None:
+            return self.parallel_search.search(self, gameboard, candidates, control, progress,
+                                               time_manager)
+        return self.iterative_deepening(gameboard, candidates, control, progress=progress,
+                                        time_manager=time_manager)
+
+    def stop(self) -> None:
+        """
+        Stops the running search, which then returns its best move so far. Safe to call from
+        other threads.
+        :return: None
+        """
+        self.search_control.stop()
+
+    def start_pondering(self, gameboard: GameBoard, candidates: set[Move]) -> bool:
+        """
+        Starts searching on the player's time. The player's expected reply is taken from the
+        principal variation of the last search, or from the transposition table, and the position
+        after it is searched in a background thread without a time limit. If the player makes
+        the expected move, find_ai_move continues that search instead of starting over. Otherwise
+        the ponder search is stopped, but its transposition table entries stay useful.
+        :param gameboard: Instance of GameBoard, with the player to move. It is not modified.
+        :param candidates: Set of candidate moves of the position
+        :return: True if pondering was started
+        """
+        self.stop_pondering()
+        reply = self._predict_reply(gameboard)
+        if reply is None or not gameboard.valid_move(*reply):
+            return False
+
+        ponder_board = gameboard.clone_board()
+        ponder_candidates = candidates.copy()
+        ponder_board.update_candidates(ponder_candidates, *reply)
+        ponder_board.move(*reply, Marker.PLAYER)
+        if ponder_board.win_state():
+            return False
+
+        self.ponder_key = ponder_board.zobrist_hash
+        self.ponder_control = SearchControl()
+        self.ponder_start_time = time.time()
+        # Without a limit until the ponder hit gives the limits of the turn
+        self.ponder_time_manager = TimeManager(float("inf"), start_time=self.ponder_start_time)
+        self.ponder_result = []
+        self.ponder_iterations = []
+        self.ponder_progress = None
+        self.ponder_thread = threading.Thread(target=self._ponder, daemon=True,
+                                              args=(ponder_board, ponder_candidates,
+                                                    self.ponder_control, self.ponder_result))
+        self.ponder_thread.start()
+        self._log(f"Pondering on player move {reply}")
+        return True
+
+    def stop_pondering(self) -> None:
+        """
+        Stops the ponder search and waits for it to return.
+        :return: None
+        """
+        if self.ponder_thread is not None:
+            self.ponder_control.stop()
+            self.ponder_thread.join()
+            self.ponder_thread = None
+            self.ponder_control = None
+            self.ponder_key = None
+            self.ponder_time_manager = None
+
+    def _ponder(self, gameboard: GameBoard, candidates: set[Move], control: SearchControl,
+                result: list[Move]) -> None:
+        result.append(self._search(gameboard, candidates, float("inf"), control,
+                                   self._ponder_iteration, self.ponder_time_manager))
+
+    def _ponder_iteration(self, depth: int, value: float, move: Move) -> None:
+        """
+        Records a completed iteration of the ponder search and passes it on to the progress
+        callback of the turn once there is one.
+        """
+        with self.ponder_lock:
+            self.ponder_iterations.append((depth, value, move))
+            progress = self.ponder_progress
+        if progress is not None:
+            progress(depth, value, move)
+
+    def _predict_reply(self, gameboard: GameBoard) -> Optional[Move]:
+        """
+        Predicts the player's next move.
+        :param gameboard: Instance of GameBoard with the player to move
+        :return: The expected move or None if there is no prediction
+        """
+        pv = self.principal_variation
+        if (len(pv) > 1 and gameboard.move_history
+                and pv[0] == gameboard.move_history[-1]):
+            return pv[1]
+        tt_entry = self.probe(gameboard)
+        return tt_entry[1] if tt_entry is not None else None
+
+    def _finish_pondering(self, gameboard: GameBoard, candidates: set[Move],
+                          turn_time_limit: float, control: Optional[SearchControl],
+                          progress: Optional[Callable[[int, float, Move], None]]=None,
+                          time_manager: Optional[TimeManager]=None) -> Move:
+        """
+        Turns the ponder search into the search of the turn after a ponder hit. The time spent
+        pondering counts towards the turn, so a long enough ponder answers right away. If the
+        ponder search ends without a valid move, the turn is searched normally.
+        :param gameboard: Instance of GameBoard, the position the ponder search searches
+        :param candidates: Set of candidate moves
+        :param turn_time_limit: Time limit for the AI's turn
+        :param control: Optional search control of the caller, which also stops the ponder search
+        :param progress: Optional callback, which gets the iterations completed while pondering
+                         and then every further one
+        :param time_manager: Optional time manager of the turn, whose limits the ponder search
+                             takes over
+        :return: The best move for the AI
+        """
+        self._log("Ponder hit")
+        if progress is not None:
+            # Replayed under the lock, so that the ponder thread reports later iterations after
+            # these
+            with self.ponder_lock:
+                self.ponder_progress = progress
+                for iteration in self.ponder_iterations:
+                    progress(*iteration)
+        ponder_control = self.ponder_control
+        ponder_control.set_time_limit(turn_time_limit, self.ponder_start_time)
+        if control is not None:
+            ponder_control.set_time_limit(control.remaining())
+        if time_manager is not None:
+            ponder_control.set_time_limit(time_manager.maximum, self.ponder_start_time)
+            self.ponder_time_manager.set_limits(time_manager.maximum, time_manager.optimum)
+        else:
+            self.ponder_time_manager.set_limits(turn_time_limit, turn_time_limit)
+        while self.ponder_thread.is_alive():
+            if control is not None and control.event.is_set():
+                ponder_control.stop()
+            self.ponder_thread.join(0.01)
+
+        self.ponder_thread = None
+        self.ponder_control = None
+        self.ponder_key = None
+        self.ponder_time_manager = None
+        self.ponder_progress = None
+        move = self.ponder_result[0] if self.ponder_result else None
+        if move is None or not gameboard.valid_move(*move):
+            self._log("Ponder search ended without a move, searching the turn")
+            return self._search(gameboard, candidates, turn_time_limit, control, progress,
+                                time_manager)
+        return move
+
+    def find_forced_move(self, gameboard: GameBoard, time_limit: float) -> Optional[Move]:
+        """
+        Runs the threat-space search for the AI. A forced win of the AI is played right away.
+        :param gameboard: Instance of GameBoard
+        :param time_limit: Time limit of the search
+        :return: The first move of the forced win or None if none was found
+        """
+        ai_line = ThreatSearch(gameboard, time_limit, self.search_control).find_win(Marker.AI)
+        if ai_line is not None:
+            self._log(f"Forced win found: {ai_line}")
+            return ai_line[0]
+        return None
+
+    def find_defences(self, gameboard: GameBoard, time_limit: float) -> Optional[set[Move]]:
+        """
+        Runs the threat-space search for the player and collects the moves that may stop a
+        forced win: the cells of the winning line, the cells stopping its first threat and the
+        AI's own fours. The moves after which the player still has a forced win are left out,
+        unless that leaves none or the time runs out, so that minimax picks among the defences.
+        :param gameboard: Instance of GameBoard
+        :param time_limit: Time limit for the searches together
+        :return: Set of defending moves or None if the player has no forced win
+        """
+        deadline = time.time() + time_limit
+        search = ThreatSearch(gameboard, time_limit, self.search_control)
+        player_line = search.find_win(Marker.PLAYER)
+        if player_line is None:
+            return None
+
+        defences = set(player_line)
+        threat = search.classify(*player_line[0], Marker.PLAYER, True)
+        if threat is not None:
+            defences.update(threat[1] | threat[2])
+        defences.update(move for move, fives, _ in search.find_threats(Marker.AI, False)
+                        if fives)
+        defences = {move for move in defences if gameboard.valid_move(*move)}
+
+        holding = set()
+        for move in sorted(defences):
+            gameboard.move(*move, Marker.AI)
+            line = ThreatSearch(gameboard, deadline - time.time(),
+                                self.search_control).find_win(Marker.PLAYER)
+            gameboard.undo_move()
+            if time.time() >= deadline:
+                # A search cut short finds no win, so it does not tell the move holds
+                holding = set()
+                break
+            if line is None:
+                holding.add(move)
+        self._log(f"Defending forced win of the player {player_line} with "
+                  f"{sorted(holding or defences)}")
+        return holding or defences
+
+    def iterative_deepening(self, gameboard: GameBoard, candidates: set[Move],
+                            control: SearchControl, start_depth: int=1,
+                            progress: Optional[Callable[[int, float, Move], None]]=None,
+                            max_depth: int=49,
+                            time_manager: Optional[TimeManager]=None) -> Move:
+        """
+        Runs minimax with increasing depths until the search control stops it. The principal
+        variation of the last iteration is left in principal_variation.
+
+        Iterations search an aspiration window around the value of the last iteration of the same
+        parity, since the value swings between odd and even depths. When the value falls outside
+        the window, the failing side is widened in stages and the iteration searched again.
+        :param gameboard: Instance of GameBoard
+        :param candidates: Set of candidate moves
+        :param control: Search control holding the deadline and the stop event
+        :param start_depth: Depth of the first iteration
+        :param progress: Optional callback called with the depth, value and best move of every
+                         completed iteration
+        :param max_depth: Depth of the last iteration
+        :param time_manager: Optional time manager, which may end the search after an iteration
+                             instead of starting one that would not finish in time
         :return: The best move for the AI
         """
         best_move = None
-        alpha = float('-inf')
-        beta = float('inf')
 
-        start_time = time.time()
+        self.search_control = control
         candidates_copy = candidates.copy()
-        self.history_table = {}
+        stones = len(gameboard.move_history)
+        self.move_ordering.new_search(max(0, stones - self.search_stones))
+        self.search_stones = stones
+        self.principal_variation = []
+        stats = self.search_stats = SearchStats() if self.collect_stats else None
+        tt = self.transposition_table
+        tt_probes, tt_hits = tt.probes, tt.hits
+        values = {}
 
         if not candidates_copy:
-            return 9, 9
-
-        for depth in range (1,50):
-            try:
-                GomokuAI.minimax.calls = 0
-                self.best_move_before_timeout = None
-
+            return (gameboard.size - 1) // 2, (gameboard.size - 1) // 2
+
+        for depth in range(start_depth, max_depth + 1):
+            self.best_move_before_timeout = None
+            iteration_start = time.perf_counter()
+            iteration_nodes = control.nodes
+
+            alpha = float('-inf')
+            beta = float('inf')
+            window = self.aspiration_window
+            previous = values.get(depth - 2, values.get(depth - 1))
+            if window and previous is not None and abs(previous) < gameboard.WIN_VALUE / 2:
+                alpha = previous - window
+                beta = previous + window
+
+            stage = 0
+            while True:
                 value, move = self.minimax(gameboard, alpha, beta, True, candidates_copy,
-                                           0, depth, start_time, turn_time_limit,
-                                           depth)
-
-                best_move = move
-                print(f"Depth: {depth} done, best move: {best_move}, minimax calls: {GomokuAI.minimax.calls}")
-
-                if value >= gameboard.OPEN_FOUR * 0.8:
-                    print(f"Open four found, value: {value} move: {best_move}")
+                                           0, depth, depth)
+                fail_low = alpha != float('-inf') and value <= alpha
+                fail_high = beta != float('inf') and value >= beta
+                if control.stopped or not (fail_low or fail_high):
                     break
-
-            except Timeout:
+                stage += 1
+                window *= self.ASPIRATION_GROWTH
+                if fail_low:
+                    alpha = value - window if stage < self.ASPIRATION_STAGES else float('-inf')
+                else:
+                    beta = value + window if stage < self.ASPIRATION_STAGES else float('inf')
+                if stats is not None:
+                    stats.aspiration_researches += 1
+
+            iteration_nodes = control.nodes - iteration_nodes
+            if control.stopped:
                 if self.best_move_before_timeout:
                     best_move = self.best_move_before_timeout
-                print(f"Depth {depth} timed out, best move: {best_move}, minimax calls: {GomokuAI.minimax.calls}")
+                    self.principal_variation = self._get_principal_variation(gameboard, best_move,
+                                                                             depth)
+                if stats is not None:
+                    stats.add_iteration(depth, time.perf_counter() - iteration_start,
+                                        iteration_nodes, None, best_move, False)
+                self._log(f"Depth {depth} stopped, best move: {best_move}, "
+                          f"nodes: {iteration_nodes}")
                 break
 
+            values[depth] = value
+            best_move = move
+            self.principal_variation = self._get_principal_variation(gameboard, best_move, depth)
+            if stats is not None:
+                stats.add_iteration(depth, time.perf_counter() - iteration_start,
+                                    iteration_nodes, value, best_move, True)
+            if progress is not None:
+                progress(depth, value, best_move)
+            self._log(f"Depth: {depth} done, best move: {best_move}, nodes: {iteration_nodes}")
+
+            if value >= gameboard.OPEN_FOUR * 0.8:
+                self._log(f"Open four found, value: {value} move: {best_move}")
+                break
+            if (time_manager is not None and not time_manager.iteration_completed(
+                    depth, time.perf_counter() - iteration_start, value, best_move)):
+                self._log(f"Depth {depth + 1} skipped, predicted to exceed the time target")
+                break
+
+        if stats is not None:
+            stats.nodes = sum(it["nodes"] for it in stats.iterations)
+            stats.tt_probes = tt.probes - tt_probes
+            stats.tt_hits = tt.hits - tt_hits
         return best_move
 
-    @function_call_counter
+    def _get_batch_evaluator(self, gameboard: GameBoard):
+        if self.batch_evaluator is None or self.batch_evaluator.size != gameboard.size:
+            self.batch_evaluator = create_batch_evaluator(gameboard.size)
+        return self.batch_evaluator
+
+    def _get_principal_variation(self, gameboard: GameBoard, first_move: Move,
+                                 max_length: int) -> list[Move]:
+        """
+        Follows the best moves stored in the transposition table from the root.
+        :param gameboard: Instance of GameBoard, restored before returning
+        :param first_move: Best move of the root
+        :param max_length: Maximum length of the variation
+        :return: List of moves starting with first_move
+        """
+        line = [first_move]
+        marker = Marker.AI
+        gameboard.move(*first_move, marker)
+        while len(line) < max_length and not gameboard.win_state():
+            tt_entry = self.probe(gameboard)
+            if tt_entry is None or tt_entry[1] is None or not gameboard.valid_move(*tt_entry[1]):
+                break
+            marker = Marker.PLAYER if marker == Marker.AI else Marker.AI
+            gameboard.move(*tt_entry[1], marker)
+            line.append(tt_entry[1])
+        for _ in line:
+            gameboard.undo_move()
+        return line
+
+    def probe(self, gameboard: GameBoard,
+              node_value: float=0) -> Optional[tuple[float, Optional[Move], int, int]]:
+        """
+        Looks up the position in the transposition table. Boards tracking their symmetries are
+        looked up by their canonical hash, so rotated and mirrored positions share entries, and
+        the stored move is mapped back onto the board.
+
+        Search values are relative to the root of the search, so the table stores them relative
+        to the heuristic value of the node instead. Entries of earlier turns then stay valid.
+        :param gameboard: Instance of GameBoard
+        :param node_value: Heuristic value of the position in the current search
+        :return: (value, best move, depth, flag) tuple or None if the position is not stored
+        """
+        key, symmetry = gameboard.canonical_hash()
+        tt_entry = self.transposition_table.probe(key)
+        if tt_entry is None:
+            return None
+        value, move, depth, flag = tt_entry
+        if symmetry and move is not None:
+            move = gameboard.from_canonical(move, symmetry)
+        return value + node_value, move, depth, flag
+
+    def store(self, gameboard: GameBoard, value: float, node_value: float, move: Optional[Move],
+              depth: int, flag: int) -> None:
+        """
+        Stores a search result in the transposition table, under the canonical hash and relative
+        to the node value like probe.
+        :return: None
+        """
+        key, symmetry = gameboard.canonical_hash()
+        if symmetry and move is not None:
+            move = gameboard.to_canonical(move, symmetry)
+        self.transposition_table.store(key, value - node_value, move, depth, flag)
+
+    @staticmethod
+    def fallback_move(gameboard: GameBoard, candidates: Collection[Move]) -> Move:
+        """
+        Picks a move without searching, for when a search is stopped before completing its
+        first iteration and returns None. The move is the candidate worth the most to both
+        sides, which also blocks the opponent's strongest threat. Like at the root of minimax,
+        the values for both sides count by their size, since the player's are negative.
+        :param gameboard: Instance of GameBoard
+        :param candidates: Candidate moves
+        :return: The candidate with the largest value for the AI and the player together, or the
+                 centre of an empty board
+        """
+        if not candidates:
+            return (gameboard.size - 1) // 2, (gameboard.size - 1) // 2
+        return max(candidates, key=lambda m: abs(gameboard.get_move_value(*m, Marker.AI))
+                                             + abs(gameboard.get_move_value(*m, Marker.PLAYER)))
+
+    def close(self) -> None:
+        """
+        Stops pondering and the helper processes of a parallel search.
+        :return: None
+        """
+        self.stop_pondering()
+        if self.parallel_search is not None:
+            self.parallel_search.close()
+            self.parallel_search = None
+
+    def _log(self, message: str) -> None:
+        if self.verbose:
+            print(message)
+
     def minimax(self, gameboard: GameBoard, alpha: float, beta: float, maximizing: bool,
-                candidates: set[Move], parent_value: int, depth: int, start_time: float,
-                turn_time_limit: float, root_depth: int | None=None) -> tuple[int, Move | None]:
+                candidates: Collection[Move], parent_value: int, depth: int,
+                root_depth: int | None=None) -> tuple[int, Move | None]:
         """
         Minimax algorithm
         :param gameboard: Instance of GameBoard
         :param alpha: The alpha value used in alpha-beta pruning
         :param beta: The beta value used in alpha-beta pruning
         :param maximizing: Boolean toggle for minimax's max_value and min_value computation
-        :param candidates: List of candidate moves
+        :param candidates: Candidate moves of the node. The root gets the candidates of the
+                           caller and the deeper nodes the candidates kept by the board.
         :param parent_value: Heuristic value of the game state prior to trying the candidate moves
         :param depth: The depth remaining in the minimax search
-        :param start_time: Starting time for the search
-        :param turn_time_limit: Maximum time that the AI can take to determine the best move
         :param root_depth: The depth the search was initially started with
-        :return:
+        :return: Value and best move. Once the search control is stopped, the result is
+                 meaningless and the callers return without using it.
         """
-        if time.time() - start_time >= turn_time_limit:
-            raise Timeout()
+        control = self.search_control
+        stats = self.search_stats
+        control.nodes += 1
+        if control.stopped or (not control.nodes & control.poll_mask and control.poll()):
+            return parent_value, None
 
         alpha_orig = alpha
         beta_orig = beta
 
         prev_best_move = None
-        tt_entry = self.transposition_table.get(gameboard.zobrist_hash)
+        tt_entry = self.probe(gameboard, parent_value)
+        cache = self.analysis_cache
+        if tt_entry is None and cache is not None and depth >= cache.min_depth:
+            tt_entry = cache.probe(gameboard.zobrist_hash, parent_value, maximizing)
         if tt_entry:
             prev_value, prev_move, prev_depth, flag = tt_entry
             prev_best_move = prev_move
 
             if prev_depth >= depth:
                 if flag == self.TT_EXACT:
+                    if stats is not None:
+                        stats.tt_cutoffs += 1
                     return prev_value, prev_move
                 elif flag == self.TT_LOWER_BOUND:
                     alpha = max(alpha, prev_value)
@@ -98,6 +607,8 @@ class GomokuAI:
                     beta = min(beta, prev_value)
 
                 if alpha >= beta:
+                    if stats is not None:
+                        stats.tt_cutoffs += 1
                     return prev_value, prev_move
 
         if gameboard.win_state():
@@ -107,41 +618,63 @@ class GomokuAI:
             return parent_value, None
 
         marker = Marker.AI if maximizing else Marker.PLAYER
-        ordered_moves = self._get_ordered_moves(gameboard, candidates, prev_best_move)
+        if root_depth is None:
+            root_depth = depth
+        ply = root_depth - depth
+        ordered_moves = self.move_ordering.order(gameboard, candidates, prev_best_move, ply,
+                                                 marker)
+        move_values = None
+        if self.batch_evaluation and (ply == 0 or (HAS_NUMPY and depth >= self.BATCH_MIN_DEPTH
+                                                   and len(ordered_moves) >= self.BATCH_MIN_MOVES)):
+            move_values = self._get_batch_evaluator(gameboard).move_values(gameboard,
+                                                                           ordered_moves, marker)
+            if ply == 0:
+                # Root moves after the TT move are ordered by their own value plus the value of
+                # the cell for the opponent, which also puts blocks first
+                other = Marker.PLAYER if maximizing else Marker.AI
+                block_values = self.batch_evaluator.move_values(gameboard, ordered_moves, other)
+                scored = sorted(zip(ordered_moves, move_values, block_values),
+                                key=lambda t: (t[0] == prev_best_move,
+                                               abs(t[1]) + abs(t[2])), reverse=True)
+                ordered_moves = [t[0] for t in scored]
+                move_values = [t[1] for t in scored]
+        # The children search the candidates the board keeps up to date on every move
+        children = gameboard.candidates
         best_move = None
         if maximizing:
             best_value = float('-inf')
             for i, move in enumerate(ordered_moves):
                 col, row = move
-                value_delta = gameboard.get_move_value(col, row, marker)
+                if move_values is None:
+                    value_delta = gameboard.get_move_value(col, row, marker)
+                else:
+                    value_delta = move_values[i]
                 new_value = parent_value + value_delta
 
                 if value_delta >= gameboard.WIN_VALUE:
                     return new_value, move
 
-                new_candidates = gameboard.update_candidates(candidates, col, row)
                 gameboard.move(col, row, marker)
 
-                try:
-                    if i == 0 or depth < 4:
-                        value, _ = self.minimax(gameboard, alpha, beta, not maximizing, candidates,
-                                            new_value, depth - 1, start_time, turn_time_limit,
-                                            root_depth)
-                    else:
-                        value, _ = self.minimax(gameboard, alpha, alpha+1, not maximizing, candidates,
-                                                new_value, depth - 1, start_time, turn_time_limit,
-                                                root_depth)
-
-                        if alpha < value < beta:
-                            value, _ = self.minimax(gameboard, alpha, beta, not maximizing,
-                                                    candidates, new_value, depth - 1, start_time,
-                                                    turn_time_limit, root_depth)
-
-                finally:
-                    gameboard.undo_move()
-                    for new_candidate in new_candidates:
-                        candidates.remove(new_candidate)
-                    candidates.add(move)
+                if i == 0 or depth < self.PVS_MIN_DEPTH:
+                    value, _ = self.minimax(gameboard, alpha, beta, not maximizing, children,
+                                            new_value, depth - 1, root_depth)
+                else:
+                    value, _ = self.minimax(gameboard, alpha, alpha+1, not maximizing, children,
+                                            new_value, depth - 1, root_depth)
+                    if stats is not None:
+                        stats.null_window_searches += 1
+
+                    if alpha < value < beta and not control.stopped:
+                        if stats is not None:
+                            stats.researches += 1
+                        value, _ = self.minimax(gameboard, alpha, beta, not maximizing,
+                                                children, new_value, depth - 1, root_depth)
+
+                gameboard.undo_move()
+
+                if control.stopped:
+                    return best_value, best_move
 
                 if value > best_value:
                     best_value = value
@@ -153,31 +686,45 @@ class GomokuAI:
                 alpha = max(alpha, best_value)
 
                 if alpha >= beta:
-                    self.history_table[best_move] = self.history_table.get(best_move, 0) + 2**depth
+                    self.move_ordering.record_cutoff(gameboard, best_move, ply, depth, marker)
+                    if stats is not None:
+                        stats.add_cutoff(i)
                     break
 
         else:
             best_value = float('inf')
-            for move in ordered_moves:
+            for i, move in enumerate(ordered_moves):
                 col, row = move
-                value_delta = gameboard.get_move_value(col, row, marker)
+                if move_values is None:
+                    value_delta = gameboard.get_move_value(col, row, marker)
+                else:
+                    value_delta = move_values[i]
                 new_value = parent_value + value_delta
 
                 if value_delta <= -gameboard.WIN_VALUE:
                     return new_value, move
 
-                new_candidates = gameboard.update_candidates(candidates, col, row)
                 gameboard.move(col, row, marker)
 
-                try:
-                    value, _ = self.minimax(gameboard, alpha, beta, not maximizing, candidates,
-                                            new_value, depth - 1, start_time, turn_time_limit,
-                                            root_depth)
-                finally:
-                    gameboard.undo_move()
-                    for new_candidate in new_candidates:
-                        candidates.remove(new_candidate)
-                    candidates.add(move)
+                if i == 0 or depth < self.PVS_MIN_DEPTH:
+                    value, _ = self.minimax(gameboard, alpha, beta, not maximizing, children,
+                                            new_value, depth - 1, root_depth)
+                else:
+                    value, _ = self.minimax(gameboard, beta-1, beta, not maximizing, children,
+                                            new_value, depth - 1, root_depth)
+                    if stats is not None:
+                        stats.null_window_searches += 1
+
+                    if alpha < value < beta and not control.stopped:
+                        if stats is not None:
+                            stats.researches += 1
+                        value, _ = self.minimax(gameboard, alpha, beta, not maximizing,
+                                                children, new_value, depth - 1, root_depth)
+
+                gameboard.undo_move()
+
+                if control.stopped:
+                    return best_value, best_move
 
                 if value < best_value:
                     best_value = value
@@ -185,7 +732,9 @@ class GomokuAI:
                 beta = min(beta, best_value)
 
                 if alpha >= beta:
-                    self.history_table[best_move] = self.history_table.get(best_move, 0) + 2**depth
+                    self.move_ordering.record_cutoff(gameboard, best_move, ply, depth, marker)
+                    if stats is not None:
+                        stats.add_cutoff(i)
                     break
 
         if best_value <= alpha_orig:
@@ -195,36 +744,9 @@ class GomokuAI:
         else:
             tt_flag = self.TT_EXACT
 
-        self.transposition_table[gameboard.zobrist_hash] = best_value, best_move, depth, tt_flag
+        self.store(gameboard, best_value, parent_value, best_move, depth, tt_flag)
+        if cache is not None:
+            cache.store(gameboard.zobrist_hash, best_value, parent_value, best_move, depth, tt_flag,
+                        maximizing)
 
         return best_value, best_move
-
-    def _get_ordered_moves(self, gameboard: GameBoard, candidates: set[Move],
-                           prev_best_move: Optional[Move]) -> list[Move]:
-        """
-        Generates the move ordering based on
-            1) The previous best move stored in TT
-            2) Historical value of moves. The value is based on the amount of alpha-beta cutoffs
-               the move caused.
-            3) Distance from the previous move.
-        :param gameboard: Instance of GameBoard
-        :param candidates: Set of candidate moves
-        :param prev_best_move: The best move from the previous search
-        :return:
-        """
-        sorted_candidates = []
-        for move in candidates:
-            col, row = move
-            is_prev_best = move == prev_best_move
-            mv_historical_value = self.history_table.get(move, 0)
-            mv_distance = gameboard.get_distance_to_prev_move(col, row)
-            sorted_candidates.append((move, is_prev_best, mv_historical_value, mv_distance))
-
-        sorted_candidates.sort(key=lambda x: (x[1], x[2], -x[3]), reverse=True)
-        ordered_moves = [m[0] for m in sorted_candidates]
-
-        return ordered_moves
-
-
-class Timeout(Exception):
-    pass
@@ -1,24 +1,16 @@
-from random import getrandbits
-
-def function_call_counter(func):
-    """
-    Used for calculating the number of times a function has been called
-    :param func: Function to be called
-    :return: Wrapper function
-    """
-    def wrapper(*args, **kwargs):
-        wrapper.calls += 1
-        return func(*args, **kwargs)
-    wrapper.calls = 0
-    return wrapper
+from random import Random
 
+# Fixed seed, so that the hashes of a position are the same in every process and every run
+ZOBRIST_SEED = 0x5A0B21C7
 
-def generate_zobrist_table(size):
+def generate_zobrist_table(size, seed=ZOBRIST_SEED):
     """
     Generates a zobrist table for the unique combinations of moves and players
     :param size: Size of the board
+    :param seed: Seed of the random keys
     :return: 3d list of 64 bit values for each move and player combination
     """
+    getrandbits = Random(seed).getrandbits
     table = [[[0 for _ in range(3)] for _ in range(size)] for _ in range(size)]
 
     for row in range(size):
@@ -28,6 +20,15 @@ def generate_zobrist_table(size):
 
     return table
 
+def generate_side_to_move_key(seed=ZOBRIST_SEED):
+    """
+    Generates the key hashed into positions where the player is to move, so that the same stones
+    with the other side to move get a different hash
+    :param seed: Seed of the random keys
+    :return: 64 bit key
+    """
+    return Random(f"side to move {seed}").getrandbits(64)
+
 def char_to_number(char):
     """
     Converts a character into an integer
@@ -0,0 +1,232 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import time
+from typing import Any, Optional
+
+from game_server import GameServer, SearchPool
+
+
+class HTTPClient:
+    """
+    Minimal keep-alive HTTP client for the JSON API of the game server.
+    """
+    def __init__(self, host: str, port: int, client: str):
+        """
+        :param client: Client name sent in the X-Client header, which the server queues fairly by
+        """
+        self.host = host
+        self.port = port
+        self.client = client
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str,
+                      data: Optional[dict[str, Any]]=None) -> tuple[int, Any, dict[str, str]]:
+        """
+        Sends a request, reconnecting if the server closed the connection.
+        :return: Status, JSON response and headers
+        """
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(data).encode() if data is not None else b""
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nX-Client: {self.client}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n")
+        self.writer.write(head.encode("latin-1") + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            await self.close()
+            raise ConnectionError("the server closed the connection")
+        status = int(status_line.split()[1])
+        headers = {}
+        while (line := await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        response = await self.reader.readexactly(int(headers.get("content-length", 0)))
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, json.loads(response) if response else None, headers
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+            self.writer = None
+
+
+class LoadGenerator:
+    """
+    Plays scripted games against the game server from many simulated users at once and
+    records the latency of every move. The users play random moves next to the stones on the
+    board and back off for the Retry-After time when the server is overloaded.
+    """
+    MAX_RETRIES = 20
+
+    def __init__(self, host: str, port: int, time_limit: float=0.2, seed: int=0):
+        """
+        :param host: Address of the server
+        :param port: Port of the server
+        :param time_limit: Time budget of every AI move
+        :param seed: Seed of the users' moves
+        """
+        self.host = host
+        self.port = port
+        self.time_limit = time_limit
+        self.rng = random.Random(seed)
+        self.latencies: list[float] = []
+        self.errors = 0
+        self.rejected = 0
+        self.finished_games = 0
+
+    async def _request(self, http: HTTPClient, method: str, path: str,
+                       data: Optional[dict[str, Any]]=None) -> Optional[Any]:
+        for _ in range(self.MAX_RETRIES):
+            start = time.perf_counter()
+            try:
+                status, response, headers = await http.request(method, path, data)
+            except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+                self.errors += 1
+                return None
+            if status == 503:
+                self.rejected += 1
+                await asyncio.sleep(float(headers.get("retry-after", 1)))
+                continue
+            if status >= 400:
+                self.errors += 1
+                return None
+            self.latencies.append(time.perf_counter() - start)
+            return response
+        self.errors += 1
+        return None
+
+    def _choose_move(self, size: int, moves: list[list[int]]) -> list[int]:
+        occupied = {tuple(move) for move in moves}
+        if not occupied:
+            return [size // 2, size // 2]
+        for _ in range(100):
+            col, row = self.rng.choice(moves)
+            move = (col + self.rng.randint(-2, 2), row + self.rng.randint(-2, 2))
+            if move not in occupied and 0 <= move[0] < size and 0 <= move[1] < size:
+                return list(move)
+        return next([col, row] for col in range(size) for row in range(size)
+                    if (col, row) not in occupied)
+
+    async def play_game(self, client: str, moves: int) -> None:
+        """
+        Plays one game of at most the given number of player moves and deletes it.
+        :param client: Name of the simulated user
+        :param moves: Number of player moves
+        :return: None
+        """
+        http = HTTPClient(self.host, self.port, client)
+        try:
+            state = await self._request(http, "POST", "/games",
+                                        {"time_limit": self.time_limit,
+                                         "player_starts": self.rng.random() < 0.5})
+            if state is None:
+                return
+            for _ in range(moves):
+                if state["result"] is not None:
+                    break
+                move = self._choose_move(state["size"], state["moves"])
+                response = await self._request(http, "POST", f"/games/{state['id']}/moves",
+                                               {"move": move})
+                if response is None:
+                    return
+                state = response
+            await self._request(http, "DELETE", f"/games/{state['id']}")
+            self.finished_games += 1
+        finally:
+            await http.close()
+
+    async def run(self, games: int, moves: int, clients: int) -> dict[str, Any]:
+        """
+        Plays the games concurrently, spread over the clients, and collects the server stats.
+        :param games: Number of concurrent games
+        :param moves: Player moves per game
+        :param clients: Number of distinct client names
+        :return: Summary of the latencies, errors and server stats
+        """
+        start = time.perf_counter()
+        await asyncio.gather(*(self.play_game(f"client-{i % clients}", moves)
+                               for i in range(games)))
+        duration = time.perf_counter() - start
+
+        http = HTTPClient(self.host, self.port, "load-generator")
+        try:
+            _, server_stats, _ = await http.request("GET", "/stats")
+        finally:
+            await http.close()
+        latencies = sorted(self.latencies)
+        def percentile(p: float) -> float:
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else 0.0
+        return {
+            "games": games,
+            "finished_games": self.finished_games,
+            "requests": len(latencies),
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "duration": duration,
+            "requests_per_second": len(latencies) / duration if duration else 0.0,
+            "latency": {
+                "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": latencies[-1] if latencies else 0.0,
+            },
+            "server": server_stats,
+        }
+
+
+async def run_load(host: str, port: int, games: int, moves: int, clients: int,
+                   time_limit: float, seed: int, workers: int=0,
+                   max_queue: int=64) -> dict[str, Any]:
+    """
+    Runs the load generator, against a server started in this process when workers is given.
+    :return: Summary of the run
+    """
+    server = None
+    if workers:
+        server = GameServer(SearchPool(workers, max_queue, {"tt_size_mb": 4}))
+        port = await server.start(host, 0)
+    try:
+        return await LoadGenerator(host, port, time_limit, seed).run(games, moves, clients)
+    finally:
+        if server is not None:
+            await server.close()
+
+
+def main(argv: Optional[list[str]]=None) -> None:
+    parser = argparse.ArgumentParser(description="Plays scripted games against the game server "
+                                                 "and reports the latencies.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address of the server")
+    parser.add_argument("--port", type=int, default=8080, help="Port of the server")
+    parser.add_argument("--games", type=int, default=32, help="Number of concurrent games")
+    parser.add_argument("--moves", type=int, default=10, help="Player moves per game")
+    parser.add_argument("--clients", type=int, default=4,
+                        help="Number of client names the games are spread over")
+    parser.add_argument("--time-limit", type=float, default=0.2,
+                        help="Time budget of every AI move")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the player moves")
+    parser.add_argument("--serve", type=int, nargs="?", const=multiprocessing.cpu_count(),
+                        default=0, metavar="WORKERS",
+                        help="Start a server with this many search processes in this process "
+                             "instead of connecting to a running one")
+    parser.add_argument("--max-queue", type=int, default=64,
+                        help="Queue limit of the server started with --serve")
+    args = parser.parse_args(argv)
+
+    summary = asyncio.run(run_load(args.host, args.port, args.games, args.moves, args.clients,
+                                   args.time_limit, args.seed, args.serve, args.max_queue))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
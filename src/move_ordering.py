@@ -0,0 +1,122 @@
+import random
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from game_board import GameBoard, Marker, Move
+
+
+@dataclass(frozen=True)
+class OrderingWeights:
+    """
+    Weights of the move ordering score. A move's score is the sum of the bonuses that apply to
+    it, plus its history value times the history weight, minus its Chebyshev distance to the
+    previous move times the distance weight.
+    """
+    tt_move: float = 2.0**40
+    killers: tuple[float, float] = (2.0**30, 2.0**29)
+    counter_move: float = 2.0**28
+    history: float = 1.0
+    distance: float = 1.0
+
+
+class MoveOrdering:
+    """
+    Orders the moves of a node by the transposition table move, the killer moves of the ply,
+    the counter move to the opponent's last move and the history heuristic, with the distance
+    to the last move breaking ties.
+
+    Killer moves are the last two moves that caused a beta cutoff at the same ply. The counter
+    move is the move that last refuted the opponent's previous move. History values grow by
+    2^depth for every cutoff a move causes anywhere in the tree. Between searches the history
+    values decay and the killer moves shift by the two plies played in between, so the next turn
+    starts from what the previous one learned.
+    """
+    MAX_PLY = 64
+    HISTORY_DECAY = 1 / 16
+
+    def __init__(self, weights: Optional[OrderingWeights]=None,
+                 rng: Optional[random.Random]=None):
+        """
+        :param weights: Weights of the ordering score, defaults to OrderingWeights()
+        :param rng: Optional random generator for breaking ties randomly
+        """
+        self.weights = weights if weights is not None else OrderingWeights()
+        self.rng = rng
+        self.clear()
+
+    def clear(self) -> None:
+        """
+        Forgets the killer moves, counter moves and history values.
+        :return: None
+        """
+        self.history: dict[Move, int] = {}
+        self.killers: list[list[Optional[Move]]] = [[None, None] for _ in range(self.MAX_PLY)]
+        self.counter_moves: dict[tuple[Marker, Move], Move] = {}
+
+    def new_search(self, plies_played: int=2) -> None:
+        """
+        Prepares the tables for the search of a later position.
+        :param plies_played: Number of moves played since the previous search
+        :return: None
+        """
+        decay = self.HISTORY_DECAY
+        self.history = {move: value * decay for move, value in self.history.items()
+                        if value * decay >= 1}
+        killers = self.killers[plies_played:]
+        self.killers = killers + [[None, None] for _ in range(self.MAX_PLY - len(killers))]
+
+    def order(self, gameboard: GameBoard, candidates: Iterable[Move], tt_move: Optional[Move],
+              ply: int, marker: Marker) -> list[Move]:
+        """
+        Orders the candidate moves from the most to the least promising.
+        :param gameboard: Instance of GameBoard
+        :param candidates: Candidate moves
+        :param tt_move: Best move stored in the transposition table for the position
+        :param ply: Distance of the node from the root
+        :param marker: Marker of the side to move
+        :return: List of ordered moves
+        """
+        weights = self.weights
+        history = self.history
+        history_weight = weights.history
+        distance_weight = weights.distance
+        prev_col, prev_row = prev_move = gameboard.move_history[-1]
+
+        scores = {}
+        for move in candidates:
+            col, row = move
+            distance = max(abs(prev_col - col), abs(prev_row - row))
+            scores[move] = history.get(move, 0) * history_weight - distance * distance_weight
+
+        killers = self.killers[ply] if ply < self.MAX_PLY else (None, None)
+        bonuses = ((tt_move, weights.tt_move), (killers[0], weights.killers[0]),
+                   (killers[1], weights.killers[1]),
+                   (self.counter_moves.get((marker, prev_move)), weights.counter_move))
+        for move, bonus in bonuses:
+            if move in scores:
+                scores[move] += bonus
+
+        moves = list(scores)
+        if self.rng is not None:
+            self.rng.shuffle(moves)
+        moves.sort(key=scores.__getitem__, reverse=True)
+        return moves
+
+    def record_cutoff(self, gameboard: GameBoard, move: Move, ply: int, depth: int,
+                      marker: Marker) -> None:
+        """
+        Updates the ordering tables with a move that caused a beta cutoff.
+        :param gameboard: Instance of GameBoard, in the position the move was played from
+        :param move: Move causing the cutoff
+        :param ply: Distance of the node from the root
+        :param depth: Remaining depth of the node
+        :param marker: Marker of the side that played the move
+        :return: None
+        """
+        self.history[move] = self.history.get(move, 0) + 2**depth
+        if ply < self.MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        self.counter_moves[(marker, gameboard.move_history[-1])] = move
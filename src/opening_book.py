@@ -0,0 +1,195 @@
+import mmap
+import os
+import random
+import struct
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from game_board import GameBoard, Marker, Move
+
+
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin")
+
+MAGIC = b"GMKBOOK1"
+# Magic, board size, maximum number of stones of the book positions, number of records
+HEADER = struct.Struct("<8sHHI")
+# Canonical key, move column, move row, score, weight
+RECORD = struct.Struct("<QBBhH")
+
+BOOK_SEED = 0x6F6D6F6B
+MAX_WEIGHT = 0xFFFF
+
+
+@dataclass(frozen=True)
+class BookMove:
+    """
+    Book move of a position. The score is the expected result of the side to move in per mille
+    and the weight tells how often the move was played or searched.
+    """
+    move: Move
+    score: int
+    weight: int
+
+
+class BookKeys:
+    """
+    Position keys that do not depend on the board orientation or on which marker is to move.
+    Each stone is hashed with a fixed seed as either a stone of the side to move or of its
+    opponent, and the key of a position is the smallest of its keys over the eight symmetries of
+    the board. Moves are stored relative to that canonical orientation.
+    """
+    _cache: dict[int, "BookKeys"] = {}
+
+    def __init__(self, size: int):
+        self.size = size
+        rng = random.Random(BOOK_SEED)
+        self.table = [(rng.getrandbits(64), rng.getrandbits(64)) for _ in range(size * size)]
+
+        self.symmetries, self.inverses = GameBoard.compute_symmetries(size)
+
+    @classmethod
+    def for_size(cls, size: int) -> "BookKeys":
+        if size not in cls._cache:
+            cls._cache[size] = cls(size)
+        return cls._cache[size]
+
+    def canonical_key(self, stones: Iterable[tuple[int, int, bool]]) -> tuple[int, int]:
+        """
+        Computes the canonical key of a position.
+        :param stones: (col, row, stone of the side to move) tuples
+        :return: Canonical key and the index of the symmetry giving it
+        """
+        size = self.size
+        table = self.table
+        keys = [0] * 8
+        for col, row, own in stones:
+            side = 0 if own else 1
+            for s, symmetry in enumerate(self.symmetries):
+                c, r = symmetry[row*size + col]
+                keys[s] ^= table[r*size + c][side]
+        key = min(keys)
+        return key, keys.index(key)
+
+    def position_key(self, gameboard: GameBoard, marker: Marker) -> tuple[int, int]:
+        """
+        Computes the canonical key of a board with the given marker to move.
+        :param gameboard: Instance of GameBoard
+        :param marker: Marker of the side to move
+        :return: Canonical key and the index of the symmetry giving it
+        """
+        board = gameboard.board
+        return self.canonical_key((col, row, board[row][col] == marker)
+                                  for col, row in gameboard.move_history)
+
+    def to_canonical(self, move: Move, symmetry: int) -> Move:
+        col, row = move
+        return self.symmetries[symmetry][row*self.size + col]
+
+    def from_canonical(self, move: Move, symmetry: int) -> Move:
+        col, row = move
+        return self.inverses[symmetry][row*self.size + col]
+
+
+class OpeningBook:
+    """
+    Read only opening book. The file is a header followed by fixed size records sorted by their
+    canonical position key, so the book is memory mapped and binary searched instead of being
+    loaded.
+    """
+    def __init__(self, path: str=DEFAULT_BOOK_PATH):
+        """
+        :param path: Path of a book written by write_book
+        """
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) < HEADER.size:
+            raise ValueError(f"{path} is not an opening book")
+        magic, self.size, self.max_stones, self.count = HEADER.unpack_from(self.data)
+        if magic != MAGIC or len(self.data) != HEADER.size + self.count * RECORD.size:
+            raise ValueError(f"{path} is not an opening book")
+        self.keys = BookKeys.for_size(self.size)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        self.data.close()
+
+    def _key_at(self, index: int) -> int:
+        return struct.unpack_from("<Q", self.data, HEADER.size + index * RECORD.size)[0]
+
+    def find(self, key: int) -> list[tuple[Move, int, int]]:
+        """
+        Binary searches the records of a canonical key.
+        :param key: Canonical position key
+        :return: List of (canonical move, score, weight) tuples
+        """
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        records = []
+        while lo < self.count:
+            record_key, col, row, score, weight = RECORD.unpack_from(
+                self.data, HEADER.size + lo * RECORD.size)
+            if record_key != key:
+                break
+            records.append(((col, row), score, weight))
+            lo += 1
+        return records
+
+    def lookup(self, gameboard: GameBoard, marker: Marker) -> list[BookMove]:
+        """
+        Finds the book moves of a position, in the orientation of the board.
+        :param gameboard: Instance of GameBoard
+        :param marker: Marker of the side to move
+        :return: List of book moves, empty if the position is not in the book
+        """
+        if gameboard.size != self.size or len(gameboard.move_history) > self.max_stones:
+            return []
+        key, symmetry = self.keys.position_key(gameboard, marker)
+        moves = []
+        for move, score, weight in self.find(key):
+            move = self.keys.from_canonical(move, symmetry)
+            if gameboard.valid_move(*move):
+                moves.append(BookMove(move, score, weight))
+        return moves
+
+    def choose(self, gameboard: GameBoard, marker: Marker,
+               rng: Optional[random.Random]=None) -> Optional[Move]:
+        """
+        Picks a book move for a position.
+        :param gameboard: Instance of GameBoard
+        :param marker: Marker of the side to move
+        :param rng: Optional random generator for picking moves in proportion to their weight,
+                    otherwise the move with the highest weight and then score is picked
+        :return: Book move or None if the position is not in the book
+        """
+        moves = self.lookup(gameboard, marker)
+        if not moves:
+            return None
+        if rng is not None:
+            return rng.choices([m.move for m in moves], [m.weight for m in moves])[0]
+        return max(moves, key=lambda m: (m.weight, m.score)).move
+
+
+def write_book(path: str, size: int, max_stones: int,
+               records: Iterable[tuple[int, Move, int, int]]) -> int:
+    """
+    Writes an opening book file.
+    :param path: Path of the book
+    :param size: Size of the board
+    :param max_stones: Largest number of stones of the book positions
+    :param records: (canonical key, canonical move, score, weight) tuples
+    :return: Number of records written
+    """
+    records = sorted(records, key=lambda r: (r[0], -r[3], -r[2], r[1]))
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, size, max_stones, len(records)))
+        for key, (col, row), score, weight in records:
+            file.write(RECORD.pack(key, col, row, score, min(weight, MAX_WEIGHT)))
+    return len(records)
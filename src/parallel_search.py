@@ -0,0 +1,157 @@
+import functools
+import multiprocessing
+import queue
+import time
+from multiprocessing import shared_memory
+from typing import Callable, Optional
+
+from game_board import GameBoard, Move
+from search_control import SearchControl
+from time_manager import TimeManager
+from transposition_table import TranspositionTable
+
+
+class ParallelSearch:
+    """
+    Lazy SMP search. Helper processes run their own iterative deepening on the same position as
+    the calling process and share its transposition table through shared memory, so every
+    process profits from the results of the others. The helpers start at staggered depths and
+    break move ordering ties differently, which spreads them over different parts of the tree.
+    The deepest completed iteration of any process decides the move. When the calling process
+    stops, a shared event stops the helpers as well.
+    """
+    RESULT_GRACE_PERIOD = 0.5
+
+    def __init__(self, ai_class: type, workers: int, tt_size_mb: float):
+        """
+        :param ai_class: Class of the AI, instantiated in the helper processes
+        :param workers: Total number of searching processes, including the calling process
+        :param tt_size_mb: Memory budget of the shared transposition table in megabytes
+        """
+        context = multiprocessing.get_context("spawn")
+        size = max(int(tt_size_mb * 2**20), TranspositionTable.BUCKET_BYTES * 2)
+        self.shared_memory = shared_memory.SharedMemory(create=True, size=size)
+        self.transposition_table = TranspositionTable(buffer=self.shared_memory.buf)
+        self.results = context.Queue()
+        self.stop_event = context.Event()
+        self.tasks = []
+        self.processes = []
+        self.search_id = 0
+
+        for worker_id in range(1, workers):
+            tasks = context.Queue()
+            process = context.Process(target=_helper_main, daemon=True,
+                                      args=(ai_class, self.shared_memory.name, worker_id, tasks,
+                                            self.results, self.stop_event))
+            process.start()
+            self.tasks.append(tasks)
+            self.processes.append(process)
+
+    def search(self, ai, gameboard: GameBoard, candidates: set[Move], control: SearchControl,
+               progress: Optional[Callable[[int, float, Move], None]]=None,
+               time_manager: Optional[TimeManager]=None) -> Move:
+        """
+        Searches the position in all processes and returns the best move of the deepest
+        completed iteration.
+        :param ai: Instance of GomokuAI searching in the calling process
+        :param gameboard: Instance of GameBoard
+        :param candidates: Set of candidate moves
+        :param control: Search control of the calling process
+        :param progress: Optional callback called with the iterations completed by the calling
+                         process
+        :param time_manager: Optional time manager of the calling process, whose iterations
+                             decide when the helpers stop as well
+        :return: The best move for the AI
+        """
+        self.search_id += 1
+        self.stop_event.clear()
+        start_time = time.time()
+        # Queues pickle in a background thread, so the helpers get copies that the search in
+        # this process does not modify
+        task = (self.search_id, gameboard.clone_board(), candidates.copy(), start_time,
+                control.deadline - start_time, self.transposition_table.generation)
+        for tasks in self.tasks:
+            tasks.put(task)
+
+        completed = [0]
+        def record(depth: int, value: float, move: Move) -> None:
+            completed[0] = depth
+            if progress is not None:
+                progress(depth, value, move)
+
+        best_move = ai.iterative_deepening(gameboard, candidates, control, progress=record,
+                                           time_manager=time_manager)
+        best_depth = completed[0]
+        self.stop_event.set()
+
+        pending = len(self.tasks)
+        wait_until = time.time() + self.RESULT_GRACE_PERIOD
+        while pending:
+            try:
+                search_id, _, depth, _, move = self.results.get(
+                    timeout=max(0.0, wait_until - time.time()))
+            except queue.Empty:
+                break
+            if search_id != self.search_id:
+                continue
+            if depth is None:
+                pending -= 1
+            elif depth > best_depth:
+                best_depth, best_move = depth, move
+
+        if ai.verbose:
+            print(f"Parallel search reached depth {best_depth}, best move: {best_move}")
+        return best_move
+
+    def close(self) -> None:
+        """
+        Stops the helper processes and frees the shared transposition table.
+        :return: None
+        """
+        for tasks in self.tasks:
+            tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=1.0)
+            if process.is_alive():
+                process.terminate()
+        self.tasks = []
+        self.processes = []
+        self.transposition_table.close()
+        self.shared_memory.close()
+        self.shared_memory.unlink()
+
+
+def _helper_main(ai_class: type, shared_memory_name: str, worker_id: int,
+                 tasks: multiprocessing.Queue, results: multiprocessing.Queue,
+                 stop_event) -> None:
+    """
+    Entry point of a helper process. Searches every task it receives until it gets None.
+    :param ai_class: Class of the AI
+    :param shared_memory_name: Name of the shared memory block holding the transposition table
+    :param worker_id: Number of the helper, used for staggering depths and ordering
+    :param tasks: Queue of (search id, gameboard, candidates, start time, time limit,
+                  transposition table generation) tasks
+    :param results: Queue for (search id, worker id, depth, value, move) results. A depth of
+                    None marks the end of the helper's search.
+    :param stop_event: Event set by the calling process when its search ends
+    """
+    memory = shared_memory.SharedMemory(name=shared_memory_name)
+    ai = ai_class(transposition_table=TranspositionTable(buffer=memory.buf),
+                  ordering_seed=worker_id, verbose=False)
+
+    while (task := tasks.get()) is not None:
+        search_id, gameboard, candidates, start_time, turn_time_limit, generation = task
+        ai.transposition_table.generation = generation
+        report = functools.partial(_report_result, results, search_id, worker_id)
+        control = SearchControl(turn_time_limit, start_time, event=stop_event)
+        ai.iterative_deepening(gameboard, candidates, control, start_depth=1 + worker_id % 2,
+                               progress=report)
+        results.put((search_id, worker_id, None, None, None))
+
+    ai.transposition_table.close()
+    memory.close()
+
+
+def _report_result(results: multiprocessing.Queue, search_id: int, worker_id: int, depth: int,
+                   value: float, move: Move) -> None:
+    results.put((search_id, worker_id, depth, value, move))
@@ -0,0 +1,83 @@
+from array import array
+
+MAX_LENGTH = 11
+
+POWERS = [3**i for i in range(MAX_LENGTH + 1)]
+OFFSETS = [(3**n - 1) // 2 for n in range(MAX_LENGTH + 1)]
+
+# Base-3 codes of bit masks, used for converting bitboard lines into row codes
+BITS_TO_CODE = [sum(POWERS[i] for i in range(MAX_LENGTH) if m >> i & 1)
+                for m in range(2**MAX_LENGTH)]
+
+
+class PatternTable:
+    """
+    Lookup table with the heuristic value of every row of up to MAX_LENGTH cells. A row is
+    encoded as a base-3 integer where the cell at index i contributes marker * 3**i, and the value
+    of a row of length n with code c is stored at table[offsets[n] + c].
+    """
+    def __init__(self, pattern_values: dict[str, int], open_three: int):
+        self.table = self.build(pattern_values, open_three)
+
+    @classmethod
+    def build(cls, pattern_values: dict[str, int], open_three: int) -> array:
+        """
+        Scores every row of length 0..MAX_LENGTH. A pattern contained in a row of length n is
+        either contained in its first n-1 cells, in its last n-1 cells or is the whole row, so the
+        best pattern value for each marker is built up one length at a time from the shorter rows.
+        The player's value is multiplied by four when it is an open three or better, the same
+        way get_row_value has always done.
+        :param pattern_values: Pattern strings of the player mapped to their values
+        :param open_three: Value from which on the player's patterns are penalized
+        :return: Flat array of row values
+        """
+        table = array("i", [0])
+        player_best = [0]
+        ai_best = [0]
+
+        for n in range(1, MAX_LENGTH + 1):
+            player_exact = {}
+            ai_exact = {}
+            for pattern, value in pattern_values.items():
+                if len(pattern) != n:
+                    continue
+                digits = [int(c) for c in pattern]
+                player_code = sum(d * POWERS[i] for i, d in enumerate(digits))
+                player_exact[player_code] = max(player_exact.get(player_code, 0), value)
+                ai_code = sum(2 * d * POWERS[i] for i, d in enumerate(digits))
+                ai_exact[ai_code] = max(ai_exact.get(ai_code, 0), value)
+
+            player_best = cls._extend(player_best, player_exact)
+            ai_best = cls._extend(ai_best, ai_exact)
+
+            table.extend(a - (4*p if p >= open_three else p) for p, a in zip(player_best, ai_best))
+
+        return table
+
+    @staticmethod
+    def _extend(shorter: list[int], exact: dict[int, int]) -> list[int]:
+        """
+        Computes the best pattern values of rows one cell longer than the given rows.
+        :param shorter: Best pattern values of rows of length n-1
+        :param exact: Values of the patterns that are exactly n cells long
+        :return: Best pattern values of rows of length n
+        """
+        # For code c of length n, c % 3**(n-1) drops the last cell and c // 3 drops the first
+        without_last = shorter * 3
+        without_first = [v for v in shorter for _ in range(3)]
+        best = list(map(max, without_last, without_first))
+        for code, value in exact.items():
+            if value > best[code]:
+                best[code] = value
+        return best
+
+    def row_value(self, row: list[int]) -> int:
+        """
+        Looks up the value of the given row
+        :param row: List of empty, player and AI markers
+        :return: Heuristic value of the given row
+        """
+        code = 0
+        for n in reversed(row):
+            code = code * 3 + n
+        return self.table[OFFSETS[len(row)] + code]
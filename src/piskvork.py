@@ -0,0 +1,326 @@
+import argparse
+import os
+import sys
+import time
+from typing import Iterable, Optional, TextIO
+
+from bitboard import BitBoard
+from game_board import Marker, Move
+from gomoku_ai import GomokuAI
+from opening_book import DEFAULT_BOOK_PATH, OpeningBook
+from search_control import SearchControl
+from time_manager import TimeManager
+
+
+ABOUT = 'name="gomoku", version="0.1.0", author="Matias Rinne"'
+
+
+class PiskvorkEngine:
+    """
+    Headless engine speaking the Gomocup protocol used by Piskvork and other tournament
+    managers. The manager sends one command per line and the engine answers on its own lines,
+    with moves written as "x,y" where x is the column and y the row, counted from 0. The engine's
+    stones are the AI's markers on its board.
+
+    The turn and match time limits and the memory limit are taken from the INFO commands. Only
+    the freestyle rule is played, five or more stones in a row win.
+    """
+    MIN_SIZE = 5
+    # The transposition table packs the coordinates of a move in 6 bits each
+    MAX_SIZE = 63
+
+    DEFAULT_TURN_TIME = 5.0
+    MIN_TURN_TIME = 0.01
+    # The remaining match time is planned for this many moves
+    MATCH_MOVES_TO_GO = 20
+    # Part of the time limit kept for answering, relative and in seconds
+    TIME_SAFETY = 0.9
+    TIME_MARGIN = 0.03
+
+    # Memory of the interpreter and the board tables of each search process, besides the
+    # transposition table
+    BASE_MEMORY_MB = 48
+    TT_MEMORY_SHARE = 0.75
+    DEFAULT_TT_MB = 64.0
+    MIN_TT_MB = 1.0
+
+    def __init__(self, output: TextIO=sys.stdout, workers: int=1,
+                 opening_book: Optional[OpeningBook]=None):
+        """
+        :param output: Stream the answers are written to
+        :param workers: Number of search processes, see GomokuAI
+        :param opening_book: Optional opening book of the AI
+        """
+        self.output = output
+        self.workers = workers
+        self.opening_book = opening_book
+        self.gameboard: Optional[BitBoard] = None
+        self.ai: Optional[GomokuAI] = None
+        self.ai_tt_mb = 0.0
+        self.board_moves: Optional[list[tuple[int, int, Marker]]] = None
+
+        # Limits of the INFO commands, times in seconds and memory in bytes. 0 means no limit,
+        # except that a turn time of 0 asks for moves as fast as possible.
+        self.timeout_turn = self.DEFAULT_TURN_TIME
+        self.timeout_match = 0.0
+        self.time_left: Optional[float] = None
+        self.max_memory = 0
+
+    def run(self, lines: Iterable[str]) -> None:
+        """
+        Answers commands until END or the end of the input.
+        :param lines: Command lines, e.g. sys.stdin
+        :return: None
+        """
+        try:
+            for line in lines:
+                if not self.handle(line):
+                    break
+        finally:
+            self.close()
+
+    def handle(self, line: str) -> bool:
+        """
+        Answers one command line. Searches are timed from the moment the line is handled.
+        :param line: Command line
+        :return: False after END, True otherwise
+        """
+        received = time.time()
+        line = line.strip()
+        if not line:
+            return True
+        if self.board_moves is not None:
+            self._board_line(line, received)
+            return True
+
+        command, _, arguments = line.partition(" ")
+        command = command.upper()
+        arguments = arguments.strip()
+        if command == "END":
+            return False
+        if command == "START":
+            self._start(arguments)
+        elif command == "RESTART":
+            self._restart()
+        elif command == "RECTSTART":
+            self._send("ERROR rectangular boards are not supported")
+        elif command == "INFO":
+            self._info(arguments)
+        elif command == "ABOUT":
+            self._send(ABOUT)
+        elif self.gameboard is None and command in ("BEGIN", "TURN", "BOARD", "TAKEBACK"):
+            self._send("ERROR no game started, send START first")
+        elif command == "BEGIN":
+            if self.gameboard.move_history:
+                self._send("ERROR BEGIN on a board with stones")
+            else:
+                self._play(received)
+        elif command == "TURN":
+            move = self._parse_move(arguments)
+            if move is None or not self.gameboard.valid_move(*move):
+                self._send(f"ERROR invalid move {arguments}")
+            else:
+                self.gameboard.move(*move, Marker.PLAYER)
+                self._play(received)
+        elif command == "BOARD":
+            self.board_moves = []
+        elif command == "TAKEBACK":
+            self._take_back(arguments)
+        else:
+            self._send(f"UNKNOWN command {command}")
+        return True
+
+    def close(self) -> None:
+        """
+        Stops the helper processes of the AI.
+        :return: None
+        """
+        if self.ai is not None:
+            self.ai.close()
+            self.ai = None
+
+    def _with_margin(self, limit: float) -> float:
+        return max(self.MIN_TURN_TIME, limit * self.TIME_SAFETY - self.TIME_MARGIN)
+
+    def time_manager(self, start_time: Optional[float]=None) -> TimeManager:
+        """
+        Plans the time of the next move, keeping a margin for answering. Without a match time
+        the whole turn time is the optimum, since unused turn time is lost. With one, the
+        remaining match time is planned for MATCH_MOVES_TO_GO moves, and a difficult move may
+        take more, but never more than the turn time.
+        :param start_time: Time the move is measured from, defaults to now
+        :return: TimeManager of the move
+        """
+        turn_limit = self._with_margin(self.timeout_turn if self.timeout_turn > 0
+                                       else self.MIN_TURN_TIME)
+        if self.timeout_match > 0 and self.time_left is not None:
+            return TimeManager.for_clock(self._with_margin(self.time_left),
+                                         moves_to_go=self.MATCH_MOVES_TO_GO,
+                                         max_turn_time=turn_limit, start_time=start_time)
+        return TimeManager(turn_limit, turn_limit, start_time)
+
+    def tt_size_mb(self) -> float:
+        """
+        Sizes the transposition table to fit the memory limit next to the search processes.
+        :return: Memory budget of the transposition table in megabytes
+        """
+        if self.max_memory <= 0:
+            return self.DEFAULT_TT_MB
+        available = self.max_memory / 2**20 - self.BASE_MEMORY_MB * self.workers
+        return max(self.MIN_TT_MB, available * self.TT_MEMORY_SHARE)
+
+    def _send(self, message: str) -> None:
+        self.output.write(message + "\n")
+        self.output.flush()
+
+    @staticmethod
+    def _parse_move(text: str) -> Optional[Move]:
+        try:
+            col, row = (int(value) for value in text.split(","))
+        except ValueError:
+            return None
+        return col, row
+
+    def _start(self, arguments: str) -> None:
+        try:
+            size = int(arguments)
+        except ValueError:
+            size = 0
+        if not self.MIN_SIZE <= size <= self.MAX_SIZE:
+            self._send(f"ERROR unsupported board size {arguments}, give {self.MIN_SIZE} to "
+                       f"{self.MAX_SIZE}")
+            return
+        self._new_game(size)
+        self._send("OK")
+
+    def _restart(self) -> None:
+        if self.gameboard is None:
+            self._send("ERROR no game started, send START first")
+            return
+        self._new_game(self.gameboard.size)
+        self._send("OK")
+
+    def _new_game(self, size: int) -> None:
+        """
+        Starts a game with an empty board. The AI of the previous game is closed, since its
+        tables hold positions of that game, e.g. with the other side to move.
+        :param size: Size of the board
+        :return: None
+        """
+        self.gameboard = BitBoard(size, track_symmetries=True)
+        if self.ai is not None:
+            self.ai.close()
+            self.ai = None
+
+    def _info(self, arguments: str) -> None:
+        key, _, value = arguments.partition(" ")
+        try:
+            number = int(value)
+        except ValueError:
+            return
+        if key == "timeout_turn":
+            self.timeout_turn = number / 1000
+        elif key == "timeout_match":
+            self.timeout_match = number / 1000
+        elif key == "time_left":
+            self.time_left = number / 1000
+        elif key == "max_memory":
+            self.max_memory = number
+
+    def _board_line(self, line: str, received: float) -> None:
+        """
+        Collects the stones of a BOARD command. At DONE the board is replaced by the collected
+        position and the engine moves.
+        """
+        if line.upper() != "DONE":
+            try:
+                col, row, field = (int(value) for value in line.split(","))
+                marker = {1: Marker.AI, 2: Marker.PLAYER}[field]
+            except (ValueError, KeyError):
+                self._send(f"ERROR invalid board line {line}")
+                marker = None
+            if marker is not None:
+                self.board_moves.append((col, row, marker))
+            return
+
+        moves, self.board_moves = self.board_moves, None
+        gameboard = BitBoard(self.gameboard.size, track_symmetries=True)
+        for col, row, marker in moves:
+            if not gameboard.valid_move(col, row):
+                self._send(f"ERROR invalid board stone {col},{row}")
+                return
+            gameboard.move(col, row, marker)
+        self.gameboard = gameboard
+        self._play(received)
+
+    def _take_back(self, arguments: str) -> None:
+        move = self._parse_move(arguments)
+        history = self.gameboard.move_history
+        if move not in history:
+            self._send(f"ERROR no stone at {arguments}")
+            return
+        if history[-1] == move:
+            self.gameboard.undo_move()
+        else:
+            stones = [(col, row, self.gameboard.board[row][col]) for col, row in history
+                      if (col, row) != move]
+            self.gameboard = BitBoard(self.gameboard.size, track_symmetries=True)
+            for col, row, marker in stones:
+                self.gameboard.move(col, row, marker)
+        self._send("OK")
+
+    def _get_ai(self) -> GomokuAI:
+        tt_size_mb = self.tt_size_mb()
+        if self.ai is None or self.ai_tt_mb != tt_size_mb:
+            if self.ai is not None:
+                self.ai.close()
+            self.ai = GomokuAI(tt_size_mb=tt_size_mb, workers=self.workers, verbose=False,
+                               opening_book=self.opening_book)
+            self.ai_tt_mb = tt_size_mb
+        return self.ai
+
+    def _play(self, received: float) -> None:
+        """
+        Searches the engine's move, places it and sends it.
+        :param received: Time the command asking for the move was received
+        """
+        gameboard = self.gameboard
+        candidates = set(gameboard.candidates)
+        if not candidates and gameboard.move_history:
+            self._send("ERROR the board is full")
+            return
+        time_manager = self.time_manager(received)
+        control = SearchControl(time_manager.maximum, received)
+        move = self._get_ai().find_ai_move(gameboard, candidates, time_manager.maximum, control,
+                                           time_manager=time_manager)
+        if move is None or not gameboard.valid_move(*move):
+            # The search was stopped before completing its first iteration
+            move = GomokuAI.fallback_move(gameboard, candidates)
+        gameboard.move(*move, Marker.AI)
+        if self.time_left is not None:
+            self.time_left -= time.time() - received
+        elif self.timeout_match > 0:
+            self.time_left = self.timeout_match - (time.time() - received)
+        self._send(f"{move[0]},{move[1]}")
+
+
+def main(argv: Optional[list[str]]=None) -> None:
+    parser = argparse.ArgumentParser(description="Gomoku engine for the Gomocup (Piskvork) "
+                                                 "protocol on standard input and output.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of search processes")
+    parser.add_argument("--book", default=DEFAULT_BOOK_PATH, help="Path of the opening book")
+    parser.add_argument("--no-book", action="store_true", help="Search every move")
+    args = parser.parse_args(argv)
+
+    book = None
+    if not args.no_book and os.path.exists(args.book):
+        book = OpeningBook(args.book)
+    try:
+        PiskvorkEngine(sys.stdout, args.workers, book).run(sys.stdin)
+    finally:
+        if book is not None:
+            book.close()
+
+
+if __name__ == "__main__":
+    main()
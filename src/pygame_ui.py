@@ -1,15 +1,29 @@
 from typing import Optional
 import pygame
 from pygame import gfxdraw
-import threading
 import sys
 from game_board import GameBoard, Marker, Move
-from gomoku_ai import GomokuAI
+from search_worker import SearchUpdate, SearchWorker
 
 
 class PygameUI:
+    """
+    Pygame window of the game. The background and the grid are drawn once into a cached
+    surface, and each refresh redraws only the cells whose stones changed, updating just their
+    rectangles on the screen. While waiting for input the UI sleeps in pygame.event.wait, and
+    during a search it sleeps on the updates of the search worker, instead of polling at a fixed
+    frame rate.
+
+    The AI searches in a SearchWorker process. Its progress is shown above the board, and the
+    best move of the latest completed depth is outlined on the board.
+    """
     COLOR_WHITE = (255, 255, 255)
     COLOR_BLACK = (0, 0, 0)
+    COLOR_LAST_MOVE = (200, 0, 0)
+    COLOR_BEST_MOVE = (30, 80, 200)
+
+    # Longest sleep between handling window events, in milliseconds
+    EVENT_WAIT_TIMEOUT = 100
 
     def __init__(self, size=20):
         pygame.init()
@@ -26,62 +40,148 @@ class PygameUI:
 
         self.display = pygame.display.set_mode((self.display_width, self.display_height))
         pygame.display.set_caption("Gomoku")
-        self.clock = pygame.time.Clock()
         self.font = pygame.font.SysFont("Arial", 24)
+        self.progress_font = pygame.font.SysFont("Arial", 18)
+
+        self.board_surface = pygame.Surface(self.display.get_size()).convert()
+        self.board_surface.fill(self.background_colour)
+        self._draw_grid(self.board_surface)
+        # Stones and latest move currently on the screen, None when the screen has to be
+        # redrawn completely
+        self.drawn_stones: Optional[dict[Move, Marker]] = None
+        self.drawn_last_move: Optional[Move] = None
+        # Best move of the running search, outlined on the board
+        self.best_move: Optional[Move] = None
+        self.drawn_best_move: Optional[Move] = None
 
-    def _draw_board(self, gameboard: GameBoard) -> None:
+    def _draw_board(self, gameboard: GameBoard) -> list[pygame.Rect]:
         """
-        Draws the board background, gridlines and player markers.
+        Draws the changes of the board and the best move outline since the previous call.
+        Changed cells are restored from the cached board surface and their stones are drawn
+        again, together with the parts of neighbouring stones that reach into them.
         :param gameboard: Instance of GameBoard
-        :return:
+        :return: Rectangles of the display that changed
         """
-        self.display.fill(self.background_colour)
-        self._draw_grid()
-        self._draw_markers(gameboard)
+        stones = {(col, row): gameboard.board[row][col] for col, row in gameboard.move_history}
+        last_move = gameboard.move_history[-1] if gameboard.move_history else None
+
+        if self.drawn_stones is None:
+            self.display.blit(self.board_surface, (0, 0))
+            for move, marker in stones.items():
+                self._draw_marker(move, marker, move == last_move)
+            if self.best_move is not None:
+                self._draw_best_move(self.best_move)
+            dirty = [self.display.get_rect()]
+        else:
+            changed = {move for move in stones.keys() | self.drawn_stones.keys()
+                       if stones.get(move) != self.drawn_stones.get(move)}
+            if last_move != self.drawn_last_move:
+                changed.update(move for move in (last_move, self.drawn_last_move) if move)
+            if self.best_move != self.drawn_best_move:
+                changed.update(move for move in (self.best_move, self.drawn_best_move) if move)
+            dirty = []
+            for col, row in changed:
+                rect = self._cell_rect(col, row)
+                self.display.set_clip(rect)
+                self.display.blit(self.board_surface, rect, rect)
+                for dc in (-1, 0, 1):
+                    for dr in (-1, 0, 1):
+                        move = (col + dc, row + dr)
+                        if move in stones:
+                            self._draw_marker(move, stones[move], move == last_move)
+                        elif move == self.best_move:
+                            self._draw_best_move(move)
+                dirty.append(rect)
+            self.display.set_clip(None)
 
+        self.drawn_stones = stones
+        self.drawn_last_move = last_move
+        self.drawn_best_move = self.best_move
+        return dirty
 
-    def _draw_grid(self) -> None:
+    def _draw_grid(self, surface: pygame.Surface) -> None:
         """
         Draws the gridlines.
+        :param surface: Surface to draw on
         :return:
         """
         for i in range(self.board_size):
             pos = i * self.grid_width
             offset = self.grid_width // 2 + self.board_padding
-            pygame.draw.line(self.display, (0,0,0), (offset, pos+offset), (self.display_width-offset, pos+offset), 2)
-            pygame.draw.line(self.display, (0,0,0), (pos+offset, offset), (pos+offset, self.display_height-offset), 2)
+            pygame.draw.line(surface, (0,0,0), (offset, pos+offset),
+                             (self.display_width-offset, pos+offset), 2)
+            pygame.draw.line(surface, (0,0,0), (pos+offset, offset),
+                             (pos+offset, self.display_height-offset), 2)
+
+    def _cell_centre(self, col: int, row: int) -> tuple[int, int]:
+        return (col * self.grid_width + self.grid_width // 2 + self.board_padding,
+                row * self.grid_width + self.grid_width // 2 + self.board_padding)
 
-    def _draw_markers(self, gameboard: GameBoard) -> None:
+    def _cell_rect(self, col: int, row: int) -> pygame.Rect:
         """
-        Draws the player markers.
-        :param gameboard: Instance of GameBoard
+        Gives the rectangle covering a marker and its latest move outline.
+        """
+        x, y = self._cell_centre(col, row)
+        radius = self.marker_size // 2 + 4
+        return pygame.Rect(x - radius, y - radius, 2*radius + 1, 2*radius + 1)
+
+    def _draw_marker(self, move: Move, marker: Marker, last_move: bool) -> None:
+        """
+        Draws a player marker, outlined in red if it is the latest move.
+        :param move: Position of the marker
+        :param marker: Player or AI marker
+        :param last_move: Whether the marker is the latest move
         :return:
         """
-        for row in range(self.board_size):
-            for col in range(self.board_size):
-                marker = gameboard.board[row][col]
-                if marker != Marker.EMPTY:
-                    x = col * self.grid_width + self.grid_width // 2 + self.board_padding
-                    y = row * self.grid_width + self.grid_width // 2 + self.board_padding
+        x, y = self._cell_centre(*move)
+        if last_move:
+            gfxdraw.aacircle(self.display, x, y, self.marker_size//2+3, self.COLOR_LAST_MOVE)
+            gfxdraw.filled_circle(self.display, x, y, self.marker_size//2+3, self.COLOR_LAST_MOVE)
+
+        color = self.marker_colours[marker]
+        gfxdraw.aacircle(self.display, x, y, self.marker_size//2, color)
+        gfxdraw.filled_circle(self.display, x, y, self.marker_size//2, color)
+
+    def _draw_best_move(self, move: Move) -> None:
+        """
+        Outlines the empty cell of the search's best move.
+        """
+        x, y = self._cell_centre(*move)
+        for radius in range(self.marker_size//2 - 2, self.marker_size//2 + 1):
+            gfxdraw.aacircle(self.display, x, y, radius, self.COLOR_BEST_MOVE)
 
-                    if (col, row) == gameboard.move_history[-1]:
-                        gfxdraw.aacircle(self.display, x, y, self.marker_size//2+3, (200, 0, 0))
-                        gfxdraw.filled_circle(self.display, x, y, self.marker_size//2+3, (200, 0, 0))
+    def _draw_progress(self, update: SearchUpdate) -> pygame.Rect:
+        """
+        Draws the progress of the search above the board.
+        :param update: Latest update of the search worker
+        :return: Rectangle of the display that changed
+        """
+        rect = self._clear_progress()
+        col, row = update.move
+        text = (f"Depth {update.depth}   Score {update.value:+.0f}   "
+                f"Best ({chr(ord('A')+col)}, {row})   {update.nodes_per_second:,} nodes/s")
+        text_surface = self.progress_font.render(text, True, self.COLOR_BLACK)
+        self.display.blit(text_surface,
+                          (self.board_padding, (self.board_padding - text_surface.get_height())//2))
+        return rect
 
-                    # color = self.COLORS[marker]
-                    color = self.marker_colours[marker]
-                    gfxdraw.aacircle(self.display, x, y, self.marker_size//2, color)
-                    gfxdraw.filled_circle(self.display, x, y, self.marker_size//2, color)
+    def _clear_progress(self) -> pygame.Rect:
+        """
+        Clears the progress of the search above the board.
+        :return: Rectangle of the display that changed
+        """
+        rect = pygame.Rect(0, 0, self.display_width, self.board_padding)
+        self.display.blit(self.board_surface, rect, rect)
+        return rect
 
     def display_board(self, gameboard: GameBoard) -> None:
         """
-        Displays the gameboard in the pygame window.
+        Displays the gameboard in the pygame window, updating only the changed cells.
         :param gameboard: Instance of GameBoard
         :return:
         """
         self._event_loop()
-        self._draw_board(gameboard)
-        pygame.display.flip()
+        pygame.display.update(self._draw_board(gameboard))
 
     def get_player_move(self, gameboard: GameBoard) -> Move:
         """
@@ -90,51 +190,53 @@ class PygameUI:
         :return: Player's next move
         """
         while True:
-            self.clock.tick(60)
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit(0)
+            event = pygame.event.wait(self.EVENT_WAIT_TIMEOUT)
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit(0)
 
-                if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                    x, y = pygame.mouse.get_pos()
-                    col = (x - self.board_padding) // self.grid_width
-                    row = (y - self.board_padding) // self.grid_width
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                x, y = event.pos
+                col = (x - self.board_padding) // self.grid_width
+                row = (y - self.board_padding) // self.grid_width
 
-                    if gameboard.valid_move(col, row):
-                        return col, row
-                    else:
-                        print(f"Invalid move! {col}, {row}")
+                if gameboard.valid_move(col, row):
+                    return col, row
+                else:
+                    print(f"Invalid move! {col}, {row}")
 
-    def get_ai_move(self, gameboard: GameBoard, ai: GomokuAI, candidates: set[Move]) -> Move:
+    def get_ai_move(self, gameboard: GameBoard, ai: SearchWorker, candidates: set[Move]) -> Move:
         """
-        Gets the AI's next move. Starts a new thread for running the AI to
-        prevent pygame from freezing.
+        Gets the AI's next move. The search runs in the worker process, and the UI sleeps on its
+        updates, showing the depth, score, best move and speed of every completed iteration.
+        Closing the window stops the search before quitting.
         :param gameboard: Instance of GameBoard
-        :param ai: Instance of GomokuAI
+        :param ai: SearchWorker searching the move
         :param candidates: Set of candidate moves
         :return: AI's next move
         """
-        ai_move = []
-        thread = threading.Thread(target=self._ai_thread, args=(gameboard, ai, candidates, ai_move))
-        thread.daemon = True
-        thread.start()
-
-        while thread.is_alive():
-            self._event_loop()
-            self.clock.tick(60)
+        ai.start_search(gameboard, candidates)
+        while True:
+            update = ai.get_update(self.EVENT_WAIT_TIMEOUT / 1000)
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    ai.close()
+                    pygame.quit()
+                    sys.exit(0)
+            if update is None:
+                continue
+            if update.done:
+                # The outline of the best move and the progress go when the search ends
+                self.best_move = None
+                dirty = self._draw_board(gameboard)
+                dirty.append(self._clear_progress())
+                pygame.display.update(dirty)
+                return update.move
 
-        return ai_move[0]
-
-    def _ai_thread(self, gameboard: GameBoard, ai: GomokuAI, candidates: set[Move], move: list[Move]) -> None:
-        """
-        Helper method for running find_ai_move in a thread.
-        :param gameboard: Instance of GameBoard
-        :param ai: Instance of GomokuAI
-        :param candidates: Set of candidate moves
-        :param move: Mutable list for storing the result
-        """
-        move.append(ai.find_ai_move(gameboard, candidates))
+            self.best_move = update.move
+            dirty = self._draw_board(gameboard)
+            dirty.append(self._draw_progress(update))
+            pygame.display.update(dirty)
 
     def show_winner(self, gameboard: GameBoard, winner: Marker) -> Optional[bool]:
         """
@@ -147,27 +249,29 @@ class PygameUI:
         restart_st = " Press R to restart, Q to quit"
         player_st = "Player won!" if winner == Marker.PLAYER else "AI won!"
         game_over_text = self.font.render(player_st+restart_st, True, (0,0,0))
-        self.display.blit(game_over_text, (self.board_padding, self.board_padding//2))
-        pygame.display.flip()
+        pygame.display.update(self.display.blit(game_over_text,
+                                                (self.board_padding, self.board_padding//2)))
+        # The text is not part of the tracked stones, so the next refresh redraws everything
+        self.drawn_stones = None
 
         while True:
-            self.clock.tick(60)
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
+            event = pygame.event.wait(self.EVENT_WAIT_TIMEOUT)
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit(0)
+
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_r:
+                    return True
+                if event.key == pygame.K_q:
                     pygame.quit()
                     sys.exit(0)
 
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_r:
-                        return True
-                    if event.key == pygame.K_q:
-                        pygame.quit()
-                        sys.exit(0)
-
     def set_starting_player(self, player_starts: bool) -> None:
         """
         Initializes the marker colours based on who starts the game.
         """
+        self.drawn_stones = None
         if player_starts:
             self.marker_colours = {
                 Marker.PLAYER: self.COLOR_BLACK,
@@ -0,0 +1,66 @@
+import threading
+import time
+from typing import Optional
+
+
+class SearchControl:
+    """
+    Cancellation token of a search. The search counts its nodes on the control and only polls
+    the clock and the stop event every POLL_INTERVAL nodes, so checking the limits costs little
+    per node. Once the control is stopped the search unwinds by returning instead of raising, and
+    keeps the results of everything it completed before.
+
+    stop() may be called from any thread. For stopping a search in another process, pass a
+    multiprocessing event shared with that process.
+    """
+    POLL_INTERVAL = 256
+
+    def __init__(self, time_limit: Optional[float]=None, start_time: Optional[float]=None,
+                 event=None, poll_interval: int=POLL_INTERVAL):
+        """
+        :param time_limit: Time limit of the search in seconds, None for no limit
+        :param start_time: Time the limit is measured from, defaults to now
+        :param event: Optional threading or multiprocessing event that stops the search when set
+        :param poll_interval: Number of nodes between polls, rounded up to a power of two
+        """
+        self.event = event if event is not None else threading.Event()
+        self.deadline = float("inf")
+        self.poll_mask = (1 << max(poll_interval - 1, 0).bit_length()) - 1
+        self.nodes = 0
+        self.stopped = False
+        if time_limit is not None:
+            self.set_time_limit(time_limit, start_time)
+
+    def set_time_limit(self, time_limit: float, start_time: Optional[float]=None) -> None:
+        """
+        Sets the deadline of the search. An earlier deadline that is already set is kept.
+        :param time_limit: Time limit in seconds
+        :param start_time: Time the limit is measured from, defaults to now
+        :return: None
+        """
+        if start_time is None:
+            start_time = time.time()
+        self.deadline = min(self.deadline, start_time + time_limit)
+
+    def stop(self) -> None:
+        """
+        Asks the search to stop. The search notices it at its next poll.
+        :return: None
+        """
+        self.event.set()
+
+    def poll(self) -> bool:
+        """
+        Checks the stop event and the deadline
+        :return: True if the search has to stop
+        """
+        if self.event.is_set() or time.time() >= self.deadline:
+            self.stopped = True
+        return self.stopped
+
+    def remaining(self) -> float:
+        """
+        Returns the time left until the deadline
+        :return: Remaining time in seconds, never negative
+        """
+        return max(0.0, self.deadline - time.time())
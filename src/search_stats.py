@@ -0,0 +1,94 @@
+import json
+from typing import Any, Optional
+
+from game_board import Move
+
+
+class SearchStats:
+    """
+    Statistics of one search. The AI only fills these in when statistics are turned on, and the
+    counters it updates per node are the ones it keeps anyway, so a disabled search pays a
+    single None check at the rare events below.
+    """
+    def __init__(self):
+        self.nodes = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tt_cutoffs = 0
+        self.beta_cutoffs: list[int] = []
+        self.null_window_searches = 0
+        self.researches = 0
+        self.aspiration_researches = 0
+        self.pv_changes = 0
+        self.iterations: list[dict[str, Any]] = []
+
+    def add_cutoff(self, move_index: int) -> None:
+        """
+        Counts a beta cutoff caused by the move at the given index of the move ordering
+        :param move_index: Index of the move in the ordered moves
+        :return: None
+        """
+        cutoffs = self.beta_cutoffs
+        while len(cutoffs) <= move_index:
+            cutoffs.append(0)
+        cutoffs[move_index] += 1
+
+    def add_iteration(self, depth: int, time: float, nodes: int, value: Optional[float],
+                      move: Optional[Move], completed: bool) -> None:
+        """
+        Records an iterative deepening iteration and whether its best move changed.
+        :param depth: Depth of the iteration
+        :param time: Time the iteration took in seconds
+        :param nodes: Nodes searched in the iteration
+        :param value: Value of the iteration, None if it was stopped
+        :param move: Best move of the iteration
+        :param completed: False if the search was stopped during the iteration
+        :return: None
+        """
+        previous = [it["move"] for it in self.iterations if it["completed"]]
+        if completed and previous and move != previous[-1]:
+            self.pv_changes += 1
+        self.iterations.append({"depth": depth, "time": time, "nodes": nodes, "value": value,
+                                "move": move, "completed": completed})
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        """
+        Share of the beta cutoffs caused by the first ordered move, a measure of ordering quality
+        """
+        total = sum(self.beta_cutoffs)
+        return self.beta_cutoffs[0] / total if total else 0.0
+
+    @property
+    def research_rate(self) -> float:
+        """
+        Share of the null window searches that had to be searched again with the full window
+        """
+        return self.researches / self.null_window_searches if self.null_window_searches else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "nodes": self.nodes,
+            "tt_probes": self.tt_probes,
+            "tt_hits": self.tt_hits,
+            "tt_cutoffs": self.tt_cutoffs,
+            "beta_cutoffs": self.beta_cutoffs,
+            "first_move_cutoff_rate": self.first_move_cutoff_rate,
+            "null_window_searches": self.null_window_searches,
+            "researches": self.researches,
+            "research_rate": self.research_rate,
+            "aspiration_researches": self.aspiration_researches,
+            "pv_changes": self.pv_changes,
+            "iterations": self.iterations,
+        }
+
+    def to_json_lines(self) -> str:
+        """
+        Formats the statistics as JSON lines, one per iteration followed by a summary line.
+        :return: String of newline separated JSON objects
+        """
+        summary = self.to_dict()
+        iterations = summary.pop("iterations")
+        lines = [json.dumps({"type": "iteration", **it}) for it in iterations]
+        lines.append(json.dumps({"type": "summary", **summary}))
+        return "\n".join(lines)
@@ -0,0 +1,240 @@
+import atexit
+import multiprocessing
+import os
+import queue
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from analysis_cache import AnalysisCache
+from bitboard import BitBoard
+from game_board import GameBoard, Marker, Move
+from gomoku_ai import GomokuAI
+from opening_book import DEFAULT_BOOK_PATH, OpeningBook
+from search_control import SearchControl
+
+
+def encode_position(gameboard: GameBoard, candidates: set[Move]) -> tuple[int, bytes, bytes]:
+    """
+    Packs a position into bytes for sending it to another process. Every move takes three bytes,
+    column, row and marker, and every candidate two, which is much less than a pickled board.
+    :param gameboard: Instance of GameBoard
+    :param candidates: Set of candidate moves
+    :return: Size of the board, moves in the order they were played and candidates
+    """
+    moves = bytes(value for col, row in gameboard.move_history
+                  for value in (col, row, gameboard.board[row][col]))
+    return gameboard.size, moves, bytes(value for move in candidates for value in move)
+
+
+def decode_position(size: int, moves: bytes, candidates: bytes) -> tuple[BitBoard, set[Move]]:
+    """
+    Rebuilds a position packed by encode_position.
+    :return: Board and set of candidate moves
+    """
+    gameboard = BitBoard(size, track_symmetries=True)
+    for i in range(0, len(moves), 3):
+        gameboard.move(moves[i], moves[i + 1], Marker(moves[i + 2]))
+    return gameboard, {(candidates[i], candidates[i + 1]) for i in range(0, len(candidates), 2)}
+
+
+@dataclass
+class SearchUpdate:
+    """
+    Progress of a search in the worker process. The last update of a search is done and holds
+    the move to play.
+    """
+    depth: Optional[int]
+    value: Optional[float]
+    move: Move
+    nodes_per_second: int
+    done: bool = False
+
+
+class SearchWorker:
+    """
+    Runs the AI in a separate process, so that the search does not compete with the UI for the
+    GIL. Positions are sent packed with encode_position, and the worker answers with a
+    SearchUpdate for every completed iteration and a final one with its move. The worker keeps
+    its AI between searches, so pondering and the transposition table work as in the calling
+    process.
+
+    The worker is not a daemon, because the AI may start lazy SMP helper processes of its own.
+    It is closed at exit, and it stops by itself if the calling process disappears.
+    """
+    CLOSE_TIMEOUT = 2.0
+
+    def __init__(self, size: int=20, workers: int=1, opening_book: bool=True,
+                 analysis_cache: bool=True, verbose: bool=True):
+        """
+        :param size: Size of the board, used for the analysis cache
+        :param workers: Number of search processes of the AI, see GomokuAI
+        :param opening_book: Whether the opening book is used if it exists
+        :param analysis_cache: Whether the persistent analysis cache is used
+        :param verbose: Whether the worker prints the search progress
+        """
+        context = multiprocessing.get_context("spawn")
+        self.tasks = context.Queue()
+        self.updates = context.Queue()
+        self.stop_event = context.Event()
+        self.search_id = 0
+        self.process = context.Process(target=_worker_main,
+                                       args=((size, workers, opening_book, analysis_cache,
+                                              verbose), self.tasks, self.updates,
+                                             self.stop_event))
+        self.process.start()
+        atexit.register(self.close)
+
+    def start_search(self, gameboard: GameBoard, candidates: set[Move],
+                     turn_time_limit: float=10.0) -> None:
+        """
+        Starts searching the AI's move. The results are read with get_update.
+        :param gameboard: Instance of GameBoard, not modified
+        :param candidates: Set of candidate moves
+        :param turn_time_limit: Time limit for the AI's turn
+        :return: None
+        """
+        self.search_id += 1
+        self.stop_event.clear()
+        self.tasks.put(("search", self.search_id, encode_position(gameboard, candidates),
+                        turn_time_limit))
+
+    def get_update(self, timeout: float) -> Optional[SearchUpdate]:
+        """
+        Waits for the next update of the current search. Updates of earlier searches are skipped.
+        :param timeout: Longest wait in seconds
+        :return: The update or None if none arrived in time
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                search_id, depth, value, move, nodes_per_second = self.updates.get(
+                    timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                if not self.process.is_alive():
+                    raise RuntimeError("the search worker stopped") from None
+                return None
+            if search_id == self.search_id:
+                return SearchUpdate(depth, value, move, nodes_per_second, depth is None)
+
+    def find_ai_move(self, gameboard: GameBoard, candidates: set[Move],
+                     turn_time_limit: float=10.0) -> Move:
+        """
+        Searches the AI's move and waits for it.
+        :return: The best move for the AI
+        """
+        self.start_search(gameboard, candidates, turn_time_limit)
+        while (update := self.get_update(turn_time_limit)) is None or not update.done:
+            pass
+        return update.move
+
+    def stop(self) -> None:
+        """
+        Stops the running search, which then sends its best move so far.
+        :return: None
+        """
+        self.stop_event.set()
+
+    def start_pondering(self, gameboard: GameBoard, candidates: set[Move]) -> None:
+        """
+        Starts pondering in the worker, see GomokuAI.start_pondering.
+        :return: None
+        """
+        self.tasks.put(("ponder", encode_position(gameboard, candidates)))
+
+    def stop_pondering(self) -> None:
+        self.tasks.put(("stop_pondering",))
+
+    def new_game(self) -> None:
+        """
+        Replaces the AI of the worker with a fresh one for a new game.
+        :return: None
+        """
+        self.tasks.put(("new_game",))
+
+    def close(self) -> None:
+        """
+        Stops the search and the worker process. Safe to call more than once.
+        :return: None
+        """
+        if self.process is None:
+            return
+        self.stop_event.set()
+        self.tasks.put(None)
+        self.process.join(self.CLOSE_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process = None
+        atexit.unregister(self.close)
+
+
+def _create_resources(size: int, opening_book: bool, analysis_cache: bool
+                      ) -> tuple[Optional[OpeningBook], Optional[AnalysisCache]]:
+    book = OpeningBook() if opening_book and os.path.exists(DEFAULT_BOOK_PATH) else None
+    cache = None
+    if analysis_cache:
+        try:
+            cache = AnalysisCache(board_size=size)
+        except (OSError, ValueError) as error:
+            print(f"Analysis cache disabled: {error}")
+    return book, cache
+
+
+def _worker_main(ai_args: tuple, tasks: multiprocessing.Queue, updates: multiprocessing.Queue,
+                 stop_event) -> None:
+    """
+    Entry point of the worker process. Handles tasks until it gets None or the calling process
+    exits.
+    :param ai_args: Board size, number of search processes, whether the opening book and the
+                    analysis cache are used, and verbosity
+    :param tasks: Queue of ("search", search id, position, time limit), ("ponder", position),
+                  ("stop_pondering",) and ("new_game",) tasks, positions packed with
+                  encode_position
+    :param updates: Queue for (search id, depth, value, move, nodes per second) updates. A depth
+                    of None marks the move the search ended with.
+    :param stop_event: Event stopping the current search when set
+    """
+    size, workers, opening_book, analysis_cache, verbose = ai_args
+    # The book and the cache are kept over games, only the AI starts afresh
+    book, cache = _create_resources(size, opening_book, analysis_cache)
+    def create_ai() -> GomokuAI:
+        return GomokuAI(workers=workers, opening_book=book, analysis_cache=cache,
+                        verbose=verbose)
+
+    ai = create_ai()
+    parent = multiprocessing.parent_process()
+    try:
+        while True:
+            try:
+                task = tasks.get(timeout=1.0)
+            except queue.Empty:
+                if parent is not None and not parent.is_alive():
+                    break
+                continue
+            if task is None:
+                break
+            if task[0] == "search":
+                _, search_id, position, turn_time_limit = task
+                gameboard, candidates = decode_position(*position)
+                control = SearchControl(event=stop_event)
+                start_time = time.time()
+
+                def report(depth: Optional[int], value: Optional[float], move: Move) -> None:
+                    # Nodes of this process only, lazy SMP helpers count their own
+                    elapsed = time.time() - start_time
+                    nodes_per_second = int(control.nodes / elapsed) if elapsed > 0 else 0
+                    updates.put((search_id, depth, value, move, nodes_per_second))
+
+                move = ai.find_ai_move(gameboard, candidates, turn_time_limit, control, report)
+                report(None, None, move)
+            elif task[0] == "ponder":
+                ai.start_pondering(*decode_position(*task[1]))
+            elif task[0] == "stop_pondering":
+                ai.stop_pondering()
+            elif task[0] == "new_game":
+                ai.close()
+                ai = create_ai()
+    finally:
+        ai.close()
+        if cache is not None:
+            cache.close()
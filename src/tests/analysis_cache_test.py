@@ -0,0 +1,112 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+from analysis_cache import AnalysisCache
+from bitboard import BitBoard
+from game_board import GameBoard, Marker
+from gomoku_ai import GomokuAI
+from helpers import generate_zobrist_table
+
+
+def _store_entries(path, start):
+    cache = AnalysisCache(path, size_mb=1)
+    for key in range(start, start + 100):
+        cache.store(key * 7919, key, 0, (key % 20, 3), 5, GomokuAI.TT_EXACT)
+    cache.close()
+
+
+class TestAnalysisCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache", "analysis.bin")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_zobrist_table_is_deterministic(self):
+        self.assertEqual(generate_zobrist_table(20), generate_zobrist_table(20))
+        self.assertNotEqual(generate_zobrist_table(20), generate_zobrist_table(20, seed=1))
+        self.assertEqual(GameBoard(20).zobrist_table, GameBoard(20).zobrist_table)
+
+    def test_entries_persist_relative_to_node_value(self):
+        cache = AnalysisCache(self.path, size_mb=1)
+        cache.store(12345, 1500, 1000, (4,5), 6, GomokuAI.TT_LOWER_BOUND)
+        cache.store(54321, 1500, 1000, (4,5), 2, GomokuAI.TT_EXACT)
+        cache.close()
+
+        cache = AnalysisCache(self.path, size_mb=64)
+        self.assertEqual(os.path.getsize(self.path), 64 + 2**20)
+        self.assertEqual((-300, (4,5), 6, GomokuAI.TT_LOWER_BOUND), cache.probe(12345, -800))
+        self.assertIsNone(cache.probe(54321, 0))
+        cache.close()
+
+    def test_mismatching_file_raises(self):
+        AnalysisCache(self.path, size_mb=1).close()
+        with self.assertRaises(ValueError):
+            AnalysisCache(self.path, board_size=15)
+        with open(self.path, "r+b") as file:
+            file.write(b"garbage!")
+        with self.assertRaises(ValueError):
+            AnalysisCache(self.path)
+
+    def test_concurrent_processes_share_file(self):
+        AnalysisCache(self.path, size_mb=1).close()
+        context = multiprocessing.get_context("spawn")
+        processes = [context.Process(target=_store_entries, args=(self.path, i * 100))
+                     for i in range(2)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        cache = AnalysisCache(self.path)
+        for key in range(200):
+            self.assertEqual((key, (key % 20, 3), 5, GomokuAI.TT_EXACT),
+                             cache.probe(key * 7919, 0))
+        cache.close()
+
+    def test_cache_carries_results_between_ais(self):
+        cache = AnalysisCache(self.path, size_mb=1, min_depth=2)
+        gameboard = BitBoard(20)
+        candidates = set()
+        for col, row, marker in [(9,9,1), (10,10,2), (9,10,1), (10,9,2)]:
+            gameboard.update_candidates(candidates, col, row)
+            gameboard.move(col, row, Marker(marker))
+
+        first = GomokuAI(verbose=False, analysis_cache=cache)
+        first_result = first.minimax(gameboard, float("-inf"), float("inf"), True,
+                                     candidates.copy(), 0, 3, 3)
+        first_nodes = first.search_control.nodes
+        self.assertGreater(cache.stats()["used"], 0)
+
+        second = GomokuAI(verbose=False, analysis_cache=cache)
+        second_result = second.minimax(gameboard, float("-inf"), float("inf"), True,
+                                       candidates.copy(), 0, 3, 3)
+        self.assertEqual(first_result, second_result)
+        self.assertLess(second.search_control.nodes, first_nodes)
+        cache.close()
+
+    def test_side_to_move_is_part_of_the_key(self):
+        cache = AnalysisCache(self.path, size_mb=1, min_depth=2)
+        gameboard = BitBoard(20)
+        candidates = set()
+        for col, row, marker in [(9,9,1), (10,10,2), (9,10,1), (10,9,2)]:
+            gameboard.update_candidates(candidates, col, row)
+            gameboard.move(col, row, Marker(marker))
+
+        cache.store(gameboard.zobrist_hash, 1500, 0, (8,8), 6, GomokuAI.TT_EXACT)
+        self.assertIsNotNone(cache.probe(gameboard.zobrist_hash, 0))
+        self.assertIsNone(cache.probe(gameboard.zobrist_hash, 0, ai_to_move=False))
+
+        # The same stones searched with the AI to move do not answer the search with the player
+        # to move
+        GomokuAI(verbose=False, analysis_cache=cache).minimax(
+            gameboard, float("-inf"), float("inf"), True, candidates.copy(), 0, 3, 3)
+        cached = GomokuAI(verbose=False, analysis_cache=cache).minimax(
+            gameboard, float("-inf"), float("inf"), False, candidates.copy(), 0, 3, 3)
+        uncached = GomokuAI(verbose=False).minimax(
+            gameboard, float("-inf"), float("inf"), False, candidates.copy(), 0, 3, 3)
+        self.assertEqual(uncached, cached)
+        cache.close()
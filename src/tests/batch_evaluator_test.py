@@ -0,0 +1,68 @@
+import random
+import unittest
+from batch_evaluator import BatchEvaluator, PythonBatchEvaluator, create_batch_evaluator, np
+from bitboard import BitBoard
+from game_board import GameBoard, Marker
+from gomoku_ai import GomokuAI
+
+
+class TestBatchEvaluator(unittest.TestCase):
+    def setUp(self):
+        self.gameboard = GameBoard(size=20)
+        rng = random.Random(5)
+        for i in range(40):
+            while True:
+                col, row = rng.randrange(20), rng.randrange(20)
+                if self.gameboard.valid_move(col, row):
+                    break
+            self.gameboard.move(col, row, Marker.PLAYER if i % 2 else Marker.AI)
+        self.moves = [(col, row) for row in range(20) for col in range(20)
+                      if self.gameboard.valid_move(col, row)]
+
+    def expected(self, marker: Marker) -> list[int]:
+        return [self.gameboard.get_move_value(col, row, marker) for col, row in self.moves]
+
+    def test_python_fallback_matches_get_move_value(self):
+        evaluator = PythonBatchEvaluator(20)
+        self.assertEqual(self.expected(Marker.AI),
+                         evaluator.move_values(self.gameboard, self.moves, Marker.AI))
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_numpy_matches_get_move_value_on_whole_board(self):
+        evaluator = BatchEvaluator(20)
+        for marker in (Marker.AI, Marker.PLAYER):
+            self.assertEqual(self.expected(marker),
+                             evaluator.move_values(self.gameboard, self.moves, marker))
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_numpy_resyncs_after_moves(self):
+        evaluator = BatchEvaluator(20)
+        evaluator.move_values(self.gameboard, self.moves, Marker.AI)
+        self.gameboard.move(*self.moves[0], Marker.AI)
+        self.moves.pop(0)
+        self.assertEqual(self.expected(Marker.PLAYER),
+                         evaluator.move_values(self.gameboard, self.moves, Marker.PLAYER))
+        self.gameboard.undo_move()
+        self.gameboard.undo_move()
+        self.assertEqual([], evaluator.move_values(self.gameboard, [], Marker.AI))
+        moves = self.moves[:5]
+        self.assertEqual([self.gameboard.get_move_value(*m, Marker.AI) for m in moves],
+                         evaluator.move_values(self.gameboard, moves, Marker.AI))
+
+    def test_factory_prefers_numpy(self):
+        expected = PythonBatchEvaluator if np is None else BatchEvaluator
+        self.assertIsInstance(create_batch_evaluator(15), expected)
+
+    def test_search_with_and_without_batches_agrees(self):
+        gameboard = BitBoard(20)
+        candidates = set()
+        for col, row, marker in [(9,9,Marker.PLAYER), (10,10,Marker.AI), (8,9,Marker.PLAYER),
+                                 (10,9,Marker.AI), (7,9,Marker.PLAYER)]:
+            gameboard.update_candidates(candidates, col, row)
+            gameboard.move(col, row, marker)
+        results = []
+        for batch_evaluation in (False, True):
+            ai = GomokuAI(tt_size_mb=1, verbose=False, batch_evaluation=batch_evaluation)
+            results.append(ai.minimax(gameboard, float("-inf"), float("inf"), True,
+                                      candidates.copy(), 0, 3))
+        self.assertEqual(results[0], results[1])
@@ -0,0 +1,44 @@
+import copy
+import unittest
+from benchmark import (compare, effective_branching_factor, load_corpus, run_benchmarks,
+                       setup_position)
+
+
+class TestBenchmark(unittest.TestCase):
+    def setUp(self):
+        self.corpus = load_corpus()
+
+    def test_corpus_positions_are_playable(self):
+        names = set()
+        for position in self.corpus["positions"]:
+            gameboard, candidates = setup_position(position, self.corpus["size"])
+            self.assertFalse(gameboard.win_state())
+            self.assertTrue(candidates)
+            names.add(position["name"])
+        self.assertEqual(len(self.corpus["positions"]), len(names))
+
+    def test_effective_branching_factor(self):
+        iterations = [{"depth": 1, "nodes": 10}, {"depth": 2, "nodes": 50},
+                      {"depth": 3, "nodes": 210}]
+        self.assertAlmostEqual(4.0, effective_branching_factor(iterations))
+        self.assertIsNone(effective_branching_factor(iterations[:1]))
+
+    def test_run_and_compare_against_baseline(self):
+        results = run_benchmarks(self.corpus, 0.2, 2, 2, ["midgame_direct"],
+                                 {"tt_size_mb": 1}, 2)
+        self.assertEqual(1, len(results["search"]))
+        self.assertEqual(2, len(results["iterative_deepening"][0]["move"]))
+        self.assertGreater(results["minimax"][0]["nodes"], 0)
+        self.assertIn("win_state", results["micro"]["BitBoard"])
+        self.assertEqual([], compare(results, results, 0.1))
+
+        baseline = copy.deepcopy(results)
+        baseline["minimax"][0]["nodes"] //= 2
+        baseline["search"][0]["nps"] *= 2
+        regressions = {r["metric"] for r in compare(results, baseline, 0.1)}
+        self.assertEqual({"minimax/midgame_direct/nodes", "search/midgame_direct/nps"},
+                         regressions)
+
+        baseline["corpus_version"] += 1
+        with self.assertRaises(ValueError):
+            compare(results, baseline, 0.1)
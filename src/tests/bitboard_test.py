@@ -0,0 +1,79 @@
+import unittest
+import random
+from bitboard import BitBoard
+from game_board import GameBoard, Marker
+
+
+class TestBitBoard(unittest.TestCase):
+    def setUp(self):
+        self.bitboard = BitBoard(20)
+        self.gameboard = GameBoard(20)
+
+    def play_random_game(self, moves: int, seed: int) -> None:
+        rng = random.Random(seed)
+        empty = [(c, r) for r in range(20) for c in range(20)]
+        rng.shuffle(empty)
+        for i in range(moves):
+            col, row = empty[i]
+            marker = Marker.PLAYER if i % 2 == 0 else Marker.AI
+            self.bitboard.move(col, row, marker)
+            self.gameboard.move(col, row, marker)
+
+    def test_move_sets_bits_in_every_direction(self):
+        self.bitboard.move(3, 7, Marker.AI)
+        set_lines = [l for l in self.bitboard.lines[Marker.AI] if l]
+        self.assertEqual(4, len(set_lines))
+        self.assertFalse(any(self.bitboard.lines[Marker.PLAYER]))
+
+    def test_undo_clears_bits(self):
+        self.bitboard.move(3, 7, Marker.AI)
+        self.bitboard.undo_move()
+        self.assertFalse(any(self.bitboard.lines[Marker.AI]))
+        self.assertListEqual([], self.bitboard.move_history)
+
+    def test_win_state_detects_all_directions(self):
+        lines = [
+            [(5, 5), (6, 5), (7, 5), (8, 5), (9, 5)],
+            [(5, 5), (5, 6), (5, 7), (5, 8), (5, 9)],
+            [(0, 0), (1, 1), (2, 2), (3, 3), (4, 4)],
+            [(19, 0), (18, 1), (17, 2), (16, 3), (15, 4)],
+        ]
+        for line in lines:
+            board = BitBoard(20)
+            for col, row in line[:-1]:
+                board.move(col, row, Marker.PLAYER)
+                self.assertFalse(board.win_state())
+            board.move(*line[-1], Marker.PLAYER)
+            self.assertTrue(board.win_state())
+
+    def test_win_state_ignores_lines_wrapping_around_board_edge(self):
+        for col, row in [(16, 5), (17, 5), (18, 5), (19, 5), (0, 6)]:
+            self.bitboard.move(col, row, Marker.AI)
+        self.assertFalse(self.bitboard.win_state())
+
+    def test_win_state_matches_game_board(self):
+        for seed in range(20):
+            self.setUp()
+            self.play_random_game(150, seed)
+            self.assertEqual(self.gameboard.win_state(), self.bitboard.win_state())
+
+    def test_rows_and_move_values_match_game_board(self):
+        self.play_random_game(80, 1)
+        for row in range(20):
+            for col in range(20):
+                expected = [([int(n) for n in r], i)
+                            for r, i in self.gameboard.get_rows_containing_move(col, row)]
+                self.assertEqual(expected, self.bitboard.get_rows_containing_move(col, row))
+                if self.gameboard.empty_space(col, row):
+                    for marker in (Marker.PLAYER, Marker.AI):
+                        self.assertEqual(self.gameboard.get_move_value(col, row, marker),
+                                         self.bitboard.get_move_value(col, row, marker))
+
+    def test_clone_board_copies_bits(self):
+        self.bitboard.move(3, 7, Marker.AI)
+        clone = self.bitboard.clone_board()
+        clone.move(4, 7, Marker.AI)
+        self.assertIsInstance(clone, BitBoard)
+        self.assertNotEqual(clone.lines, self.bitboard.lines)
+        clone.undo_move()
+        self.assertEqual(clone.lines, self.bitboard.lines)
@@ -109,3 +109,114 @@ class TestGameBoard(unittest.TestCase):
         added_candidates = [(3,4), (5,4), (3,6), (5,6), (4,4), (3,5), (4,6), (2,3), (6,3), (2,7), (6,7), (4,3), (2,5), (6,5), (4,7)]
         self.assertEqual(added_candidates, self.gameboard.update_candidates(old_candidates, 4, 5))
 
+    def test_board_candidates_match_update_candidates(self):
+        candidates = set()
+        moves = [(5,5), (6,5), (7,6), (6,6), (0,1), (1,0), (19,18), (6,7)]
+        for i, (col, row) in enumerate(moves):
+            self.gameboard.update_candidates(candidates, col, row)
+            self.gameboard.move(col, row, Marker.PLAYER if i % 2 == 0 else Marker.AI)
+            self.assertEqual(candidates, set(self.gameboard.candidates))
+            self.assertEqual(len(candidates), len(self.gameboard.candidates))
+
+    def test_undo_restores_board_candidates(self):
+        self.gameboard.move(5, 5, Marker.PLAYER)
+        self.gameboard.move(7, 5, Marker.AI)
+        candidates = set(self.gameboard.candidates)
+        counts = self.gameboard.neighbour_counts[:]
+
+        self.gameboard.move(6, 5, Marker.PLAYER)
+        self.gameboard.move(6, 6, Marker.AI)
+        self.gameboard.undo_move()
+        self.gameboard.undo_move()
+
+        self.assertEqual(candidates, set(self.gameboard.candidates))
+        self.assertEqual(counts, self.gameboard.neighbour_counts)
+        for i, (col, row) in enumerate(self.gameboard.candidates):
+            self.assertEqual(i, self.gameboard.candidate_index[row*20 + col])
+
+        self.gameboard.undo_move()
+        self.gameboard.undo_move()
+        self.assertEqual([], self.gameboard.candidates)
+
+    def test_square_neighbourhood_candidates(self):
+        gameboard = GameBoard(20, candidate_offsets=GameBoard.neighbourhood(1, "square"))
+        gameboard.move(0, 0, Marker.PLAYER)
+        self.assertEqual({(1,0), (0,1), (1,1)}, set(gameboard.candidates))
+
+        clone = gameboard.clone_board()
+        clone.move(1, 1, Marker.AI)
+        self.assertEqual(7, len(clone.candidates))
+        self.assertEqual(3, len(gameboard.candidates))
+
+    def test_boards_of_one_size_share_their_context(self):
+        self.assertIs(GameBoard(20).context, GameBoard(20, track_symmetries=True).context)
+        self.assertIs(GameBoard(15).context, GameBoard.get_context(15))
+        self.assertIsNot(GameBoard(15).context, GameBoard(20).context)
+        self.assertEqual(15, len(GameBoard(15).zobrist_table))
+
+    def test_rows_at_board_corner_are_clipped(self):
+        self.gameboard.move(1, 0, Marker.AI)
+        rows = self.gameboard.get_rows_containing_move(0, 0)
+        self.assertEqual([([0] * 6, 0), ([0, 2, 0, 0, 0, 0], 0), ([0] * 6, 0), ([0], 0)],
+                         [([int(n) for n in r], i) for r, i in rows])
+        rows = self.gameboard.get_rows_containing_move(19, 19)
+        self.assertEqual([5, 5, 5, 0], [i for _, i in rows])
+
+    def test_clone_board_copies_state(self):
+        gameboard = GameBoard(20, track_symmetries=True)
+        gameboard.move(5, 5, Marker.PLAYER)
+        clone = gameboard.clone_board()
+        clone.move(6, 6, Marker.AI)
+
+        self.assertIs(gameboard.context, clone.context)
+        self.assertEqual([(5,5)], gameboard.move_history)
+        self.assertEqual(Marker.EMPTY, gameboard.board[6][6])
+        self.assertNotEqual(gameboard.zobrist_hash, clone.zobrist_hash)
+        self.assertNotEqual(gameboard.symmetry_hashes, clone.symmetry_hashes)
+        self.assertNotIn((6,6), clone.candidates)
+        self.assertIn((6,6), gameboard.candidates)
+        clone.undo_move()
+        self.assertEqual(gameboard.symmetry_hashes, clone.symmetry_hashes)
+        self.assertEqual(set(gameboard.candidates), set(clone.candidates))
+
+    def test_lines_neighbourhood_matches_candidate_positions(self):
+        self.assertEqual(GameBoard.CANDIDATE_POSITIONS, GameBoard.neighbourhood(2))
+
+    def test_symmetry_hashes_match_transformed_boards(self):
+        tracked = GameBoard(20, track_symmetries=True)
+        moves = [(5,5), (6,5), (7,6), (6,6), (19,0)]
+        for i, (col, row) in enumerate(moves):
+            tracked.move(col, row, Marker.PLAYER if i % 2 == 0 else Marker.AI)
+
+        self.assertEqual(tracked.zobrist_hash, tracked.symmetry_hashes[0])
+        for symmetry in range(8):
+            transformed = GameBoard(20)
+            for i, move in enumerate(moves):
+                transformed.move(*tracked.to_canonical(move, symmetry),
+                                 Marker.PLAYER if i % 2 == 0 else Marker.AI)
+            self.assertEqual(transformed.zobrist_hash, tracked.symmetry_hashes[symmetry])
+            self.assertEqual(move, tracked.from_canonical(tracked.to_canonical(move, symmetry),
+                                                          symmetry))
+
+    def test_canonical_hash_is_equal_for_rotated_boards(self):
+        first = GameBoard(20, track_symmetries=True)
+        second = GameBoard(20, track_symmetries=True)
+        for i, (col, row) in enumerate([(9,9), (10,9), (11,12)]):
+            marker = Marker.PLAYER if i % 2 == 0 else Marker.AI
+            first.move(col, row, marker)
+            second.move(19 - row, col, marker)
+        self.assertNotEqual(first.zobrist_hash, second.zobrist_hash)
+        self.assertEqual(first.canonical_hash()[0], second.canonical_hash()[0])
+
+    def test_symmetry_tracking_stops_after_max_stones(self):
+        tracked = GameBoard(20, track_symmetries=True)
+        for i in range(GameBoard.SYMMETRY_MAX_STONES):
+            tracked.move(i, 0, Marker.PLAYER)
+        hashes = tracked.symmetry_hashes[:]
+
+        tracked.move(0, 5, Marker.AI)
+        self.assertEqual((tracked.zobrist_hash, 0), tracked.canonical_hash())
+        self.assertEqual(hashes, tracked.symmetry_hashes)
+        tracked.undo_move()
+        tracked.undo_move()
+        self.assertEqual(tracked.zobrist_hash, tracked.symmetry_hashes[0])
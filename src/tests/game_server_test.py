@@ -0,0 +1,163 @@
+import asyncio
+import unittest
+from http import HTTPStatus
+
+from bitboard import BitBoard
+from game_board import Marker
+
+import game_server
+from game_server import FairQueue, GameServer, HTTPError, SearchPool, search_move
+from gomoku_ai import GomokuAI
+from search_control import SearchControl
+from load_generator import run_load
+
+
+class TestFairQueue(unittest.TestCase):
+    def test_keys_are_served_in_turn(self):
+        async def run():
+            queue = FairQueue(10)
+            for key, item in [("a", 1), ("a", 2), ("a", 3), ("b", 4), ("c", 5), ("b", 6)]:
+                await queue.put(key, item)
+            return [await queue.get() for _ in range(6)]
+        self.assertEqual([1, 4, 5, 2, 6, 3], asyncio.run(run()))
+
+    def test_full_queue_rejects(self):
+        async def run():
+            queue = FairQueue(1)
+            await queue.put("a", 1)
+            with self.assertRaises(asyncio.QueueFull):
+                await queue.put("b", 2)
+            self.assertEqual(1, len(queue))
+        asyncio.run(run())
+
+
+class StoppedAI(GomokuAI):
+    """
+    AI whose searches are stopped before they start, like searches whose budget runs out while
+    the process waits for the CPU.
+    """
+    def find_ai_move(self, gameboard, candidates, turn_time_limit=10.0, control=None,
+                     progress=None, time_manager=None):
+        control = SearchControl()
+        control.stop()
+        return super().find_ai_move(gameboard, candidates, turn_time_limit, control, progress,
+                                    time_manager)
+
+
+class TestSearchMove(unittest.TestCase):
+    def tearDown(self):
+        for ai in game_server._worker_ais.values():
+            ai.close()
+        game_server._worker_ais.clear()
+        game_server._worker_ai_options.clear()
+
+    def test_each_starting_side_has_its_own_ai(self):
+        game_server._init_worker({"tt_size_mb": 1, "threat_search_time": 0})
+        # Positions with as many stones of either side have the player to move in the searches
+        # of games the player starts, and the AI in games the AI starts
+        search_move(15, [(7, 7, 1), (8, 8, 2), (7, 8, 1)], 0.1, True)
+        search_move(15, [(7, 7, 1), (8, 8, 2), (7, 8, 1), (8, 7, 2), (6, 9, 1)], 0.1, True)
+        self.assertEqual([True], list(game_server._worker_ais))
+        search_move(15, [(8, 8, 2), (7, 7, 1)], 0.1, False)
+        self.assertEqual({True, False}, set(game_server._worker_ais))
+        self.assertIsNot(game_server._worker_ais[True], game_server._worker_ais[False])
+
+    def test_stopped_search_falls_back_to_best_candidate(self):
+        moves = [(7, 7, 1), (8, 8, 2), (7, 8, 1), (9, 9, 2), (7, 9, 1)]
+        # The threat search polls the control first, so minimax finds it stopped
+        ai = game_server._worker_ais[True] = StoppedAI(tt_size_mb=1, verbose=False)
+        gameboard = BitBoard(15)
+        for col, row, marker in moves:
+            gameboard.move(col, row, Marker(marker))
+        self.assertIsNone(ai.find_ai_move(gameboard, set(gameboard.candidates), 1.0))
+        # The open three on column 7 is blocked at either end
+        self.assertIn(search_move(15, moves, 1.0, True), {(7, 6), (7, 10)})
+
+
+class TestGameServer(unittest.TestCase):
+    def test_games_and_errors(self):
+        async def run():
+            server = GameServer(SearchPool(1, 4, {"tt_size_mb": 1}), max_sessions=2)
+            server.pool.start()
+            try:
+                status, state = await server.route("POST", "/games",
+                                                   b'{"size": 15, "time_limit": 0.1}', "a")
+                self.assertEqual(HTTPStatus.CREATED, status)
+                path = f"/games/{state['id']}/moves"
+                _, state = await server.route("POST", path, b'{"move": [7, 7]}', "a")
+                self.assertEqual(2, len(state["moves"]))
+                self.assertEqual(state["moves"][1], state["ai_move"])
+
+                with self.assertRaises(HTTPError) as error:
+                    await server.route("POST", path, b'{"move": [7, 7]}', "a")
+                self.assertEqual(HTTPStatus.BAD_REQUEST, error.exception.status)
+                with self.assertRaises(HTTPError) as error:
+                    await server.route("GET", "/games/unknown", b"", "a")
+                self.assertEqual(HTTPStatus.NOT_FOUND, error.exception.status)
+
+                _, ai_first = await server.route("POST", "/games", b'{"player_starts": false}',
+                                                 "b")
+                self.assertEqual([[9, 9]], [list(move) for move in ai_first["moves"]])
+                with self.assertRaises(HTTPError) as error:
+                    await server.route("POST", "/games", b"", "c")
+                self.assertEqual(HTTPStatus.SERVICE_UNAVAILABLE, error.exception.status)
+
+                _, stats = await server.route("GET", "/stats", b"", "a")
+                self.assertEqual(2, stats["sessions"])
+                self.assertEqual(2, stats["completed"])
+            finally:
+                await server.pool.close()
+        asyncio.run(run())
+
+    def test_full_queue_returns_service_unavailable(self):
+        async def run():
+            server = GameServer(SearchPool(1, 0, {"tt_size_mb": 1}))
+            server.pool.start()
+            try:
+                with self.assertRaises(HTTPError) as error:
+                    await server.route("POST", "/games", b'{"player_starts": false}', "a")
+                self.assertEqual(HTTPStatus.SERVICE_UNAVAILABLE, error.exception.status)
+                self.assertEqual("1", error.exception.headers["Retry-After"])
+                self.assertEqual({}, server.sessions)
+
+                _, state = await server.route("POST", "/games", b"", "a")
+                with self.assertRaises(HTTPError):
+                    await server.route("POST", f"/games/{state['id']}/moves",
+                                       b'{"move": [9, 9]}', "a")
+                # The rejected move is taken back
+                self.assertEqual([], server.sessions[state["id"]].gameboard.move_history)
+                self.assertEqual(2, server.pool.stats()["rejected"])
+            finally:
+                await server.pool.close()
+        asyncio.run(run())
+
+    def test_clock_pays_for_ai_moves(self):
+        async def run():
+            server = GameServer(SearchPool(1, 4, {"tt_size_mb": 1}))
+            server.pool.start()
+            try:
+                with self.assertRaises(HTTPError) as error:
+                    await server.route("POST", "/games", b'{"clock": {"increment": 1}}', "a")
+                self.assertEqual(HTTPStatus.BAD_REQUEST, error.exception.status)
+
+                _, state = await server.route("POST", "/games",
+                                              b'{"clock": {"time": 2, "increment": 0.5}}', "a")
+                self.assertEqual(2.0, state["clock"])
+                _, state = await server.route("POST", f"/games/{state['id']}/moves",
+                                              b'{"move": [9, 9]}', "a")
+                # The move is planned for a twentieth of the clock plus the increment
+                self.assertLess(state["clock"], 2.5)
+                self.assertGreater(state["clock"], 2.0 - 3 * (2.0 / 20 + 0.5))
+            finally:
+                await server.pool.close()
+        asyncio.run(run())
+
+    def test_load_generator_plays_games_over_http(self):
+        summary = asyncio.run(run_load("127.0.0.1", 0, games=4, moves=2, clients=2,
+                                       time_limit=0.1, seed=1, workers=1, max_queue=2))
+        self.assertEqual(4, summary["finished_games"])
+        self.assertEqual(0, summary["errors"])
+        self.assertEqual(0, summary["server"]["sessions"])
+        self.assertEqual(0, summary["server"]["in_flight"])
+        self.assertGreaterEqual(summary["server"]["completed"], 4)
+        self.assertGreater(summary["server"]["queue_latency"]["max"], 0.0)
@@ -1,7 +1,6 @@
 import unittest
 from game_board import GameBoard, Marker
 from gomoku_ai import GomokuAI
-import time
 
 
 class TestGomokuAi(unittest.TestCase):
@@ -152,7 +151,7 @@ class TestGomokuAi(unittest.TestCase):
         self.setup_board(moves)
 
         value, move = self.ai.minimax(self.gameboard, alpha, beta, True, self.candidates,
-                                   current_state_value, 5, time.time(), 10.0, 5)
+                                   current_state_value, 5, 5)
         self.assertGreater(value, 0)
         self.assertIn(move, [(2,3), (6,3)])
 
@@ -164,6 +163,18 @@ class TestGomokuAi(unittest.TestCase):
         self.setup_board(moves)
 
         value, move = self.ai.minimax(self.gameboard, alpha, beta, False, self.candidates,
-                                   current_state_value, 5, time.time(), 10.0, 5)
+                                   current_state_value, 5, 5)
         self.assertLess(value, 0)
         self.assertIn(move, [(2,3), (6,3)])
+
+    def test_transposition_table_is_shared_by_symmetric_positions(self):
+        first = GameBoard(20, track_symmetries=True)
+        second = GameBoard(20, track_symmetries=True)
+        for i, (col, row) in enumerate([(9,9), (10,9), (11,12)]):
+            marker = Marker.PLAYER if i % 2 == 0 else Marker.AI
+            first.move(col, row, marker)
+            second.move(19 - row, col, marker)
+
+        self.ai.store(first, 1234, 0, (8,10), 4, GomokuAI.TT_EXACT)
+        self.assertEqual((1234, (9,8), 4, GomokuAI.TT_EXACT), self.ai.probe(second))
+        self.assertEqual((1234, (8,10), 4, GomokuAI.TT_EXACT), self.ai.probe(first))
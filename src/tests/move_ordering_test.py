@@ -0,0 +1,73 @@
+import random
+import unittest
+from game_board import GameBoard, Marker
+from move_ordering import MoveOrdering, OrderingWeights
+
+
+class TestMoveOrdering(unittest.TestCase):
+    def setUp(self):
+        self.gameboard = GameBoard(size=20)
+        self.gameboard.move(9, 9, Marker.PLAYER)
+        self.candidates = set()
+        self.gameboard.update_candidates(self.candidates, 9, 9)
+        self.ordering = MoveOrdering()
+
+    def test_closest_moves_first_without_tables(self):
+        moves = self.ordering.order(self.gameboard, self.candidates, None, 0, Marker.AI)
+        distances = [self.gameboard.get_distance_to_prev_move(*move) for move in moves]
+        self.assertEqual(sorted(distances), distances)
+
+    def test_tt_move_killers_and_counter_move_order(self):
+        ordering = self.ordering
+        ordering.record_cutoff(self.gameboard, (7,7), 2, 1, Marker.AI)
+        ordering.record_cutoff(self.gameboard, (11,11), 2, 1, Marker.AI)
+        ordering.counter_moves[(Marker.AI, (9,9))] = (9,7)
+        moves = ordering.order(self.gameboard, self.candidates, (11,9), 2, Marker.AI)
+        self.assertEqual([(11,9), (11,11), (7,7), (9,7)], moves[:4])
+
+    def test_killers_are_per_ply(self):
+        self.ordering.record_cutoff(self.gameboard, (7,7), 3, 1, Marker.AI)
+        self.assertEqual([(7,7), None], self.ordering.killers[3])
+        self.assertEqual([None, None], self.ordering.killers[2])
+
+    def test_repeated_killer_is_not_duplicated(self):
+        self.ordering.record_cutoff(self.gameboard, (7,7), 1, 1, Marker.AI)
+        self.ordering.record_cutoff(self.gameboard, (7,7), 1, 2, Marker.AI)
+        self.assertEqual([(7,7), None], self.ordering.killers[1])
+        self.assertEqual(2 + 4, self.ordering.history[(7,7)])
+
+    def test_counter_move_is_per_side(self):
+        ordering = MoveOrdering(OrderingWeights(history=0.0))
+        ordering.record_cutoff(self.gameboard, (7,7), 1, 1, Marker.PLAYER)
+        self.assertEqual((7,7), ordering.order(self.gameboard, self.candidates, None, 5,
+                                               Marker.PLAYER)[0])
+        self.assertNotEqual((7,7), ordering.order(self.gameboard, self.candidates, None, 5,
+                                                  Marker.AI)[0])
+
+    def test_history_weight_beats_distance(self):
+        ordering = MoveOrdering(OrderingWeights(history=10.0))
+        ordering.history[(7,7)] = 1
+        moves = ordering.order(self.gameboard, self.candidates, None, 0, Marker.AI)
+        self.assertEqual((7,7), moves[0])
+
+    def test_clear(self):
+        self.ordering.record_cutoff(self.gameboard, (7,7), 1, 1, Marker.AI)
+        self.ordering.clear()
+        self.assertEqual({}, self.ordering.history)
+        self.assertEqual({}, self.ordering.counter_moves)
+        self.assertEqual([None, None], self.ordering.killers[1])
+
+    def test_new_search_decays_history_and_shifts_killers(self):
+        self.ordering.record_cutoff(self.gameboard, (7,7), 3, 4, Marker.AI)
+        self.ordering.record_cutoff(self.gameboard, (8,8), 3, 1, Marker.AI)
+        self.ordering.new_search(2)
+        self.assertEqual({(7,7): 1}, self.ordering.history)
+        self.assertEqual([(8,8), (7,7)], self.ordering.killers[1])
+        self.assertEqual([None, None], self.ordering.killers[3])
+        self.assertEqual(MoveOrdering.MAX_PLY, len(self.ordering.killers))
+
+    def test_random_tie_breaks_keep_order_of_scores(self):
+        ordering = MoveOrdering(rng=random.Random(1))
+        moves = ordering.order(self.gameboard, self.candidates, (7,7), 0, Marker.AI)
+        self.assertEqual((7,7), moves[0])
+        self.assertEqual(set(self.candidates), set(moves))
@@ -0,0 +1,106 @@
+import os
+import random
+import tempfile
+import unittest
+
+from book_builder import BookBuilder, score_from_value
+from game_board import GameBoard, Marker
+from gomoku_ai import GomokuAI
+from opening_book import BookKeys, OpeningBook, write_book
+
+
+class TestOpeningBook(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "book.bin")
+        self.keys = BookKeys.for_size(20)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _board(self, moves):
+        gameboard = GameBoard(20)
+        for i, (col, row) in enumerate(moves):
+            gameboard.move(col, row, Marker.AI if (len(moves) - i) % 2 == 0 else Marker.PLAYER)
+        return gameboard
+
+    def test_canonical_key_is_equal_for_symmetric_positions(self):
+        moves = [(9,9), (10,9), (10,11)]
+        key, _ = self.keys.position_key(self._board(moves), Marker.AI)
+        for symmetry in range(8):
+            transformed = [self.keys.to_canonical(move, symmetry) for move in moves]
+            self.assertEqual(key, self.keys.position_key(self._board(transformed), Marker.AI)[0])
+
+    def test_canonical_key_depends_on_side_to_move(self):
+        gameboard = self._board([(9,9), (10,9), (12,12)])
+        self.assertNotEqual(self.keys.position_key(gameboard, Marker.AI)[0],
+                            self.keys.position_key(gameboard, Marker.PLAYER)[0])
+
+    def test_lookup_maps_move_to_board_orientation(self):
+        builder = BookBuilder(20, 4)
+        builder.add([(3,4)], (4,5), 800)
+        builder.write(self.path)
+        book = OpeningBook(self.path)
+
+        for symmetry in range(8):
+            gameboard = self._board([self.keys.to_canonical((3,4), symmetry)])
+            self.assertEqual(self.keys.to_canonical((4,5), symmetry),
+                             book.choose(gameboard, Marker.AI))
+        self.assertIsNone(book.choose(self._board([(3,4), (4,5)]), Marker.AI))
+        book.close()
+
+    def test_binary_search_finds_every_key(self):
+        rng = random.Random(1)
+        records = [(rng.getrandbits(64), (rng.randrange(20), rng.randrange(20)), 500, 1)
+                   for _ in range(200)]
+        write_book(self.path, 20, 8, records)
+        book = OpeningBook(self.path)
+        self.assertEqual(200, len(book))
+        for key, move, _, _ in records:
+            self.assertIn((move, 500, 1), book.find(key))
+        self.assertEqual([], book.find(1))
+        book.close()
+
+    def test_games_merge_weights_and_scores(self):
+        builder = BookBuilder(20, 2)
+        builder.add_game([(9,9), (10,10), (8,8)], 0)
+        builder.add_game([(10,10), (9,9), (11,11)], 1)
+        builder.write(self.path)
+        book = OpeningBook(self.path)
+
+        moves = book.lookup(GameBoard(20), Marker.AI)
+        self.assertEqual(2, len(moves))
+        self.assertEqual({(9,9), (10,10)}, {m.move for m in moves})
+        # The first moves are symmetric, so both games share the reply
+        replies = book.lookup(self._board([(9,9)]), Marker.AI)
+        self.assertEqual([(10,10)], [m.move for m in replies])
+        self.assertEqual(2, replies[0].weight)
+        self.assertEqual(500, replies[0].score)
+        book.close()
+
+    def test_invalid_file_raises(self):
+        with open(self.path, "wb") as file:
+            file.write(b"not a book at all")
+        with self.assertRaises(ValueError):
+            OpeningBook(self.path)
+
+    def test_score_from_value(self):
+        self.assertEqual(500, score_from_value(0))
+        self.assertEqual(1000, score_from_value(GameBoard.WIN_VALUE))
+        self.assertEqual(0, score_from_value(-GameBoard.WIN_VALUE))
+
+    def test_ai_plays_book_move(self):
+        builder = BookBuilder(20, 4)
+        builder.add([(3,4)], (5,5), 800)
+        builder.write(self.path)
+        book = OpeningBook(self.path)
+        ai = GomokuAI(verbose=False, opening_book=book)
+
+        gameboard = GameBoard(20)
+        candidates = set()
+        gameboard.update_candidates(candidates, 3, 4)
+        gameboard.move(3, 4, Marker.PLAYER)
+        self.assertEqual((5,5), ai.find_ai_move(gameboard, candidates, 10.0))
+        self.assertEqual(0, ai.search_control.nodes)
+        ai.close()
+        book.close()
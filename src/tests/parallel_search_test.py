@@ -0,0 +1,41 @@
+import unittest
+from game_board import GameBoard, Marker
+from gomoku_ai import GomokuAI
+
+
+class TestParallelSearch(unittest.TestCase):
+    def setUp(self):
+        self.gameboard = GameBoard(size=20)
+        self.ai = GomokuAI(workers=2, tt_size_mb=1, verbose=False)
+        self.candidates = set()
+
+    def tearDown(self):
+        self.ai.close()
+
+    def setup_board(self, moves: list[tuple[int, int, Marker]]) -> None:
+        for col, row, marker in moves:
+            self.gameboard.move(col, row, marker)
+            self.gameboard.update_candidates(self.candidates, col, row)
+
+    def test_parallel_search_finds_win(self):
+        moves = [(5,5, Marker.AI), (6,5,Marker.AI), (7,5,Marker.AI), (8,5,Marker.AI)]
+        self.setup_board(moves)
+        move = self.ai.find_ai_move(self.gameboard, self.candidates, 2)
+        self.assertIn(move, [(4,5), (9,5)])
+
+    def test_parallel_search_blocks_player_four(self):
+        moves = [(5,5,Marker.PLAYER), (6,5,Marker.PLAYER), (7,5,Marker.PLAYER), (8,5,Marker.PLAYER),
+                 (9,5,Marker.AI)]
+        self.setup_board(moves)
+        move = self.ai.find_ai_move(self.gameboard, self.candidates, 2)
+        self.assertEqual(move, (4,5))
+
+    def test_helpers_share_transposition_table(self):
+        self.setup_board([(5,5,Marker.PLAYER), (6,6,Marker.AI)])
+        self.ai.find_ai_move(self.gameboard, self.candidates, 1)
+        self.assertGreater(self.ai.transposition_table.stats()["used"], 0)
+
+    def test_close_stops_helpers(self):
+        processes = self.ai.parallel_search.processes
+        self.ai.close()
+        self.assertTrue(all(not p.is_alive() for p in processes))
@@ -0,0 +1,65 @@
+import unittest
+import itertools
+import random
+from game_board import GameBoard
+from pattern_table import PatternTable, BITS_TO_CODE, OFFSETS
+
+
+def string_row_value(gameboard: GameBoard, row: list[int]) -> int:
+    """The original string matching implementation of GameBoard.get_row_value."""
+    row = "".join(str(n) for n in row)
+
+    if "11" not in row and "101" not in row and "22" not in row and "202" not in row:
+        return 0
+
+    player_value = 0
+    ai_value = 0
+
+    for pattern, value in gameboard.player_patterns:
+        if pattern in row:
+            player_value = value
+            break
+
+    for pattern, value in gameboard.ai_patterns:
+        if pattern in row:
+            ai_value = value
+            break
+
+    if player_value >= gameboard.OPEN_THREE:
+        return ai_value - int(player_value*4)
+    return ai_value - int(player_value)
+
+
+class TestPatternTable(unittest.TestCase):
+    def setUp(self):
+        self.gameboard = GameBoard(20)
+        self.pattern_table = GameBoard.PATTERN_TABLE
+
+    def test_table_covers_all_rows_up_to_eleven_cells(self):
+        self.assertEqual(OFFSETS[11] + 3**11, len(self.pattern_table.table))
+
+    def test_table_matches_string_matching_for_short_rows(self):
+        for length in range(1, 9):
+            for row in itertools.product(range(3), repeat=length):
+                self.assertEqual(string_row_value(self.gameboard, list(row)),
+                                 self.pattern_table.row_value(list(row)), row)
+
+    def test_table_matches_string_matching_for_long_rows(self):
+        rng = random.Random(0)
+        for _ in range(20000):
+            row = [rng.choice((0, 0, 1, 2)) for _ in range(rng.randint(9, 11))]
+            self.assertEqual(string_row_value(self.gameboard, row),
+                             self.pattern_table.row_value(row), row)
+
+    def test_open_three_penalty_applied_to_player(self):
+        self.assertEqual(-4*GameBoard.OPEN_THREE, self.pattern_table.row_value([0, 1, 1, 1, 0]))
+        self.assertEqual(GameBoard.OPEN_THREE, self.pattern_table.row_value([0, 2, 2, 2, 0]))
+
+    def test_bits_to_code_places_ones_at_set_bits(self):
+        self.assertEqual(0, BITS_TO_CODE[0])
+        self.assertEqual(1 + 9, BITS_TO_CODE[0b101])
+
+    def test_custom_patterns(self):
+        table = PatternTable({"11": 5, "111": 7}, 6)
+        self.assertEqual(5, table.row_value([0, 2, 2]))
+        self.assertEqual(-28, table.row_value([1, 1, 1, 0]))
@@ -0,0 +1,114 @@
+import io
+import os
+import subprocess
+import sys
+import unittest
+
+from game_board import Marker
+from piskvork import PiskvorkEngine
+
+
+class TestPiskvorkEngine(unittest.TestCase):
+    def setUp(self):
+        self.output = io.StringIO()
+        self.engine = PiskvorkEngine(self.output)
+
+    def tearDown(self):
+        self.engine.close()
+
+    def send(self, *lines: str) -> list[str]:
+        start = len(self.output.getvalue())
+        for line in lines:
+            self.engine.handle(line)
+        return self.output.getvalue()[start:].splitlines()
+
+    def parse_move(self, answer: str) -> tuple[int, int]:
+        col, row = answer.split(",")
+        return int(col), int(row)
+
+    def test_start_and_begin_plays_centre(self):
+        self.assertEqual(["OK"], self.send("START 15"))
+        self.assertEqual(["7,7"], self.send("BEGIN"))
+        self.assertEqual(Marker.AI, self.engine.gameboard.board[7][7])
+
+    def test_start_and_restart_begin_with_a_fresh_ai(self):
+        self.send("START 15", "BEGIN")
+        first = self.engine.ai
+        self.send("START 15")
+        self.assertIsNone(self.engine.ai)
+        self.assertEqual(["7,7"], self.send("BEGIN"))
+        self.assertIsNot(first, self.engine.ai)
+        self.send("RESTART")
+        self.assertIsNone(self.engine.ai)
+        self.assertEqual(0, len(self.engine.gameboard.move_history))
+
+    def test_invalid_start_and_commands_before_start(self):
+        self.assertTrue(self.send("START 3")[0].startswith("ERROR"))
+        self.assertTrue(self.send("TURN 1,1")[0].startswith("ERROR"))
+        self.assertTrue(self.send("RECTSTART 20,15")[0].startswith("ERROR"))
+        self.assertEqual(["UNKNOWN command FOO"], self.send("FOO bar"))
+
+    def test_turn_places_opponent_stone_and_answers(self):
+        self.send("START 20", "INFO timeout_turn 300")
+        answers = self.send("TURN 9,9")
+        self.assertEqual(1, len(answers))
+        move = self.parse_move(answers[0])
+        self.assertEqual(Marker.PLAYER, self.engine.gameboard.board[9][9])
+        self.assertEqual(Marker.AI, self.engine.gameboard.board[move[1]][move[0]])
+        self.assertTrue(self.send("TURN 9,9")[0].startswith("ERROR"))
+
+    def test_board_blocks_open_four(self):
+        self.send("START 20", "INFO timeout_turn 1000")
+        answers = self.send("BOARD", "5,5,2", "6,5,2", "7,5,2", "8,5,2", "5,7,1", "6,8,1",
+                            "DONE")
+        self.assertIn(self.parse_move(answers[0]), {(4,5), (9,5)})
+        self.assertEqual(7, len(self.engine.gameboard.move_history))
+
+    def test_take_back_any_stone(self):
+        self.send("START 20", "BOARD", "5,5,2", "6,6,1", "7,7,2", "DONE")
+        self.assertEqual(["OK"], self.send("TAKEBACK 6,6"))
+        self.assertTrue(self.engine.gameboard.empty_space(6, 6))
+        self.assertEqual(Marker.PLAYER, self.engine.gameboard.board[7][7])
+        self.assertTrue(self.send("TAKEBACK 6,6")[0].startswith("ERROR"))
+
+    def test_time_limit_follows_turn_and_match_time(self):
+        engine = self.engine
+        self.send("INFO timeout_turn 5000")
+        turn_limit = 5.0 * engine.TIME_SAFETY - engine.TIME_MARGIN
+        time_manager = engine.time_manager()
+        self.assertAlmostEqual(turn_limit, time_manager.maximum)
+        self.assertAlmostEqual(turn_limit, time_manager.optimum)
+
+        self.send("INFO timeout_match 20000", "INFO time_left 10000")
+        time_left = 10.0 * engine.TIME_SAFETY - engine.TIME_MARGIN
+        time_manager = engine.time_manager()
+        self.assertAlmostEqual(time_left / engine.MATCH_MOVES_TO_GO, time_manager.optimum)
+        self.assertGreater(time_manager.maximum, time_manager.optimum)
+        self.assertLessEqual(time_manager.maximum, turn_limit)
+
+        self.send("INFO timeout_turn 0")
+        self.assertEqual(engine.MIN_TURN_TIME, engine.time_manager().maximum)
+
+    def test_transposition_table_fits_memory_limit(self):
+        self.assertEqual(PiskvorkEngine.DEFAULT_TT_MB, self.engine.tt_size_mb())
+        self.send("INFO max_memory 83886080")
+        self.assertEqual((80 - PiskvorkEngine.BASE_MEMORY_MB) * PiskvorkEngine.TT_MEMORY_SHARE,
+                         self.engine.tt_size_mb())
+        self.send("INFO max_memory 1000")
+        self.assertEqual(PiskvorkEngine.MIN_TT_MB, self.engine.tt_size_mb())
+
+    def test_end_stops_engine(self):
+        self.assertFalse(self.engine.handle("END"))
+        self.assertTrue(self.engine.handle("ABOUT"))
+        self.assertTrue(self.output.getvalue().startswith('name="gomoku"'))
+
+    def test_engine_process_does_not_import_pygame(self):
+        path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "piskvork.py")
+        result = subprocess.run(
+            [sys.executable, "-c", f"import runpy, sys; sys.argv = ['piskvork', '--no-book']; "
+                                   f"runpy.run_path({path!r}, run_name='__main__'); "
+                                   f"print('pygame' in sys.modules)"],
+            input="START 20\nINFO timeout_turn 200\nBEGIN\nEND\n", capture_output=True,
+            text=True, timeout=30, cwd=os.path.dirname(path))
+        self.assertEqual(["OK", "9,9", "False"], result.stdout.splitlines())
@@ -0,0 +1,89 @@
+import time
+import unittest
+from game_board import GameBoard, Marker
+from gomoku_ai import GomokuAI
+
+
+class TestPonder(unittest.TestCase):
+    def setUp(self):
+        self.gameboard = GameBoard(size=20)
+        self.ai = GomokuAI(tt_size_mb=1, verbose=False, threat_search_time=0)
+        self.candidates = set()
+
+    def tearDown(self):
+        self.ai.close()
+
+    def setup_board(self, moves: list[tuple[int, int, Marker]]) -> None:
+        for col, row, marker in moves:
+            self.gameboard.move(col, row, marker)
+            self.gameboard.update_candidates(self.candidates, col, row)
+
+    def play_ai_move(self, turn_time_limit: float) -> None:
+        move = self.ai.find_ai_move(self.gameboard, self.candidates, turn_time_limit)
+        self.setup_board([(*move, Marker.AI)])
+
+    def test_ponder_hit_answers_from_ponder_search(self):
+        self.setup_board([(9,9,Marker.PLAYER)])
+        self.play_ai_move(0.5)
+        history = self.gameboard.move_history[:]
+        expected = self.ai.principal_variation[1]
+
+        self.assertTrue(self.ai.start_pondering(self.gameboard, self.candidates))
+        time.sleep(1.0)
+        self.assertEqual(history, self.gameboard.move_history)
+
+        self.setup_board([(*expected, Marker.PLAYER)])
+        start = time.time()
+        move = self.ai.find_ai_move(self.gameboard, self.candidates, 1.0)
+        self.assertLess(time.time() - start, 0.5)
+        self.assertTrue(self.gameboard.valid_move(*move))
+        self.assertIsNone(self.ai.ponder_thread)
+
+    def test_ponder_hit_reports_progress(self):
+        self.setup_board([(9,9,Marker.PLAYER)])
+        self.play_ai_move(0.5)
+        expected = self.ai.principal_variation[1]
+        self.ai.start_pondering(self.gameboard, self.candidates)
+        time.sleep(0.5)
+
+        self.setup_board([(*expected, Marker.PLAYER)])
+        iterations = []
+        move = self.ai.find_ai_move(self.gameboard, self.candidates, 1.0,
+                                    progress=lambda *iteration: iterations.append(iteration))
+        self.assertGreater(len(iterations), 1)
+        self.assertEqual(list(range(1, len(iterations) + 1)), [i[0] for i in iterations])
+        self.assertTrue(self.gameboard.valid_move(*move))
+
+    def test_ponder_hit_without_result_searches_turn(self):
+        self.setup_board([(9,9,Marker.PLAYER)])
+        self.play_ai_move(0.5)
+        expected = self.ai.principal_variation[1]
+        self.ai.start_pondering(self.gameboard, self.candidates)
+        # A ponder search that fails leaves no result
+        self.ai.ponder_control.stop()
+        self.ai.ponder_thread.join()
+        self.ai.ponder_result.clear()
+
+        self.setup_board([(*expected, Marker.PLAYER)])
+        iterations = []
+        move = self.ai.find_ai_move(self.gameboard, self.candidates, 0.5,
+                                    progress=lambda *iteration: iterations.append(iteration))
+        self.assertTrue(self.gameboard.valid_move(*move))
+        self.assertGreater(len(iterations), 0)
+        self.assertIsNone(self.ai.ponder_thread)
+
+    def test_ponder_miss_searches_actual_position(self):
+        self.setup_board([(9,9,Marker.PLAYER)])
+        self.play_ai_move(0.5)
+        expected = self.ai.principal_variation[1]
+        self.ai.start_pondering(self.gameboard, self.candidates)
+
+        reply = next(m for m in sorted(self.candidates) if m != expected)
+        self.setup_board([(*reply, Marker.PLAYER)])
+        move = self.ai.find_ai_move(self.gameboard, self.candidates, 0.5)
+        self.assertIn(move, self.candidates)
+        self.assertIsNone(self.ai.ponder_thread)
+
+    def test_no_pondering_without_prediction(self):
+        self.setup_board([(9,9,Marker.PLAYER), (10,10,Marker.AI)])
+        self.assertFalse(self.ai.start_pondering(self.gameboard, self.candidates))
@@ -0,0 +1,84 @@
+import os
+import random
+import unittest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+from game_board import GameBoard, Marker
+from pygame_ui import PygameUI
+from search_worker import SearchUpdate
+
+
+class FinishedSearch:
+    """
+    Stands in for a SearchWorker whose search sends the given updates.
+    """
+    def __init__(self, updates: list[SearchUpdate]):
+        self.updates = updates
+
+    def start_search(self, gameboard, candidates) -> None:
+        pass
+
+    def get_update(self, timeout: float) -> SearchUpdate:
+        return self.updates.pop(0)
+
+
+class TestPygameUI(unittest.TestCase):
+    def setUp(self):
+        self.ui = PygameUI(20)
+        self.ui.set_starting_player(True)
+        self.gameboard = GameBoard(20)
+
+    def tearDown(self):
+        pygame.quit()
+
+    def screen(self) -> bytes:
+        return pygame.image.tostring(self.ui.display, "RGB")
+
+    def test_dirty_cells_match_full_redraw(self):
+        rng = random.Random(3)
+        self.ui.display_board(self.gameboard)
+        for i in range(120):
+            if self.gameboard.move_history and rng.random() < 0.3:
+                self.gameboard.undo_move()
+            else:
+                moves = [(c, r) for c in range(20) for r in range(20)
+                         if self.gameboard.valid_move(c, r)]
+                self.gameboard.move(*rng.choice(moves), Marker.PLAYER if i % 2 else Marker.AI)
+            self.ui.display_board(self.gameboard)
+        incremental = self.screen()
+
+        self.ui.drawn_stones = None
+        self.ui.display_board(self.gameboard)
+        self.assertEqual(self.screen(), incremental)
+
+    def test_only_changed_cells_are_drawn(self):
+        self.gameboard.move(5, 5, Marker.PLAYER)
+        self.assertEqual([self.ui.display.get_rect()], self.ui._draw_board(self.gameboard))
+        self.assertEqual([], self.ui._draw_board(self.gameboard))
+
+        self.gameboard.move(6, 5, Marker.AI)
+        dirty = self.ui._draw_board(self.gameboard)
+        # The new stone and the previous latest move, which loses its outline
+        self.assertEqual(2, len(dirty))
+        self.assertTrue(all(rect.width < 50 for rect in dirty))
+
+    def test_best_move_outline_matches_full_redraw(self):
+        self.gameboard.move(5, 5, Marker.PLAYER)
+        self.ui.display_board(self.gameboard)
+        for best_move in [(6, 6), (4, 5), None]:
+            self.ui.best_move = best_move
+            self.ui.display_board(self.gameboard)
+            incremental = self.screen()
+            self.ui.drawn_stones = None
+            self.ui.display_board(self.gameboard)
+            self.assertEqual(self.screen(), incremental)
+
+    def test_progress_is_cleared_when_search_ends(self):
+        self.gameboard.move(5, 5, Marker.PLAYER)
+        self.ui.display_board(self.gameboard)
+        before = self.screen()
+        worker = FinishedSearch([SearchUpdate(1, 120.0, (6, 6), 1000),
+                                 SearchUpdate(None, None, (6, 6), 1000, True)])
+        self.assertEqual((6, 6), self.ui.get_ai_move(self.gameboard, worker, set()))
+        self.assertEqual(before, self.screen())
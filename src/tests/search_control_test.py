@@ -0,0 +1,61 @@
+import threading
+import time
+import unittest
+from game_board import GameBoard, Marker
+from gomoku_ai import GomokuAI
+from search_control import SearchControl
+
+
+class TestSearchControl(unittest.TestCase):
+    def setUp(self):
+        self.gameboard = GameBoard(size=20)
+        self.ai = GomokuAI(tt_size_mb=1, verbose=False, threat_search_time=0)
+        self.candidates = set()
+
+    def setup_board(self, moves: list[tuple[int, int, Marker]]) -> None:
+        for col, row, marker in moves:
+            self.gameboard.move(col, row, marker)
+            self.gameboard.update_candidates(self.candidates, col, row)
+
+    def test_poll_interval_is_power_of_two(self):
+        self.assertEqual(1023, SearchControl(poll_interval=1000).poll_mask)
+        self.assertEqual(0, SearchControl(poll_interval=1).poll_mask)
+
+    def test_poll_notices_stop_and_deadline(self):
+        control = SearchControl()
+        self.assertFalse(control.poll())
+        control.stop()
+        self.assertTrue(control.poll())
+        self.assertTrue(SearchControl(0.0).poll())
+
+    def test_earlier_deadline_is_kept(self):
+        control = SearchControl(1.0)
+        deadline = control.deadline
+        control.set_time_limit(100.0)
+        self.assertEqual(deadline, control.deadline)
+
+    def test_stop_from_another_thread_returns_best_move(self):
+        self.setup_board([(9,9,Marker.PLAYER), (10,10,Marker.AI), (8,9,Marker.PLAYER)])
+        history = self.gameboard.move_history[:]
+        candidates = self.candidates.copy()
+        control = SearchControl()
+        timer = threading.Timer(1.0, control.stop)
+        timer.start()
+
+        start = time.time()
+        move = self.ai.find_ai_move(self.gameboard, self.candidates, 60.0, control)
+
+        self.assertLess(time.time() - start, 5.0)
+        self.assertIn(move, candidates)
+        self.assertEqual(move, self.ai.principal_variation[0])
+        self.assertEqual(history, self.gameboard.move_history)
+        self.assertEqual(candidates, self.candidates)
+
+    def test_principal_variation_follows_search(self):
+        self.setup_board([(5,5,Marker.PLAYER), (6,5,Marker.PLAYER), (7,5,Marker.PLAYER),
+                          (5,6,Marker.AI)])
+        move = self.ai.find_ai_move(self.gameboard, self.candidates, 1.0)
+        pv = self.ai.principal_variation
+        self.assertEqual(move, pv[0])
+        self.assertEqual(len(pv), len(set(pv)))
+        self.assertTrue(all(self.gameboard.valid_move(*m) for m in pv))
@@ -0,0 +1,87 @@
+import json
+import unittest
+from game_board import GameBoard, Marker
+from gomoku_ai import GomokuAI
+from search_control import SearchControl
+from search_stats import SearchStats
+
+
+class TestSearchStats(unittest.TestCase):
+    def setUp(self):
+        self.gameboard = GameBoard(size=20)
+        self.candidates = set()
+
+    def setup_board(self, moves: list[tuple[int, int, Marker]]) -> None:
+        for col, row, marker in moves:
+            self.gameboard.move(col, row, marker)
+            self.gameboard.update_candidates(self.candidates, col, row)
+
+    def search_with_window(self, window: float) -> tuple[list[float], SearchStats]:
+        ai = GomokuAI(tt_size_mb=1, verbose=False, threat_search_time=0, collect_stats=True,
+                      aspiration_window=window)
+        values = []
+        ai.iterative_deepening(self.gameboard, self.candidates, SearchControl(),
+                               progress=lambda depth, value, move: values.append(value),
+                               max_depth=4)
+        return values, ai.search_stats
+
+    def test_cutoffs_by_move_index(self):
+        stats = SearchStats()
+        for index in [0, 0, 0, 2]:
+            stats.add_cutoff(index)
+        self.assertEqual([3, 0, 1], stats.beta_cutoffs)
+        self.assertEqual(0.75, stats.first_move_cutoff_rate)
+
+    def test_pv_changes_count_completed_iterations(self):
+        stats = SearchStats()
+        stats.add_iteration(1, 0.1, 10, 5, (1,1), True)
+        stats.add_iteration(2, 0.1, 50, 3, (2,2), True)
+        stats.add_iteration(3, 0.1, 90, 4, (2,2), True)
+        stats.add_iteration(4, 0.1, 20, None, (3,3), False)
+        self.assertEqual(1, stats.pv_changes)
+
+    def test_json_lines(self):
+        stats = SearchStats()
+        stats.add_iteration(1, 0.1, 10, 5, (1,1), True)
+        lines = [json.loads(line) for line in stats.to_json_lines().splitlines()]
+        self.assertEqual(["iteration", "summary"], [line["type"] for line in lines])
+        self.assertEqual([1, 1], lines[0]["move"])
+
+    def test_search_fills_stats(self):
+        ai = GomokuAI(tt_size_mb=1, verbose=False, threat_search_time=0, collect_stats=True)
+        self.setup_board([(9,9,Marker.PLAYER), (10,10,Marker.AI), (8,9,Marker.PLAYER)])
+        ai.find_ai_move(self.gameboard, self.candidates, 1.0)
+
+        stats = ai.search_stats
+        self.assertEqual(ai.search_control.nodes, stats.nodes)
+        self.assertGreater(stats.tt_probes, stats.tt_hits)
+        self.assertGreater(sum(stats.beta_cutoffs), 0)
+        self.assertGreater(stats.first_move_cutoff_rate, 0.0)
+        self.assertEqual(list(range(1, len(stats.iterations) + 1)),
+                         [it["depth"] for it in stats.iterations])
+
+    def test_stats_are_off_by_default(self):
+        ai = GomokuAI(tt_size_mb=1, verbose=False, threat_search_time=0)
+        self.setup_board([(9,9,Marker.PLAYER)])
+        ai.find_ai_move(self.gameboard, self.candidates, 0.2)
+        self.assertIsNone(ai.search_stats)
+
+    def test_aspiration_research_keeps_iteration_values(self):
+        self.setup_board([(9,9,Marker.PLAYER), (10,10,Marker.AI), (8,9,Marker.PLAYER),
+                          (10,9,Marker.AI), (7,9,Marker.PLAYER)])
+        full_values, full_stats = self.search_with_window(0)
+        narrow_values, narrow_stats = self.search_with_window(1)
+        self.assertEqual(full_values, narrow_values)
+        self.assertEqual(0, full_stats.aspiration_researches)
+        self.assertGreater(narrow_stats.aspiration_researches, 0)
+
+    def test_research_rate(self):
+        ai = GomokuAI(tt_size_mb=1, verbose=False, threat_search_time=0, collect_stats=True)
+        self.setup_board([(9,9,Marker.PLAYER), (10,10,Marker.AI), (8,9,Marker.PLAYER)])
+        ai.iterative_deepening(self.gameboard, self.candidates, SearchControl(), max_depth=4)
+
+        stats = ai.search_stats
+        self.assertEqual(4, len(stats.iterations))
+        self.assertGreater(stats.null_window_searches, 0)
+        self.assertLessEqual(stats.researches, stats.null_window_searches)
+        self.assertEqual(stats.researches / stats.null_window_searches, stats.research_rate)
@@ -0,0 +1,87 @@
+import time
+import unittest
+from bitboard import BitBoard
+from game_board import Marker
+from search_worker import SearchWorker, decode_position, encode_position
+
+
+class TestPositionEncoding(unittest.TestCase):
+    def test_round_trip(self):
+        gameboard = BitBoard(15, track_symmetries=True)
+        candidates = set()
+        for col, row, marker in [(7,7,Marker.PLAYER), (8,8,Marker.AI), (14,0,Marker.PLAYER)]:
+            gameboard.move(col, row, marker)
+            gameboard.update_candidates(candidates, col, row)
+
+        position = encode_position(gameboard, candidates)
+        self.assertEqual(9, len(position[1]))
+        decoded, decoded_candidates = decode_position(*position)
+        self.assertEqual(gameboard.move_history, decoded.move_history)
+        self.assertEqual(gameboard.board, decoded.board)
+        self.assertEqual(gameboard.zobrist_hash, decoded.zobrist_hash)
+        self.assertEqual(candidates, decoded_candidates)
+
+
+class TestSearchWorker(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.worker = SearchWorker(15, opening_book=False, analysis_cache=False, verbose=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.worker.close()
+
+    def setUp(self):
+        self.gameboard = BitBoard(15, track_symmetries=True)
+        self.candidates = set()
+        for col, row, marker in [(7,7,Marker.PLAYER), (8,7,Marker.AI), (7,8,Marker.PLAYER)]:
+            self.gameboard.move(col, row, marker)
+            self.gameboard.update_candidates(self.candidates, col, row)
+
+    def collect_updates(self, timeout: float) -> list:
+        updates = []
+        deadline = time.monotonic() + timeout
+        while not updates or not updates[-1].done:
+            self.assertLess(time.monotonic(), deadline)
+            update = self.worker.get_update(0.1)
+            if update is not None:
+                updates.append(update)
+        return updates
+
+    def test_search_streams_iterations(self):
+        self.worker.new_game()
+        self.worker.start_search(self.gameboard, self.candidates, 1.0)
+        updates = self.collect_updates(10.0)
+
+        progress = updates[:-1]
+        self.assertGreater(len(progress), 1)
+        self.assertEqual(list(range(1, len(progress) + 1)), [u.depth for u in progress])
+        self.assertTrue(all(u.nodes_per_second > 0 for u in progress))
+        self.assertTrue(self.gameboard.valid_move(*updates[-1].move))
+        self.assertIsNone(updates[-1].depth)
+
+    def test_stop_returns_best_move_so_far(self):
+        self.worker.new_game()
+        self.worker.start_search(self.gameboard, self.candidates, 60.0)
+        time.sleep(0.5)
+        start = time.monotonic()
+        self.worker.stop()
+        updates = self.collect_updates(5.0)
+        self.assertLess(time.monotonic() - start, 2.0)
+        self.assertTrue(self.gameboard.valid_move(*updates[-1].move))
+
+    def test_search_after_pondering(self):
+        self.worker.new_game()
+        move = self.worker.find_ai_move(self.gameboard, self.candidates, 0.5)
+        self.gameboard.move(*move, Marker.AI)
+        self.gameboard.update_candidates(self.candidates, *move)
+        self.worker.start_pondering(self.gameboard, self.candidates)
+        time.sleep(0.5)
+
+        reply = next(move for move in sorted(self.candidates) if self.gameboard.valid_move(*move))
+        self.gameboard.move(*reply, Marker.PLAYER)
+        self.gameboard.update_candidates(self.candidates, *reply)
+        start = time.monotonic()
+        move = self.worker.find_ai_move(self.gameboard, self.candidates, 0.5)
+        self.assertLess(time.monotonic() - start, 2.0)
+        self.assertTrue(self.gameboard.valid_move(*move))
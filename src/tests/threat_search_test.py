@@ -0,0 +1,105 @@
+import unittest
+from game_board import GameBoard, Marker
+from gomoku_ai import GomokuAI
+from threat_search import ThreatSearch
+
+
+class TestThreatSearch(unittest.TestCase):
+    def setUp(self):
+        self.gameboard = GameBoard(size=20)
+
+    def setup_board(self, moves: list[tuple[int, int, Marker]]) -> None:
+        for col, row, marker in moves:
+            self.gameboard.move(col, row, marker)
+
+    def test_five_is_found_first(self):
+        self.setup_board([(5,5,Marker.AI), (6,5,Marker.AI), (7,5,Marker.AI), (8,5,Marker.AI),
+                          (4,5,Marker.PLAYER)])
+        line = ThreatSearch(self.gameboard, 1.0).find_win(Marker.AI)
+        self.assertEqual([(9,5)], line)
+
+    def test_open_four_is_immediate_win(self):
+        self.setup_board([(5,5,Marker.AI), (6,5,Marker.AI), (7,5,Marker.AI)])
+        line = ThreatSearch(self.gameboard, 1.0).find_win(Marker.AI, allow_threes=False)
+        self.assertIn(line, [[(4,5)], [(8,5)]])
+
+    def test_continuous_fours_win(self):
+        # Blocked fours on row 5 and row 8 each force a reply, after which column 8 wins
+        self.setup_board([(5,5,Marker.AI), (6,5,Marker.AI), (7,5,Marker.AI), (4,5,Marker.PLAYER),
+                          (8,6,Marker.AI), (8,7,Marker.AI), (8,4,Marker.PLAYER),
+                          (5,8,Marker.AI), (6,8,Marker.AI), (7,8,Marker.AI), (4,8,Marker.PLAYER)])
+        history = self.gameboard.move_history[:]
+
+        line = ThreatSearch(self.gameboard, 5.0).find_win(Marker.AI, allow_threes=False)
+
+        self.assertEqual(3, len(line))
+        self.assertIn(line[:2], [[(8,5), (9,5)], [(8,8), (9,8)]])
+        self.assertEqual(history, self.gameboard.move_history)
+
+    def test_continuous_threes_win(self):
+        # Two open twos crossing at (7,7) give a double open three
+        self.setup_board([(5,7,Marker.AI), (6,7,Marker.AI), (7,5,Marker.AI), (7,6,Marker.AI)])
+        line = ThreatSearch(self.gameboard, 5.0).find_win(Marker.AI)
+        self.assertIsNotNone(line)
+        self.assertEqual((7,7), line[0])
+
+    def test_no_win_without_threats(self):
+        self.setup_board([(5,5,Marker.AI), (9,9,Marker.AI), (6,6,Marker.PLAYER)])
+        self.assertIsNone(ThreatSearch(self.gameboard, 1.0).find_win(Marker.AI))
+
+    def test_attacker_must_block_defender_four(self):
+        self.setup_board([(5,5,Marker.AI), (6,5,Marker.AI), (7,5,Marker.AI),
+                          (5,9,Marker.PLAYER), (6,9,Marker.PLAYER), (7,9,Marker.PLAYER),
+                          (8,9,Marker.PLAYER), (9,9,Marker.AI)])
+        line = ThreatSearch(self.gameboard, 1.0).find_win(Marker.AI)
+        self.assertIsNone(line)
+
+    def test_classify_blocked_three_is_not_a_threat(self):
+        self.setup_board([(5,5,Marker.AI), (6,5,Marker.AI), (4,5,Marker.PLAYER)])
+        search = ThreatSearch(self.gameboard, 1.0)
+        self.assertIsNone(search.classify(7, 5, Marker.AI, True))
+        self.setup_board([(5,9,Marker.AI), (6,9,Marker.AI)])
+        self.assertIsNotNone(search.classify(7, 9, Marker.AI, True))
+
+    def test_ai_blocks_player_forced_win(self):
+        ai = GomokuAI(verbose=False, tt_size_mb=1)
+        self.setup_board([(5,7,Marker.PLAYER), (6,7,Marker.PLAYER), (7,5,Marker.PLAYER),
+                          (7,6,Marker.PLAYER), (12,12,Marker.AI)])
+        self.assertIsNone(ai.find_forced_move(self.gameboard, 1.0))
+        self.assertIn((7,7), ai.find_defences(self.gameboard, 2.0))
+
+    def test_ai_searches_defences_beyond_first_threat(self):
+        # The player's open three on column 9 wins with (9,5). Blocking there still loses to
+        # the four at (9,10), whose reply at (9,9) lets the player build threes around (7,7).
+        # Blocking the other end at (9,9) holds.
+        P, A = Marker.PLAYER, Marker.AI
+        self.setup_board([(7,7,P), (6,8,A), (9,6,P), (8,10,A), (8,9,P), (7,6,A), (5,6,P),
+                          (6,10,A), (9,8,P), (7,5,A), (9,7,P)])
+        self.assertEqual((9,5), ThreatSearch(self.gameboard, 1.0).find_win(P)[0])
+        ai = GomokuAI(verbose=False, tt_size_mb=1)
+        self.assertIsNone(ai.find_forced_move(self.gameboard, 1.0))
+        defences = ai.find_defences(self.gameboard, 2.0)
+        self.assertIn((9,9), defences)
+        self.assertNotIn((9,5), defences)
+
+        candidates = set()
+        for col, row in self.gameboard.move_history:
+            self.gameboard.update_candidates(candidates, col, row)
+        self.assertEqual((9,9), ai.find_ai_move(self.gameboard, candidates, 2.0))
+
+    def test_timeout_restores_board(self):
+        class StopAfterPolls:
+            def __init__(self, polls):
+                self.polls = polls
+
+            def poll(self):
+                self.polls -= 1
+                return self.polls < 0
+
+        self.setup_board([(5,5,Marker.AI), (6,5,Marker.AI), (7,5,Marker.AI), (4,5,Marker.PLAYER),
+                          (8,6,Marker.AI), (8,7,Marker.AI), (8,4,Marker.PLAYER),
+                          (5,8,Marker.AI), (6,8,Marker.AI), (7,8,Marker.AI), (4,8,Marker.PLAYER)])
+        history = self.gameboard.move_history[:]
+        search = ThreatSearch(self.gameboard, 5.0, StopAfterPolls(2))
+        self.assertIsNone(search.find_win(Marker.AI, allow_threes=False))
+        self.assertEqual(history, self.gameboard.move_history)
@@ -0,0 +1,72 @@
+import time
+import unittest
+from game_board import GameBoard, Marker
+from gomoku_ai import GomokuAI
+from time_manager import GameClock, TimeManager
+
+
+class TestTimeManager(unittest.TestCase):
+    def test_prediction_follows_growth_of_same_parity(self):
+        manager = TimeManager(100.0)
+        for depth, duration in [(1, 0.01), (2, 0.02), (3, 0.2)]:
+            manager.iteration_completed(depth, duration, 0, (0, 0))
+        # Depth 3 took 20 times as long as depth 1, so depth 4 takes 20 times depth 2
+        self.assertAlmostEqual(0.4, manager.predict_iteration_time(4))
+
+        first = TimeManager(100.0)
+        first.iteration_completed(1, 0.01, 0, (0, 0))
+        self.assertAlmostEqual(0.01 * TimeManager.DEFAULT_GROWTH, first.predict_iteration_time(2))
+
+    def test_iteration_that_cannot_finish_is_skipped(self):
+        manager = TimeManager(10.0, 10.0)
+        self.assertTrue(manager.iteration_completed(1, 0.01, 0, (0, 0)))
+        self.assertTrue(manager.iteration_completed(2, 0.01, 0, (0, 0)))
+        self.assertTrue(manager.iteration_completed(3, 0.1, 0, (0, 0)))
+        # Depth 5 is predicted to take 0.1 * 100 seconds, beyond the target
+        self.assertFalse(manager.iteration_completed(4, 1.0, 0, (0, 0)))
+
+    def test_target_follows_stability(self):
+        manager = TimeManager(10.0, 4.0)
+        manager.iteration_completed(1, 0.01, 0, (0, 0))
+        manager.iteration_completed(2, 0.01, 0, (0, 0))
+        stable = manager.target_time()
+        self.assertAlmostEqual(4.0 * TimeManager.STABLE_FACTOR, stable)
+
+        manager.iteration_completed(3, 0.01, 0, (1, 1))
+        changed = manager.target_time()
+        self.assertGreater(changed, stable)
+        manager.iteration_completed(4, 0.01, -TimeManager.SCORE_DROP - 1, (1, 1))
+        self.assertTrue(manager.score_dropped)
+        self.assertGreater(manager.target_time(), manager.optimum * TimeManager.STABLE_FACTOR)
+
+        manager.instability = 100.0
+        self.assertEqual(10.0, manager.target_time())
+
+    def test_clock_spreads_time_over_moves(self):
+        manager = TimeManager.for_clock(100.0, 2.0, moves_to_go=20)
+        self.assertAlmostEqual(7.0, manager.optimum)
+        self.assertAlmostEqual(21.0, manager.maximum)
+        self.assertAlmostEqual(5.0, TimeManager.for_clock(100.0, 2.0, max_turn_time=5.0).maximum)
+        short = TimeManager.for_clock(1.0, 10.0)
+        self.assertEqual(1.0, short.maximum)
+        self.assertEqual(1.0, short.optimum)
+
+        clock = GameClock(10.0, 1.0)
+        clock.consume(3.0)
+        self.assertEqual(8.0, clock.time_left)
+        clock.consume(20.0)
+        self.assertEqual(1.0, clock.time_left)
+
+    def test_search_stops_when_the_next_depth_does_not_fit(self):
+        gameboard = GameBoard(size=20)
+        candidates = set()
+        for col, row, marker in [(9,9,Marker.PLAYER), (10,10,Marker.AI)]:
+            gameboard.move(col, row, marker)
+            gameboard.update_candidates(candidates, col, row)
+        ai = GomokuAI(tt_size_mb=1, verbose=False, threat_search_time=0, collect_stats=True)
+        start = time.time()
+        move = ai.find_ai_move(gameboard, candidates, 10.0,
+                               time_manager=TimeManager(10.0, optimum=0.0))
+        self.assertLess(time.time() - start, 1.0)
+        self.assertTrue(gameboard.valid_move(*move))
+        self.assertEqual([1], [it["depth"] for it in ai.search_stats.iterations])
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+import tournament
+from gomoku_ai import GomokuAI
+from search_control import SearchControl
+from tournament import (EngineConfig, PairStats, analysis_cache_path, play_game, run_tournament,
+                        schedule)
+
+
+class StoppedAI(GomokuAI):
+    """
+    AI whose searches are stopped before they start, like searches of a short time limit on a
+    busy machine.
+    """
+    def find_ai_move(self, gameboard, candidates, turn_time_limit=10.0, control=None,
+                     progress=None, time_manager=None):
+        control = SearchControl()
+        control.stop()
+        return super().find_ai_move(gameboard, candidates, turn_time_limit, control, progress,
+                                    time_manager)
+
+
+class TestTournament(unittest.TestCase):
+    def setUp(self):
+        self.fast = EngineConfig("fast", 0.05, {"tt_size_mb": 1, "threat_search_time": 0})
+        self.slow = EngineConfig("slow", 0.1, {"tt_size_mb": 1})
+
+    def test_parse_engine_spec(self):
+        config = EngineConfig.parse("fast:time_limit=0.5,threat_search_time=0,tt_size_mb=4")
+        self.assertEqual("fast", config.name)
+        self.assertEqual(0.5, config.time_limit)
+        self.assertEqual({"threat_search_time": 0, "tt_size_mb": 4}, config.options)
+        self.assertEqual({}, EngineConfig.parse("base").options)
+
+    def test_schedule_swaps_colours_on_each_opening(self):
+        openings = [[(9,9)], [(9,9), (10,10)]]
+        games = schedule([self.fast, self.slow], openings, 4)
+        self.assertEqual([("fast", "slow", [(9,9)]), ("slow", "fast", [(9,9)]),
+                          ("fast", "slow", [(9,9), (10,10)]), ("slow", "fast", [(9,9), (10,10)])],
+                         [(b.name, w.name, o) for b, w, o in games])
+
+    def test_game_ends_with_five_or_move_limit(self):
+        record = play_game(self.fast, self.slow, [(9,9), (10,10)], max_moves=8)
+        self.assertLessEqual(len(record["moves"]), 8)
+        self.assertEqual(len(record["moves"]), len(set(record["moves"])))
+        self.assertEqual([(9,9), (10,10)], record["moves"][:2])
+        self.assertEqual(3, record["stats"]["fast"]["moves"])
+        self.assertGreater(record["stats"]["slow"]["nodes"], 0)
+
+    def test_engines_use_own_analysis_cache_per_colour(self):
+        self.assertEqual(os.path.join("cache", "analysis.fast.black.bin"),
+                         analysis_cache_path(os.path.join("cache", "analysis.bin"), "fast",
+                                             "black"))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "analysis.bin")
+            for engine in (self.fast, self.slow):
+                engine.options["analysis_cache"] = path
+            play_game(self.fast, self.slow, [(9,9), (10,10)], max_moves=4)
+            play_game(self.slow, self.fast, [(9,9), (10,10)], max_moves=4)
+            self.assertEqual(["analysis.fast.black.bin", "analysis.fast.white.bin",
+                              "analysis.slow.black.bin", "analysis.slow.white.bin"],
+                             sorted(os.listdir(directory)))
+
+    def test_stopped_searches_play_fallback_moves(self):
+        tournament.GomokuAI = StoppedAI
+        try:
+            record = play_game(self.slow, EngineConfig("other", 0.1, {"tt_size_mb": 1}),
+                               [(9,9), (10,10)], max_moves=6)
+        finally:
+            tournament.GomokuAI = GomokuAI
+        self.assertEqual(6, len(set(record["moves"])))
+        for stats in record["stats"].values():
+            self.assertEqual(2, stats["moves"])
+            self.assertEqual(2, stats["fallback_moves"])
+
+    def test_winning_opening_is_converted(self):
+        opening = [(5,5), (5,10), (6,5), (6,10), (7,5), (7,10), (8,5), (9,12)]
+        record = play_game(self.fast, self.slow, opening)
+        self.assertEqual("fast", record["winner"])
+
+    def test_elo_and_sprt(self):
+        pair = PairStats("a", "b")
+        for winner in (["a"] * 60 + ["b"] * 20 + [None] * 20) * 3:
+            pair.add(winner)
+        elo, low, high = pair.elo()
+        self.assertAlmostEqual(147.19, elo, places=1)
+        self.assertLess(low, elo)
+        self.assertGreater(high, elo)
+        self.assertEqual("H1", pair.sprt(0, 10)[3])
+
+        even = PairStats("a", "b")
+        for winner in ["a", "b"] * 5000:
+            even.add(winner)
+        self.assertEqual(0.0, even.elo()[0])
+        self.assertEqual("H0", even.sprt(0, 10)[3])
+
+    def test_run_tournament_streams_results(self):
+        records = []
+        summary = run_tournament([self.fast, self.slow], [[(9,9)]], 2, workers=1, max_moves=4,
+                                 on_result=records.append)
+        self.assertEqual(2, len(records))
+        self.assertEqual(2, summary["pairs"][0]["games"])
+        self.assertGreater(summary["engines"]["fast"]["nps"], 0)
@@ -0,0 +1,93 @@
+import unittest
+from transposition_table import TranspositionTable
+
+
+class TestTranspositionTable(unittest.TestCase):
+    def setUp(self):
+        self.tt = TranspositionTable(size_mb=1)
+
+    def bucket_key(self, key: int, n: int) -> int:
+        """Returns a key different from the given key that maps to the same bucket."""
+        return key + n * (self.tt.mask + 1)
+
+    def test_capacity_fits_memory_budget(self):
+        self.assertLessEqual(len(self.tt.buffer), 2**20)
+        self.assertEqual(2**20 // 16, self.tt.capacity)
+
+    def test_store_and_probe_returns_entry(self):
+        self.tt.store(12345, -678, (3, 19), 5, 2)
+        self.assertEqual((-678, (3, 19), 5, 2), self.tt.probe(12345))
+
+    def test_probe_missing_key_returns_none(self):
+        self.assertIsNone(self.tt.probe(12345))
+
+    def test_infinite_values_and_no_move_are_packed(self):
+        self.tt.store(1, float("inf"), None, 0, 0)
+        self.tt.store(2, float("-inf"), None, 3, 1)
+        self.assertEqual((float("inf"), None, 0, 0), self.tt.probe(1))
+        self.assertEqual((float("-inf"), None, 3, 1), self.tt.probe(2))
+
+    def test_full_64_bit_keys_are_stored(self):
+        key = 2**64 - 1
+        self.tt.store(key, 10, (0, 0), 1, 0)
+        self.assertEqual(10, self.tt.probe(key)[0])
+        self.assertIsNone(self.tt.probe(key & self.tt.mask))
+
+    def test_deeper_entry_is_kept_over_shallow_ones(self):
+        self.tt.store(7, 100, (1, 1), 6, 0)
+        self.tt.store(self.bucket_key(7, 1), 200, (2, 2), 2, 0)
+        self.tt.store(self.bucket_key(7, 2), 300, (3, 3), 1, 0)
+
+        self.assertEqual(100, self.tt.probe(7)[0])
+        self.assertIsNone(self.tt.probe(self.bucket_key(7, 1)))
+        self.assertEqual(300, self.tt.probe(self.bucket_key(7, 2))[0])
+
+    def test_deeper_entry_demotes_old_entry(self):
+        self.tt.store(7, 100, (1, 1), 2, 0)
+        self.tt.store(self.bucket_key(7, 1), 200, (2, 2), 4, 0)
+
+        self.assertEqual(100, self.tt.probe(7)[0])
+        self.assertEqual(200, self.tt.probe(self.bucket_key(7, 1))[0])
+
+    def test_entry_of_earlier_generation_is_replaced(self):
+        self.tt.store(7, 100, (1, 1), 6, 0)
+        self.tt.new_search()
+        self.tt.store(self.bucket_key(7, 1), 200, (2, 2), 2, 0)
+        self.tt.store(self.bucket_key(7, 2), 300, (3, 3), 1, 0)
+
+        self.assertIsNone(self.tt.probe(7))
+        self.assertEqual(200, self.tt.probe(self.bucket_key(7, 1))[0])
+        self.assertEqual(300, self.tt.probe(self.bucket_key(7, 2))[0])
+
+    def test_same_position_is_replaced_in_place(self):
+        self.tt.store(7, 100, (1, 1), 6, 0)
+        self.tt.store(7, 50, (1, 2), 2, 1)
+        self.assertEqual((50, (1, 2), 2, 1), self.tt.probe(7))
+        self.assertEqual(1, self.tt.stats()["used"])
+
+    def test_stats_count_hits_collisions_and_overwrites(self):
+        self.tt.store(7, 1, None, 1, 0)
+        self.tt.store(self.bucket_key(7, 1), 2, None, 1, 0)
+        self.tt.store(self.bucket_key(7, 2), 3, None, 1, 0)
+        self.tt.probe(self.bucket_key(7, 2))
+        self.tt.probe(self.bucket_key(7, 3))
+
+        stats = self.tt.stats()
+        self.assertEqual(2, stats["used"])
+        self.assertEqual(1, stats["overwrites"])
+        self.assertEqual(1, stats["hits"])
+        self.assertEqual(1, stats["collisions"])
+        self.assertEqual(2 / self.tt.capacity, stats["fill_rate"])
+
+    def test_clear_removes_entries(self):
+        self.tt.store(7, 1, None, 1, 0)
+        self.tt.clear()
+        self.assertIsNone(self.tt.probe(7))
+        self.assertEqual(0, self.tt.stats()["used"])
+
+    def test_table_can_use_external_buffer(self):
+        buffer = bytearray(2**16)
+        TranspositionTable(buffer=buffer).store(99, 5, (4, 4), 3, 0)
+        shared = TranspositionTable(buffer=buffer)
+        self.assertEqual((5, (4, 4), 3, 0), shared.probe(99))
+        self.assertEqual(1, shared.stats()["used"])
@@ -0,0 +1,234 @@
+import time
+from functools import lru_cache
+from typing import Optional
+
+from game_board import GameBoard, Marker, Move
+from pattern_table import BITS_TO_CODE
+from search_control import SearchControl
+
+
+class ThreatSearch:
+    """
+    Threat-space search for forced wins. The attacker only plays moves that make a four
+    (victory by continuous fours, VCF) or, optionally, also moves that make an open three
+    (victory by continuous threes, VCT). The defender only answers with the moves that stop the
+    threat and with fours of its own. Every line is checked against the nine cell window centred
+    on the move, which is classified with a cached lookup on its base-3 code.
+    """
+    VCF_DEPTH = 8
+    VCT_DEPTH = 3
+
+    class SearchTimeout(Exception):
+        pass
+
+    def __init__(self, gameboard: GameBoard, time_limit: float,
+                 control: Optional[SearchControl]=None):
+        """
+        :param gameboard: Instance of GameBoard, restored to its original state after searching
+        :param time_limit: Time limit for the whole search in seconds
+        :param control: Optional search control whose stop event also ends the search
+        """
+        self.gameboard = gameboard
+        self.deadline = time.time() + time_limit
+        self.control = control
+        self.nodes = 0
+
+    def find_win(self, attacker: Marker, allow_threes: bool=True) -> Optional[list[Move]]:
+        """
+        Searches for a forced win of the attacker, assuming the attacker moves next. Shorter
+        wins are searched first and continuous fours are tried before threes.
+        :param attacker: Marker of the attacking side
+        :param allow_threes: Whether open threes are used as threats
+        :return: The winning line starting with the attacker's move, or None if no win was found
+                 within the depth and time limits
+        """
+        history_length = len(self.gameboard.move_history)
+        try:
+            for depth in range(1, self.VCF_DEPTH + 1):
+                line = self._attack(attacker, depth, False)
+                if line is not None:
+                    return line
+            if allow_threes:
+                for depth in range(2, self.VCT_DEPTH + 1):
+                    line = self._attack(attacker, depth, True)
+                    if line is not None:
+                        return line
+        except ThreatSearch.SearchTimeout:
+            # The timeout unwinds from the middle of a line, take back its moves
+            while len(self.gameboard.move_history) > history_length:
+                self.gameboard.undo_move()
+        return None
+
+    def _attack(self, attacker: Marker, depth: int, allow_threes: bool) -> Optional[list[Move]]:
+        """
+        Tries every threat of the attacker and returns the first one that wins against all of the
+        defender's answers.
+        :param attacker: Marker of the attacking side
+        :param depth: Number of threats the attacker may still make
+        :param allow_threes: Whether open threes are used as threats
+        :return: Winning line or None
+        """
+        self.nodes += 1
+        # Every node scans the whole board for threats, so the clock is cheap in comparison
+        if time.time() >= self.deadline or self.control is not None and self.control.poll():
+            raise ThreatSearch.SearchTimeout()
+
+        defender = Marker.PLAYER if attacker == Marker.AI else Marker.AI
+        threats = self.find_threats(attacker, allow_threes)
+
+        for move, fives, _ in threats:
+            if move in fives:
+                return [move]
+
+        defender_fives = set()
+        for move, fives, _ in self.find_threats(defender, False):
+            defender_fives.update(fives)
+        if len(defender_fives) > 1:
+            return None
+
+        for move, fives, defences in threats:
+            if defender_fives and move not in defender_fives:
+                continue
+            if len(fives) > 1:
+                return [move]
+            if depth == 1:
+                continue
+
+            self.gameboard.move(*move, attacker)
+            replies = fives if fives else self._three_replies(defender, defences)
+            line = None
+            for reply in replies:
+                self.gameboard.move(*reply, defender)
+                if self.gameboard.win_state():
+                    continue_line = None
+                else:
+                    continue_line = self._attack(attacker, depth - 1, allow_threes)
+                self.gameboard.undo_move()
+                if continue_line is None:
+                    line = None
+                    break
+                if line is None:
+                    line = [move, reply] + continue_line
+            self.gameboard.undo_move()
+
+            if line is not None:
+                return line
+        return None
+
+    def _three_replies(self, defender: Marker, defences: set[Move]) -> list[Move]:
+        """
+        Collects the defender's answers to an open three: the cells that stop the three from
+        becoming an open four and every move that makes a four for the defender.
+        :param defender: Marker of the defending side
+        :param defences: Cells that stop the three
+        :return: List of replies
+        """
+        replies = set(defences)
+        for move, fives, _ in self.find_threats(defender, False):
+            if fives:
+                replies.add(move)
+        return sorted(replies)
+
+    def find_threats(self, marker: Marker,
+                     allow_threes: bool) -> list[tuple[Move, set[Move], set[Move]]]:
+        """
+        Finds the moves that make a five, a four or, optionally, an open three for the marker.
+        Such moves are always within four steps of one of the marker's stones on a line.
+        :param marker: Player or AI marker
+        :param allow_threes: Whether moves making open threes are included
+        :return: List of (move, cells completing a five, cells stopping an open three) tuples.
+                 Moves that complete a five contain themselves in the five cells.
+        """
+        gameboard = self.gameboard
+        board = gameboard.board
+        seen = set()
+        threats = []
+
+        for col, row in gameboard.move_history:
+            if board[row][col] != marker:
+                continue
+            for dx, dy in GameBoard.DIRECTIONS:
+                for i in (-4, -3, -2, -1, 1, 2, 3, 4):
+                    c = col + i*dx
+                    r = row + i*dy
+                    if (c, r) in seen or not gameboard.valid_move(c, r):
+                        continue
+                    seen.add((c, r))
+                    threat = self.classify(c, r, marker, allow_threes)
+                    if threat is not None:
+                        threats.append(threat)
+
+        threats.sort(key=lambda t: (t[0] not in t[1], len(t[1]) < 2, not t[1],
+                                    -gameboard.get_move_value(*t[0], marker)))
+        return threats
+
+    def classify(self, col: int, row: int, marker: Marker,
+                 allow_threes: bool) -> Optional[tuple[Move, set[Move], set[Move]]]:
+        """
+        Classifies the move (col, row) by the windows of the four lines through it.
+        :param col: Column of the board
+        :param row: Row of the board
+        :param marker: Player or AI marker
+        :param allow_threes: Whether moves making open threes are classified as threats
+        :return: (move, five cells, three defences) tuple or None if the move is not a threat
+        """
+        gameboard = self.gameboard
+        board = gameboard.board
+        fives = set()
+        defences = set()
+
+        for dx, dy in GameBoard.DIRECTIONS:
+            own = 1 << 4
+            blocked = 0
+            for i in (-4, -3, -2, -1, 1, 2, 3, 4):
+                c = col + i*dx
+                r = row + i*dy
+                if not gameboard.valid_coordinate(c, r):
+                    blocked |= 1 << (i + 4)
+                elif board[r][c] == marker:
+                    own |= 1 << (i + 4)
+                elif board[r][c] != Marker.EMPTY:
+                    blocked |= 1 << (i + 4)
+
+            window_fives, window_defences = _classify_window(BITS_TO_CODE[own]
+                                                             + 2*BITS_TO_CODE[blocked])
+            for i in window_fives:
+                fives.add((col + (i-4)*dx, row + (i-4)*dy))
+            if allow_threes and not window_fives:
+                for i in window_defences:
+                    defences.add((col + (i-4)*dx, row + (i-4)*dy))
+
+        if not fives and not defences:
+            return None
+        return (col, row), fives, defences
+
+
+@lru_cache(maxsize=None)
+def _classify_window(code: int) -> tuple[tuple[int, ...], tuple[int, ...]]:
+    """
+    Classifies a nine cell window whose centre holds the moving marker.
+    :param code: Base-3 code of the window, 1 for own stones and 2 for blocked cells
+    :return: Indices completing a five through the centre (the centre itself for a five) and,
+             when the centre makes an open three, the indices that stop it
+    """
+    cells = [code // 3**i % 3 for i in range(9)]
+    own = sum(1 << i for i, c in enumerate(cells) if c == 1)
+    empty = [i for i, c in enumerate(cells) if c == 0]
+
+    def makes_five(bits):
+        return any(bits >> start & 0x1F == 0x1F for start in range(5))
+
+    if makes_five(own):
+        return (4,), ()
+
+    fives = tuple(i for i in empty if makes_five(own | 1 << i))
+    if fives:
+        return fives, ()
+
+    defences = set()
+    for i in empty:
+        four_fives = [j for j in empty if j != i and makes_five(own | 1 << i | 1 << j)]
+        if len(four_fives) > 1:
+            defences.add(i)
+            defences.update(four_fives)
+    return (), tuple(sorted(defences))
@@ -0,0 +1,172 @@
+import time
+from typing import Optional
+
+from game_board import GameBoard, Move
+
+
+class TimeManager:
+    """
+    Decides after every iteration of iterative deepening whether the next one is started. The
+    turn has an optimum time, which the search aims at, and a maximum time, which it never
+    exceeds and which the search control enforces.
+
+    The time of the next iteration is predicted from the growth of the completed ones. The value
+    and the cost of a search swing between odd and even depths, so the growth over the last two
+    depths is applied to the iteration of the same parity as the next one. An iteration that is
+    not predicted to finish within the target time is not started, since a stopped iteration
+    only leaves a partial result.
+
+    The target time is the optimum time scaled by how settled the search is. It shrinks while
+    the best move stays the same and grows when the best move changes or the value drops from
+    the previous iteration of the same parity, but never beyond the maximum.
+    """
+    OPTIMUM_SHARE = 0.5
+    # Growth of the iteration time over two depths, used until three iterations are completed
+    # and as the lower bound of the measured growth
+    DEFAULT_GROWTH = 16.0
+    MIN_GROWTH = 4.0
+    # Iteration times below this are timer noise
+    MIN_ITERATION_TIME = 0.001
+
+    # Target time relative to the optimum for a settled search, and the growth per recent change
+    # of the best move. Older changes count half as much per iteration.
+    STABLE_FACTOR = 0.7
+    INSTABILITY_WEIGHT = 0.6
+    INSTABILITY_DECAY = 0.5
+    # Value drop from the previous iteration of the same parity that extends the target time
+    SCORE_DROP = GameBoard.OPEN_THREE
+    SCORE_DROP_FACTOR = 1.5
+
+    # Longest turn on a game clock relative to its optimum
+    CLOCK_MAXIMUM_FACTOR = 3.0
+
+    def __init__(self, maximum: float, optimum: Optional[float]=None,
+                 start_time: Optional[float]=None):
+        """
+        :param maximum: Longest time of the turn in seconds
+        :param optimum: Time the turn aims at, defaults to OPTIMUM_SHARE of the maximum
+        :param start_time: Time the turn is measured from, defaults to now
+        """
+        if optimum is None:
+            optimum = maximum * self.OPTIMUM_SHARE
+        self.maximum = maximum
+        self.optimum = min(optimum, maximum)
+        self.start_time = start_time if start_time is not None else time.time()
+        self.iteration_times: dict[int, float] = {}
+        self.values: dict[int, float] = {}
+        self.best_move: Optional[Move] = None
+        self.instability = 0.0
+        self.score_dropped = False
+
+    @classmethod
+    def for_clock(cls, time_left: float, increment: float=0.0, moves_to_go: int=20,
+                  max_turn_time: float=float("inf"), max_share: float=0.25,
+                  start_time: Optional[float]=None) -> "TimeManager":
+        """
+        Creates the time manager of a turn played on a game clock. The optimum spreads the
+        remaining time over the expected moves and adds the increment. The maximum allows
+        spending CLOCK_MAXIMUM_FACTOR optimums on a difficult move, but at most max_share of the
+        clock.
+        :param time_left: Time left on the clock in seconds, after any safety margin
+        :param increment: Time added to the clock after each move
+        :param moves_to_go: Number of moves the remaining time is spread over
+        :param max_turn_time: Longest time of a single turn, e.g. a turn time limit
+        :param max_share: Largest share of the remaining time spent on one move
+        :param start_time: Time the turn is measured from, defaults to now
+        :return: TimeManager
+        """
+        time_left = max(time_left, 0.0)
+        optimum = time_left / moves_to_go + increment
+        maximum = min(max_turn_time, cls.CLOCK_MAXIMUM_FACTOR * optimum,
+                      max(time_left * max_share, optimum), time_left)
+        return cls(maximum, optimum, start_time)
+
+    def elapsed(self) -> float:
+        return time.time() - self.start_time
+
+    def set_limits(self, maximum: float, optimum: float) -> None:
+        """
+        Replaces the limits of the turn, e.g. when a ponder search becomes the search of a turn.
+        :return: None
+        """
+        self.maximum = maximum
+        self.optimum = min(optimum, maximum)
+
+    def target_time(self) -> float:
+        """
+        Gives the time the search aims at, given its stability so far.
+        :return: Target time in seconds
+        """
+        factor = self.STABLE_FACTOR + self.INSTABILITY_WEIGHT * self.instability
+        if self.score_dropped:
+            factor *= self.SCORE_DROP_FACTOR
+        return min(self.maximum, self.optimum * factor)
+
+    def predict_iteration_time(self, depth: int) -> float:
+        """
+        Predicts the time of an iteration from the iteration two depths shallower and the growth
+        of the time over the last two completed depths.
+        :param depth: Depth of the iteration
+        :return: Predicted time in seconds
+        """
+        times = self.iteration_times
+        last = times.get(depth - 1, self.MIN_ITERATION_TIME)
+        same_parity = times.get(depth - 2)
+        if same_parity is None:
+            return last * self.DEFAULT_GROWTH
+        if depth - 3 not in times:
+            return same_parity * self.DEFAULT_GROWTH
+        growth = max(self.MIN_GROWTH, last / times[depth - 3])
+        return max(same_parity * growth, last)
+
+    def iteration_completed(self, depth: int, duration: float, value: float, move: Move) -> bool:
+        """
+        Records a completed iteration and decides whether the next one is started.
+        :param depth: Depth of the iteration
+        :param duration: Time the iteration took in seconds
+        :param value: Value of the iteration
+        :param move: Best move of the iteration
+        :return: True if the next iteration is predicted to finish within the target time
+        """
+        self.iteration_times[depth] = max(duration, self.MIN_ITERATION_TIME)
+        self.values[depth] = value
+        self.instability *= self.INSTABILITY_DECAY
+        if self.best_move is not None and move != self.best_move:
+            self.instability += 1.0
+        self.best_move = move
+        previous = self.values.get(depth - 2)
+        self.score_dropped = previous is not None and value < previous - self.SCORE_DROP
+
+        finish = self.elapsed() + self.predict_iteration_time(depth + 1)
+        return finish <= self.target_time()
+
+
+class GameClock:
+    """
+    Clock of one side of a game with a Fischer increment: the increment is added after every
+    move.
+    """
+    def __init__(self, time_left: float, increment: float=0.0):
+        """
+        :param time_left: Initial time on the clock in seconds
+        :param increment: Time added after each move in seconds
+        """
+        self.time_left = time_left
+        self.increment = increment
+
+    def time_manager(self, moves_to_go: int=20, max_turn_time: float=float("inf"),
+                     start_time: Optional[float]=None) -> TimeManager:
+        """
+        Creates the time manager of the next move, see TimeManager.for_clock.
+        :return: TimeManager
+        """
+        return TimeManager.for_clock(self.time_left, self.increment, moves_to_go, max_turn_time,
+                                     start_time=start_time)
+
+    def consume(self, elapsed: float) -> None:
+        """
+        Charges the time of a move and adds the increment.
+        :param elapsed: Time the move took in seconds
+        :return: None
+        """
+        self.time_left = max(0.0, self.time_left - elapsed) + self.increment
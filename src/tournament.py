@@ -0,0 +1,352 @@
+import argparse
+import ast
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from itertools import combinations
+from typing import Any, Callable, Optional
+
+from analysis_cache import AnalysisCache
+from bitboard import BitBoard
+from game_board import Marker, Move
+from gomoku_ai import GomokuAI
+from opening_book import OpeningBook
+
+
+DEFAULT_OPENINGS = [
+    [(9,9)],
+    [(9,9), (10,10)],
+    [(9,9), (10,9)],
+    [(9,9), (10,10), (8,10)],
+    [(9,9), (10,9), (10,10)],
+    [(9,9), (9,11), (11,9)],
+    [(9,9), (11,11), (10,8)],
+    [(9,9), (8,10), (10,11), (11,10)],
+]
+
+
+@dataclass
+class EngineConfig:
+    """
+    Named engine setup. The options are passed to GomokuAI, except that opening_book and
+    analysis_cache are the paths of the files to open. Every engine opens the analysis cache of
+    its name and colour next to the given path, see analysis_cache_path, so that engines under
+    test do not play with results of each other.
+    """
+    name: str
+    time_limit: float = 1.0
+    options: dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def parse(cls, spec: str) -> "EngineConfig":
+        """
+        Parses a command line engine spec of the form name[:key=value,...]. The key time_limit
+        sets the time per move, other keys are GomokuAI options.
+        :param spec: Engine spec, e.g. "fast:time_limit=0.5,threat_search_time=0"
+        :return: EngineConfig
+        """
+        name, _, option_string = spec.partition(":")
+        config = cls(name)
+        for option in filter(None, option_string.split(",")):
+            key, _, value = option.partition("=")
+            try:
+                value = ast.literal_eval(value)
+            except (ValueError, SyntaxError):
+                pass
+            if key == "time_limit":
+                config.time_limit = float(value)
+            else:
+                config.options[key] = value
+        return config
+
+
+def analysis_cache_path(path: str, name: str, colour: str) -> str:
+    """
+    Gives the analysis cache file of an engine playing a colour, e.g. cache.fast.black.bin for
+    cache.bin.
+    :param path: Analysis cache path of the engine spec
+    :param name: Name of the engine
+    :param colour: "black" or "white"
+    :return: Path of the cache file
+    """
+    root, extension = os.path.splitext(path)
+    return f"{root}.{name}.{colour}{extension}"
+
+
+def play_game(black: EngineConfig, white: EngineConfig, opening: list[Move], size: int=20,
+              max_moves: Optional[int]=None) -> dict[str, Any]:
+    """
+    Plays one game between two engines, starting from the opening moves. Black makes the first
+    move of the opening. Each engine searches on its own board on which its stones are the AI's.
+    :param black: Engine playing the first move
+    :param white: Engine playing the second move
+    :param opening: Moves placed before the engines take over
+    :param size: Size of the board
+    :param max_moves: Number of moves after which the game is a draw, defaults to a full board
+    :return: Game record with the winner (a name or None for a draw), the moves and the search
+             statistics of both engines. fallback_moves counts the moves of searches stopped
+             before completing an iteration, which play GomokuAI.fallback_move.
+    """
+    engines = [black, white]
+    ais = []
+    files = []
+    for engine, colour in zip(engines, ["black", "white"]):
+        options = dict(engine.options)
+        if "opening_book" in options:
+            options["opening_book"] = OpeningBook(options["opening_book"])
+            files.append(options["opening_book"])
+        if "analysis_cache" in options:
+            path = analysis_cache_path(options["analysis_cache"], engine.name, colour)
+            options["analysis_cache"] = AnalysisCache(path, board_size=size)
+            files.append(options["analysis_cache"])
+        ais.append(GomokuAI(verbose=False, **options))
+    boards = [BitBoard(size, track_symmetries=True), BitBoard(size, track_symmetries=True)]
+    candidates = [set(), set()]
+    stats = [{"nodes": 0, "time": 0.0, "moves": 0, "fallback_moves": 0} for _ in engines]
+    max_moves = size * size if max_moves is None else min(max_moves, size * size)
+
+    def place(col: int, row: int, side: int) -> None:
+        for i in range(2):
+            boards[i].update_candidates(candidates[i], col, row)
+            boards[i].move(col, row, Marker.AI if i == side else Marker.PLAYER)
+
+    try:
+        winner = None
+        for ply, move in enumerate(opening):
+            place(*move, ply % 2)
+
+        ply = len(opening)
+        while ply < max_moves and not boards[0].win_state():
+            side = ply % 2
+            start = time.perf_counter()
+            move = ais[side].find_ai_move(boards[side], candidates[side],
+                                          engines[side].time_limit)
+            if move is None or not boards[side].valid_move(*move):
+                move = GomokuAI.fallback_move(boards[side], candidates[side])
+                stats[side]["fallback_moves"] += 1
+            col, row = move
+            stats[side]["time"] += time.perf_counter() - start
+            stats[side]["nodes"] += ais[side].search_control.nodes
+            stats[side]["moves"] += 1
+            place(col, row, side)
+            ply += 1
+            if boards[0].win_state():
+                winner = engines[side].name
+    finally:
+        for ai in ais:
+            ai.close()
+        for file in files:
+            file.close()
+
+    return {
+        "black": black.name,
+        "white": white.name,
+        "opening": opening,
+        "winner": winner,
+        "moves": boards[0].move_history,
+        "stats": {black.name: stats[0], white.name: stats[1]},
+    }
+
+
+def elo_from_score(score: float) -> float:
+    """
+    Converts an expected score into an Elo difference
+    :param score: Score between 0 and 1
+    :return: Elo difference, infinite for a score of 0 or 1
+    """
+    if score <= 0.0:
+        return float("-inf")
+    if score >= 1.0:
+        return float("inf")
+    return -400 * math.log10(1 / score - 1)
+
+
+def score_from_elo(elo: float) -> float:
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+class PairStats:
+    """
+    Results of one engine against another, counted from the first engine's side. Gives an Elo
+    estimate with a 95% interval and a sequential probability ratio test (SPRT) between the
+    hypotheses elo0 and elo1, using the normal approximation of the game score.
+    """
+    def __init__(self, first: str, second: str):
+        self.first = first
+        self.second = second
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+
+    def add(self, winner: Optional[str]) -> None:
+        if winner is None:
+            self.draws += 1
+        elif winner == self.first:
+            self.wins += 1
+        else:
+            self.losses += 1
+
+    @property
+    def games(self) -> int:
+        return self.wins + self.draws + self.losses
+
+    def _score_and_variance(self) -> tuple[float, float]:
+        n = self.games
+        score = (self.wins + 0.5 * self.draws) / n
+        variance = (self.wins * (1 - score)**2 + self.draws * (0.5 - score)**2
+                    + self.losses * score**2) / n
+        return score, variance
+
+    def elo(self) -> tuple[float, float, float]:
+        """
+        Estimates the Elo difference of the first engine
+        :return: (estimate, lower bound, upper bound) of the 95% interval
+        """
+        if not self.games:
+            return 0.0, float("-inf"), float("inf")
+        score, variance = self._score_and_variance()
+        margin = 1.96 * math.sqrt(variance / self.games)
+        return (elo_from_score(score), elo_from_score(score - margin),
+                elo_from_score(score + margin))
+
+    def sprt(self, elo0: float=0.0, elo1: float=10.0, alpha: float=0.05,
+             beta: float=0.05) -> tuple[float, float, float, Optional[str]]:
+        """
+        Runs the SPRT of H0: elo = elo0 against H1: elo = elo1
+        :return: (log likelihood ratio, lower bound, upper bound, decision) where the decision is
+                 "H0", "H1" or None while the test continues
+        """
+        lower = math.log(beta / (1 - alpha))
+        upper = math.log((1 - beta) / alpha)
+        if not self.games:
+            return 0.0, lower, upper, None
+        score, variance = self._score_and_variance()
+        if variance == 0:
+            variance = 1 / (4 * self.games)
+        s0 = score_from_elo(elo0)
+        s1 = score_from_elo(elo1)
+        llr = self.games * (s1 - s0) * (2*score - s0 - s1) / (2 * variance)
+        decision = "H1" if llr >= upper else "H0" if llr <= lower else None
+        return llr, lower, upper, decision
+
+    def summary(self, elo0: float, elo1: float) -> dict[str, Any]:
+        elo, elo_low, elo_high = self.elo()
+        llr, lower, upper, decision = self.sprt(elo0, elo1)
+        return {
+            "engines": [self.first, self.second],
+            "games": self.games,
+            "wins": self.wins,
+            "draws": self.draws,
+            "losses": self.losses,
+            "elo": elo,
+            "elo_interval": [elo_low, elo_high],
+            "sprt": {"llr": llr, "bounds": [lower, upper], "decision": decision},
+        }
+
+
+def schedule(engines: list[EngineConfig], openings: list[list[Move]],
+             games: int) -> list[tuple[EngineConfig, EngineConfig, list[Move]]]:
+    """
+    Schedules the games of every pair of engines. Each opening is played twice in a row with
+    the colours swapped, so both engines get the same positions.
+    :param engines: List of engines
+    :param openings: List of openings
+    :param games: Number of games for each pair
+    :return: List of (black, white, opening) tuples
+    """
+    games_list = []
+    for first, second in combinations(engines, 2):
+        for i in range(games):
+            opening = openings[i // 2 % len(openings)]
+            black, white = (first, second) if i % 2 == 0 else (second, first)
+            games_list.append((black, white, opening))
+    return games_list
+
+
+def run_tournament(engines: list[EngineConfig], openings: list[list[Move]], games: int,
+                   workers: int=1, size: int=20, max_moves: Optional[int]=None,
+                   elo0: float=0.0, elo1: float=10.0,
+                   on_result: Optional[Callable[[dict[str, Any]], None]]=None) -> dict[str, Any]:
+    """
+    Plays every pair of engines against each other on a process pool.
+    :param engines: List of at least two engines with distinct names
+    :param openings: List of openings
+    :param games: Number of games for each pair
+    :param workers: Number of processes playing games
+    :param size: Size of the board
+    :param max_moves: Number of moves after which a game is a draw
+    :param elo0: Elo difference of the SPRT null hypothesis
+    :param elo1: Elo difference of the SPRT alternative hypothesis
+    :param on_result: Optional callback called with every finished game record
+    :return: Summary with the results of every pair and the search speed of every engine
+    """
+    pairs = {(a.name, b.name): PairStats(a.name, b.name) for a, b in combinations(engines, 2)}
+    speed = {engine.name: {"nodes": 0, "time": 0.0, "moves": 0, "fallback_moves": 0}
+             for engine in engines}
+    context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = [executor.submit(play_game, black, white, opening, size, max_moves)
+                   for black, white, opening in schedule(engines, openings, games)]
+        for future in as_completed(futures):
+            record = future.result()
+            key = (record["black"], record["white"])
+            pair = pairs[key] if key in pairs else pairs[key[::-1]]
+            pair.add(record["winner"])
+            for name, stats in record["stats"].items():
+                for stat, value in stats.items():
+                    speed[name][stat] += value
+            if on_result is not None:
+                on_result(record)
+
+    for stats in speed.values():
+        stats["nps"] = stats["nodes"] / stats["time"] if stats["time"] else 0.0
+    return {
+        "pairs": [pair.summary(elo0, elo1) for pair in pairs.values()],
+        "engines": speed,
+    }
+
+
+def main(argv: Optional[list[str]]=None) -> None:
+    parser = argparse.ArgumentParser(description="Plays headless self-play matches between "
+                                                 "engine configurations.")
+    parser.add_argument("--engine", action="append", required=True, dest="engines",
+                        help="Engine spec name[:key=value,...], given at least twice. "
+                             "time_limit sets the time per move, other keys are GomokuAI "
+                             "options.")
+    parser.add_argument("--games", type=int, default=100, help="Games per engine pair")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(),
+                        help="Number of processes playing games")
+    parser.add_argument("--openings", help="JSON file with a list of openings, each a list of "
+                                           "[col, row] moves")
+    parser.add_argument("--size", type=int, default=20, help="Size of the board")
+    parser.add_argument("--max-moves", type=int, help="Moves after which a game is a draw")
+    parser.add_argument("--elo0", type=float, default=0.0, help="SPRT null hypothesis")
+    parser.add_argument("--elo1", type=float, default=10.0, help="SPRT alternative hypothesis")
+    args = parser.parse_args(argv)
+
+    engines = [EngineConfig.parse(spec) for spec in args.engines]
+    if len(engines) < 2 or len({engine.name for engine in engines}) != len(engines):
+        parser.error("give at least two engines with distinct names")
+
+    openings = DEFAULT_OPENINGS
+    if args.openings:
+        with open(args.openings, encoding="utf-8") as file:
+            openings = [[tuple(move) for move in opening] for opening in json.load(file)]
+
+    def print_record(record: dict[str, Any]) -> None:
+        print(json.dumps({"game": record}), flush=True)
+
+    summary = run_tournament(engines, openings, args.games, args.workers, args.size,
+                             args.max_moves, args.elo0, args.elo1, print_record)
+    json.dump({"summary": summary}, sys.stdout)
+    print()
+
+
+if __name__ == "__main__":
+    main()
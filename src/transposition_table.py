@@ -0,0 +1,202 @@
+from typing import Optional
+
+from game_board import Move
+
+
+class TranspositionTable:
+    """
+    Fixed size transposition table stored in a flat buffer of 64-bit words. The table is split
+    into buckets of two entries. The first entry of a bucket prefers deep searches and the second
+    one is always replaced, so shallow results never push out deep ones but still get stored.
+
+    Every entry takes two words: the packed data and the zobrist key xored with the data. A probe
+    only accepts an entry when the xor gives back the key, which also rejects entries torn by
+    concurrent writers when the buffer is shared.
+
+    Data word layout from the lowest bit: flag (2 bits), depth (6 bits), move column (6 bits),
+    move row (6 bits), generation (4 bits), value offset by VALUE_LIMIT (40 bits).
+
+    The generation counts searches modulo 16. Entries of an earlier search are replaced in the
+    depth-preferred slot regardless of their depth, so deep results of past turns stay useful
+    until the current search needs the room.
+    """
+    ENTRY_WORDS = 2
+    BUCKET_WORDS = 4
+    BUCKET_BYTES = 32
+
+    VALUE_LIMIT = 2**39 - 1
+    NO_MOVE = 0xFFF
+    GENERATIONS = 16
+
+    def __init__(self, size_mb: float=16.0, buffer=None):
+        """
+        :param size_mb: Memory budget of the table in megabytes
+        :param buffer: Optional writable buffer, e.g. shared memory, to store the table in. Its
+                       size overrides size_mb.
+        """
+        size_bytes = size_mb * 2**20 if buffer is None else len(buffer)
+        buckets = 1
+        while buckets * 2 * self.BUCKET_BYTES <= size_bytes:
+            buckets *= 2
+
+        shared = buffer is not None
+        if not shared:
+            buffer = bytearray(buckets * self.BUCKET_BYTES)
+        self.buffer = buffer
+        self.words = memoryview(buffer)[:buckets * self.BUCKET_BYTES].cast("Q")
+        self.mask = buckets - 1
+        self.capacity = 2 * buckets
+        self.generation = 0
+
+        self.used = 0
+        if shared:
+            data_words = self.words[1::self.ENTRY_WORDS].tolist()
+            self.used = len(data_words) - data_words.count(0)
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        """
+        Resets the probe and store counters.
+        :return: None
+        """
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def new_search(self) -> None:
+        """
+        Starts a new search generation, which ages the entries of the earlier searches.
+        :return: None
+        """
+        self.generation = (self.generation + 1) % self.GENERATIONS
+
+    def clear(self) -> None:
+        """
+        Removes all entries from the table.
+        :return: None
+        """
+        self.words.cast("B")[:] = bytes(len(self.words) * 8)
+        self.used = 0
+        self.reset_stats()
+
+    def close(self) -> None:
+        """
+        Releases the view into the buffer, which shared memory requires before closing.
+        :return: None
+        """
+        self.words.release()
+
+    def probe(self, key: int) -> Optional[tuple[float, Optional[Move], int, int]]:
+        """
+        Looks up the entry of the given position
+        :param key: Zobrist hash of the position
+        :return: (value, best move, depth, flag) tuple or None if the position is not stored
+        """
+        words = self.words
+        i = (key & self.mask) * self.BUCKET_WORDS
+        self.probes += 1
+
+        data = words[i + 1]
+        if data and words[i] ^ data == key:
+            self.hits += 1
+            return self.unpack(data)
+
+        other = words[i + 3]
+        if other and words[i + 2] ^ other == key:
+            self.hits += 1
+            return self.unpack(other)
+
+        if data or other:
+            self.collisions += 1
+        return None
+
+    def store(self, key: int, value: float, move: Optional[Move], depth: int, flag: int) -> None:
+        """
+        Stores a search result. An entry of the same position is replaced in place. Otherwise the
+        result replaces the depth-preferred entry if it is at least as deep or from an earlier
+        generation, and the old entry moves to the always-replace slot. Shallower results go to
+        the always-replace slot.
+        :param key: Zobrist hash of the position
+        :param value: Value of the position
+        :param move: Best move of the position
+        :param depth: Depth of the search
+        :param flag: Whether the value is exact, a lower bound or an upper bound
+        :return: None
+        """
+        words = self.words
+        i = (key & self.mask) * self.BUCKET_WORDS
+        data = self.pack(value, move, depth, flag)
+        self.stores += 1
+
+        first = words[i + 1]
+        second = words[i + 3]
+        if first and words[i] ^ first == key:
+            slot = i
+        elif second and words[i + 2] ^ second == key:
+            slot = i + 2
+        else:
+            if (first and depth < first >> 2 & 0x3F
+                    and first >> 20 & 0xF == self.generation):
+                slot = i + 2
+                displaced = second
+            else:
+                slot = i
+                displaced = first and second
+                if first:
+                    words[i + 2] = words[i]
+                    words[i + 3] = first
+
+            if displaced:
+                self.overwrites += 1
+            else:
+                self.used += 1
+
+        words[slot] = key ^ data
+        words[slot + 1] = data
+
+    def pack(self, value: float, move: Optional[Move], depth: int, flag: int) -> int:
+        """
+        Packs an entry into a 64-bit data word.
+        :return: Data word
+        """
+        if value >= self.VALUE_LIMIT:
+            value = self.VALUE_LIMIT
+        elif value <= -self.VALUE_LIMIT:
+            value = -self.VALUE_LIMIT
+        packed_move = self.NO_MOVE if move is None else move[0] | move[1] << 6
+        return ((int(value) + self.VALUE_LIMIT) << 24 | self.generation << 20 | packed_move << 8
+                | min(depth, 63) << 2 | flag)
+
+    def unpack(self, data: int) -> tuple[float, Optional[Move], int, int]:
+        """
+        Unpacks a 64-bit data word.
+        :param data: Data word
+        :return: (value, best move, depth, flag) tuple
+        """
+        value = (data >> 24) - self.VALUE_LIMIT
+        if value == self.VALUE_LIMIT:
+            value = float("inf")
+        elif value == -self.VALUE_LIMIT:
+            value = float("-inf")
+        packed_move = data >> 8 & 0xFFF
+        move = None if packed_move == self.NO_MOVE else (packed_move & 0x3F, packed_move >> 6)
+        return value, move, data >> 2 & 0x3F, data & 0x3
+
+    def stats(self) -> dict[str, float]:
+        """
+        Returns usage statistics of the table
+        :return: Dict of statistic names and values
+        """
+        return {
+            "capacity": self.capacity,
+            "used": self.used,
+            "fill_rate": self.used / self.capacity,
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+            "collisions": self.collisions,
+            "stores": self.stores,
+            "overwrites": self.overwrites,
+        }